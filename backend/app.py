@@ -10,10 +10,15 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 
 from config import Config, logger
-from extensions import db
+from extensions import db, init_sqlite_wal
 from routes import register_blueprints
 from services import serper_search
-from utils import normalize_host
+from services.dimensions import init_dimensions
+from services.history_search import init_history_search
+from services.rollup import start_maintenance_scheduler
+from services.session_store import init_session_store
+from services.check_jobs import start_job_runner
+from utils import normalize_host, FastJSONProvider, init_compression
 
 
 # ------------------ FLASK APP SETUP ------------------
@@ -26,6 +31,9 @@ def create_app():
     """
     app = Flask(__name__)
 
+    # orjson-backed jsonify() (stdlib fallback), datetimes serialized natively
+    app.json = FastJSONProvider(app)
+
     # Configure app
     app.config["SECRET_KEY"] = Config.SECRET_KEY
     app.config["SQLALCHEMY_DATABASE_URI"] = Config.SQLALCHEMY_DATABASE_URI
@@ -54,9 +62,17 @@ def create_app():
     # Initialize extensions
     db.init_app(app)
 
+    # Negotiated gzip/brotli for JSON, exports and opted-in SSE
+    init_compression(app)
+
     # Create database tables
     with app.app_context():
+        if Config.SQLITE_WAL:
+            init_sqlite_wal(db.engine)
         db.create_all()
+        init_dimensions(db.session)
+        init_history_search(db.engine)
+        init_session_store(db.engine)
 
     # Register blueprints
     register_blueprints(app)
@@ -179,6 +195,15 @@ app = create_app()
 if __name__ == "__main__":
     print(f"API Key: {'Set' if Config.SERPER_API_KEY else 'Missing'}")
     print(f"Environment: {Config.ENVIRONMENT}")
-    print(f"Max Workers: {Config.MAX_WORKERS}")
+    print(f"Check Workers: {Config.CHECK_WORKERS}")
+
+    # Background rollup/retention for rank history (serving process only;
+    # a DB lease keeps concurrent servers from running it twice)
+    start_maintenance_scheduler(app)
+
+    # Background runner of /api/stream check jobs (resumes jobs of dead
+    # processes). Serving process only: migrations and shells importing the
+    # app must not claim jobs
+    start_job_runner(app)
 
     app.run(host="0.0.0.0", port=8001, debug=False, threaded=True)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: vectorized analytics vs a row-by-row Python loop
+
+Generates synthetic history columns (keyword_id, domain_id, time, position)
+for many pairs over a date range, with several checks per pair and day, then
+times services.analytics (position_matrix() + compute_metrics()) against a
+plain Python implementation of the same summary metrics. With --load the
+rows are also written to a temporary SQLite database and read back through
+load_columns().
+
+Usage (from backend/):
+    python benchmarks/bench_analytics.py --pairs 5000 --days 365 --checks 2
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from services import analytics  # noqa: E402
+
+
+START_DAY = date(2024, 1, 1)
+EPOCH_OFFSET = (START_DAY - date(1970, 1, 1)).days
+
+
+def synthetic_columns(pairs, days, checks, seed=42):
+    """Random walk positions, ~10% not found, `checks` checks per pair and day"""
+    rng = np.random.default_rng(seed)
+    n = pairs * days * checks
+
+    pair = np.repeat(np.arange(pairs), days * checks)
+    day = np.tile(np.repeat(np.arange(days), checks), pairs)
+    times = EPOCH_OFFSET + day + rng.random(n)
+
+    start = rng.integers(1, 60, size=pairs).repeat(days * checks)
+    walk = rng.integers(-2, 3, size=n).reshape(pairs, -1).cumsum(axis=1).reshape(-1)
+    positions = np.clip(start + walk, 1, 100).astype(np.float64)
+    positions[rng.random(n) < 0.1] = np.nan
+
+    keyword_ids = pair // 10 + 1
+    domain_ids = pair % 10 + 1
+    columns = np.stack([keyword_ids, domain_ids, times, positions], axis=1)
+    return columns[rng.permutation(n)]
+
+
+def python_metrics(rows, curve):
+    """Reference: summary metrics with dicts and loops, one row at a time"""
+    latest = {}
+    for keyword_id, domain_id, t, position in rows:
+        key = (keyword_id, domain_id, int(t))
+        if key not in latest or t > latest[key][0]:
+            latest[key] = (t, position)
+
+    series = {}
+    for (keyword_id, domain_id, day), (_, position) in latest.items():
+        series.setdefault((keyword_id, domain_id), []).append((day, position))
+
+    ctr_total, checks, found = 0.0, 0, []
+    volatilities = []
+    for points in series.values():
+        points.sort()
+        previous, deltas = None, []
+        for _, position in points:
+            checks += 1
+            if position != position:
+                continue
+            ctr_total += curve[min(int(position), len(curve) - 1)]
+            found.append(position)
+            if previous is not None:
+                deltas.append(abs(position - previous))
+            previous = position
+        if deltas:
+            volatilities.append(sum(deltas) / len(deltas))
+
+    return {
+        "visibility": 100 * ctr_total / (checks * curve[1]),
+        "avg_position": sum(found) / len(found),
+        "median_position": statistics.median(found),
+        "volatility": sum(volatilities) / len(volatilities),
+    }
+
+
+def numpy_metrics(columns, days):
+    _, positions, checked = analytics.position_matrix(columns, START_DAY, days)
+    return analytics.compute_metrics(positions, checked)["summary"]
+
+
+def measure_load(columns, days):
+    """Write the rows to a temp database and time load_columns()"""
+    from flask import Flask
+    from extensions import db
+    from models import RankHistory
+
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench_analytics_")
+    os.close(fd)
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            domain_rows = columns[columns[:, 1] == 1]
+            base = np.datetime64("1970-01-01T00:00:00")
+            stamps = (base + (domain_rows[:, 2] * 86400e6).astype("timedelta64[us]")).astype(str)
+            records = [
+                {
+                    "keyword_id": int(k), "domain_id": 1,
+                    "position": None if p != p else int(p),
+                    "checked_at": s.replace("T", " "),
+                }
+                for k, p, s in zip(domain_rows[:, 0], domain_rows[:, 3], stamps)
+            ]
+            conn = db.session.connection().connection
+            conn.executemany(
+                "INSERT INTO rank_history (keyword_id, domain_id, position, checked_at, check_type, api_credits_used) "
+                "VALUES (:keyword_id, :domain_id, :position, :checked_at, 'bulk', 1)",
+                records,
+            )
+            conn.commit()
+
+            t0 = time.perf_counter()
+            loaded = analytics.load_columns(START_DAY, START_DAY + timedelta(days=days - 1), domain_id=1)
+            elapsed = time.perf_counter() - t0
+            assert len(loaded) == len(records), "load_columns() returned a different row count"
+            return len(loaded), elapsed
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--checks", type=int, default=2, help="Checks per pair and day")
+    parser.add_argument("--load", action="store_true", help="Also time load_columns() on SQLite (one domain)")
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.pairs, args.days, args.checks)
+    print(f"{len(columns):,} rows, {args.pairs:,} pairs x {args.days} days\n")
+
+    t0 = time.perf_counter()
+    vectorized = numpy_metrics(columns, args.days)
+    numpy_time = time.perf_counter() - t0
+
+    rows = columns.tolist()
+    t0 = time.perf_counter()
+    reference = python_metrics(rows, analytics.ctr_curve().tolist())
+    python_time = time.perf_counter() - t0
+
+    for name, expected in reference.items():
+        assert abs(float(vectorized[name]) - expected) < 1e-6, f"{name} differs: {vectorized[name]} vs {expected}"
+
+    print(f"{'path':<10}{'s':>10}{'rows/sec':>16}")
+    for label, elapsed in (("python", python_time), ("numpy", numpy_time)):
+        print(f"{label:<10}{elapsed:>10.2f}{len(columns) / elapsed:>16,.0f}")
+    print(f"\nNumPy path is {python_time / numpy_time:.1f}x faster")
+    print("Summary: " + ", ".join(f"{k}={analytics.to_value(v)}" for k, v in vectorized.items()))
+
+    if args.load:
+        count, elapsed = measure_load(columns, args.days)
+        print(f"\nload_columns(): {count:,} rows in {elapsed:.2f}s ({count / elapsed:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: bulk-check history write paths, in results stored per second
+
+Writes the same synthetic bulk runs three ways, each into a fresh temporary
+database:
+
+- orm_loop:     the original bulk_check loop, one RankHistory ORM object per
+                result and one commit per keyword (record_history())
+- per_keyword:  one SERP snapshot per keyword, one transaction per keyword
+                (record_serps() called for each keyword)
+- per_run:      every keyword of a run in one record_serps() call, i.e. one
+                executemany INSERT and one transaction per bulk run
+
+Usage (from backend/):
+    python benchmarks/bench_bulk_insert.py --runs 20 --keywords 100 --results 30
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from extensions import db  # noqa: E402
+from models import RankHistory  # noqa: E402
+from services import dimensions  # noqa: E402
+from services.history_writer import record_history, record_serps  # noqa: E402
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def synthetic_runs(runs, keywords, results, seed=7):
+    """[(session_id, [(keyword, checked_at, [(domain, url), ...]), ...]), ...]"""
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    data = []
+    for r in range(runs):
+        serps = []
+        for k in range(keywords):
+            domains = rnd.sample(range(3000), results)
+            serps.append((
+                f"keyword {rnd.randrange(1000)}",
+                start + timedelta(hours=r, seconds=k),
+                [(f"domain{d}.com", f"https://www.domain{d}.com/page-{d}") for d in domains],
+            ))
+        data.append((f"run_{r}", serps))
+    return data
+
+
+def write_orm_loop(data):
+    for session_id, serps in data:
+        for keyword, _, results in serps:
+            record_history(db.session, [
+                RankHistory(
+                    keyword=keyword, domain=domain, position=i + 1, url=url,
+                    location="vn", device="desktop", checked_at=datetime.utcnow(),
+                    session_id=session_id, check_type="bulk",
+                )
+                for i, (domain, url) in enumerate(results)
+            ])
+
+
+def write_per_keyword(data):
+    for session_id, serps in data:
+        for serp in serps:
+            record_serps(db.session, session_id, "vn", "desktop", [serp])
+
+
+def write_per_run(data):
+    for session_id, serps in data:
+        record_serps(db.session, session_id, "vn", "desktop", serps)
+
+
+def summary(session_id):
+    row = db.session.execute(
+        db.text("SELECT keyword_count, total_records FROM check_sessions WHERE session_id = :s"),
+        {"s": session_id},
+    ).one()
+    return tuple(row)
+
+
+def run(label, data, write):
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench_bulk_")
+    os.close(fd)
+    app = make_app(path)
+    try:
+        with app.app_context():
+            db.create_all()
+            # Fresh database: drop location/device ids cached from the previous run
+            for cache in dimensions._enum_cache.values():
+                cache.clear()
+            dimensions.init_dimensions(db.session)
+
+            t0 = time.perf_counter()
+            write(data)
+            elapsed = time.perf_counter() - t0
+
+            summaries = [summary(session_id) for session_id, _ in data]
+            db.session.remove()
+        return label, elapsed, summaries
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20, help="Bulk runs")
+    parser.add_argument("--keywords", type=int, default=100, help="Keywords per run")
+    parser.add_argument("--results", type=int, default=30, help="Results per keyword")
+    args = parser.parse_args()
+
+    data = synthetic_runs(args.runs, args.keywords, args.results)
+    total = args.runs * args.keywords * args.results
+
+    results = [
+        run("orm_loop", data, write_orm_loop),
+        run("per_keyword", data, write_per_keyword),
+        run("per_run", data, write_per_run),
+    ]
+    assert all(r[2] == results[0][2] for r in results), "All paths must produce the same session summaries"
+
+    print(f"{total:,} results ({args.runs} runs x {args.keywords} keywords x {args.results})\n")
+    print(f"{'path':<13}{'seconds':>10}{'results/s':>12}{'speedup':>10}")
+    base = results[0][1]
+    for label, elapsed, _ in results:
+        print(f"{label:<13}{elapsed:>10.2f}{total / elapsed:>12,.0f}{base / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
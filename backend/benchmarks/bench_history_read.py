@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: ORM hydration vs Core row tuples for history reads
+
+Fills a temporary database with synthetic history, then measures rows/sec for
+the old read path (RankHistory instances + per-row isoformat) and the Core
+path used by /api/history/all (history_select() + rows_to_dicts()).
+
+Usage (from backend/):
+    python benchmarks/bench_history_read.py --rows 200000 --page 10000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from extensions import db  # noqa: E402
+from models import RankHistory  # noqa: E402
+from services.dimensions import init_dimensions, ensure_ids  # noqa: E402
+from services.history_query import history_select, rows_to_dicts, NEWEST_FIRST  # noqa: E402
+from models.dimensions import Keyword, Domain, Url  # noqa: E402
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def populate(rows, seed=42):
+    rnd = random.Random(seed)
+    keywords = ensure_ids(db.session, Keyword, [f"keyword {i}" for i in range(2000)])
+    domains = ensure_ids(db.session, Domain, [f"domain{i}.com" for i in range(5000)])
+    urls = ensure_ids(db.session, Url, [f"https://domain{i}.com/page" for i in range(5000)])
+    keyword_ids, domain_ids, url_ids = list(keywords.values()), list(domains.values()), list(urls.values())
+
+    start = datetime(2024, 1, 1)
+    table = RankHistory.__table__
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "keyword_id": rnd.choice(keyword_ids),
+            "domain_id": rnd.choice(domain_ids),
+            "position": rnd.randint(1, 30) if rnd.random() < 0.8 else None,
+            "url_id": rnd.choice(url_ids),
+            "location_id": 1,
+            "device_id": 1,
+            "checked_at": start + timedelta(seconds=i * 7, microseconds=rnd.randint(0, 999999)),
+            "session_id": f"session_{i // 30}",
+            "check_type": "bulk",
+            "api_credits_used": 1,
+        })
+        if len(batch) >= 20000:
+            db.session.execute(table.insert(), batch)
+            batch.clear()
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
+
+
+def orm_path(page):
+    history = RankHistory.query.order_by(RankHistory.checked_at.desc()).limit(page).all()
+    return [{
+        "id": h.id,
+        "keyword": h.keyword,
+        "domain": h.domain,
+        "position": h.position,
+        "url": h.url,
+        "location": h.location,
+        "device": h.device,
+        "checked_at": h.checked_at.isoformat() + 'Z' if h.checked_at else None,
+    } for h in history]
+
+
+def core_path(page):
+    stmt = history_select().order_by(NEWEST_FIRST).limit(page)
+    return rows_to_dicts(db.session.execute(stmt))
+
+
+def measure(fn, page, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        db.session.expire_all()
+        db.session.close()
+        t0 = time.perf_counter()
+        result = fn(page)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--page", type=int, default=10_000, help="Rows per request")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench_read_")
+    os.close(fd)
+    app = make_app(path)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            init_dimensions(db.session)
+
+            t0 = time.perf_counter()
+            populate(args.rows)
+            print(f"Inserted {args.rows:,} rows in {time.perf_counter() - t0:.1f}s\n")
+
+            orm_time, orm_rows = measure(orm_path, args.page, args.repeat)
+            core_time, core_rows = measure(core_path, args.page, args.repeat)
+            assert orm_rows == core_rows, "ORM and Core paths returned different data"
+
+            print(f"{'path':<8}{'rows':>10}{'ms':>10}{'rows/sec':>14}")
+            for label, elapsed in (("ORM", orm_time), ("Core", core_time)):
+                print(f"{label:<8}{len(orm_rows):>10}{elapsed * 1000:>10.1f}{len(orm_rows) / elapsed:>14,.0f}")
+            print(f"\nCore path is {orm_time / core_time:.1f}x faster")
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
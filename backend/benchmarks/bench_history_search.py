@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LIKE '%x%' scan vs FTS5 trigram lookup for /api/history/all filters
+
+Builds a synthetic normalized rank_history table (plus keywords/domains
+dimension tables) in a temporary SQLite file, creates the same FTS indexes
+and triggers the app uses, then times both search paths.
+
+Usage (from backend/):
+    python benchmarks/bench_history_search.py --rows 5000000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.history_search import FTS_TABLES, fts_ddl, fts_match_expression  # noqa: E402
+
+
+WORDS = [
+    "seo", "tools", "mua", "ban", "nha", "dat", "xe", "may", "tinh", "dien", "thoai",
+    "giay", "ao", "quan", "du", "lich", "khach", "san", "ve", "may", "bay", "hoc",
+    "tieng", "anh", "online", "gia", "re", "tot", "nhat", "ha", "noi", "sai", "gon",
+]
+TLDS = ["com", "vn", "com.vn", "net", "org", "io"]
+
+
+def create_schema(conn):
+    conn.execute("CREATE TABLE keywords (id INTEGER NOT NULL PRIMARY KEY, value VARCHAR(255) NOT NULL UNIQUE)")
+    conn.execute("CREATE TABLE domains (id INTEGER NOT NULL PRIMARY KEY, value VARCHAR(255) NOT NULL UNIQUE)")
+    conn.execute("""
+        CREATE TABLE rank_history (
+            id INTEGER NOT NULL PRIMARY KEY,
+            keyword_id INTEGER NOT NULL,
+            domain_id INTEGER NOT NULL,
+            position INTEGER,
+            url_id INTEGER,
+            location_id INTEGER,
+            device_id INTEGER,
+            checked_at DATETIME,
+            session_id VARCHAR(100),
+            check_type VARCHAR(20) DEFAULT 'single',
+            api_credits_used INTEGER DEFAULT 1
+        )
+    """)
+    # Same indexes as models/rank_history.py
+    conn.execute("CREATE INDEX ix_rank_history_checked_at ON rank_history (checked_at)")
+    conn.execute("CREATE INDEX ix_rank_history_domain_keyword ON rank_history (domain_id, keyword_id)")
+    conn.execute("CREATE INDEX ix_rank_history_session_id ON rank_history (session_id) WHERE session_id IS NOT NULL")
+
+
+def populate(conn, rows, seed=42):
+    rnd = random.Random(seed)
+
+    # Distinct values grow with history size, like real usage
+    n_keywords = max(1000, rows // 100)
+    n_domains = max(2000, rows // 50)
+    keywords = {" ".join(rnd.sample(WORDS, rnd.randint(2, 4))) + f" {i}" for i in range(n_keywords)}
+    domains = {
+        "".join(rnd.sample(WORDS, 2)) + f"{i}." + rnd.choice(TLDS)
+        for i in range(n_domains)
+    }
+    conn.executemany("INSERT INTO keywords (value) VALUES (?)", [(k,) for k in keywords])
+    conn.executemany("INSERT INTO domains (value) VALUES (?)", [(d,) for d in domains])
+
+    insert = (
+        "INSERT INTO rank_history (keyword_id, domain_id, position, url_id, location_id, "
+        "device_id, checked_at, session_id, check_type) VALUES (?, ?, ?, ?, 1, 1, ?, ?, 'bulk')"
+    )
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append((
+            rnd.randint(1, len(keywords)),
+            rnd.randint(1, len(domains)),
+            rnd.randint(1, 30),
+            rnd.randint(1, rows // 10 + 1),
+            (start + timedelta(seconds=i * 5)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            f"session_{i // 30}",
+        ))
+        if len(batch) >= 50000:
+            conn.executemany(insert, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(insert, batch)
+    conn.commit()
+    return len(keywords), len(domains)
+
+
+def timed(conn, sql, params, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = conn.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary database")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench_history_")
+    os.close(fd)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    try:
+        create_schema(conn)
+
+        t0 = time.perf_counter()
+        n_keywords, n_domains = populate(conn, args.rows)
+        print(
+            f"Inserted {args.rows:,} rows ({n_keywords:,} keywords, {n_domains:,} domains) "
+            f"in {time.perf_counter() - t0:.1f}s"
+        )
+
+        t0 = time.perf_counter()
+        for table, fts_table in FTS_TABLES.items():
+            for stmt in fts_ddl(table, fts_table):
+                conn.execute(stmt)
+            conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        conn.commit()
+        print(f"Built FTS indexes in {time.perf_counter() - t0:.1f}s")
+        print(f"Database size: {os.path.getsize(path) / 1024 / 1024:.0f} MB\n")
+
+        cases = [
+            ("keyword", "du lich", None),
+            ("domain", None, "khachsan"),
+            ("keyword+domain", "tieng anh", "online"),
+            ("rare keyword", "bay hoc tieng", None),
+        ]
+
+        print(f"{'filter':<16}{'rows':>10}{'LIKE (ms)':>12}{'FTS (ms)':>12}{'speedup':>10}")
+        for label, keyword, domain in cases:
+            like_where, like_params = [], []
+            fts_where, fts_params = [], []
+            for column, table, term in (("keyword_id", "keywords", keyword), ("domain_id", "domains", domain)):
+                if not term:
+                    continue
+                fts_table = FTS_TABLES[table]
+                like_where.append(f"{column} IN (SELECT id FROM {table} WHERE value LIKE ?)")
+                like_params.append(f"%{term}%")
+                fts_where.append(f"{column} IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)")
+                fts_params.append(fts_match_expression(term))
+
+            # Same shape as /api/history/all: newest first, first page only
+            tail = " ORDER BY checked_at DESC, id DESC LIMIT 1000"
+            like_sql = "SELECT id FROM rank_history WHERE " + " AND ".join(like_where) + tail
+            fts_sql = "SELECT id FROM rank_history WHERE " + " AND ".join(fts_where) + tail
+
+            like_time, like_rows = timed(conn, like_sql, like_params, args.repeat)
+            fts_time, fts_rows = timed(conn, fts_sql, fts_params, args.repeat)
+            assert like_rows == fts_rows, f"result mismatch for {label}"
+
+            print(
+                f"{label:<16}{len(fts_rows):>10}{like_time * 1000:>12.1f}"
+                f"{fts_time * 1000:>12.1f}{like_time / fts_time:>9.1f}x"
+            )
+    finally:
+        conn.close()
+        if args.keep:
+            print(f"\nDatabase kept at {path}")
+        else:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
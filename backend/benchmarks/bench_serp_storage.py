@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-result bulk rows vs one SERP snapshot per keyword
+
+Writes the same synthetic bulk sessions twice, into two temporary databases:
+once as one rank_history row per result (record_history(), the old bulk
+path) and once as serp_snapshots rows (record_serps()). Reports rows written,
+write time, database size, the time to read one session back as history
+rows, and (snapshots only) through /api/history/sessions/<id>/serps.
+
+Usage (from backend/):
+    python benchmarks/bench_serp_storage.py --sessions 50 --keywords 40 --results 30
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from extensions import db  # noqa: E402
+from models import RankHistory, SerpSnapshot  # noqa: E402
+from services import dimensions  # noqa: E402
+from services.history_writer import record_history, record_serps  # noqa: E402
+from services.history_query import history_select, rows_to_dicts, OLDEST_FIRST  # noqa: E402
+from routes.history import history_bp  # noqa: E402
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    app.register_blueprint(history_bp)
+    return app
+
+
+def synthetic_sessions(sessions, keywords, results, seed=42):
+    """[(session_id, [(keyword, checked_at, [(domain, url), ...]), ...]), ...]"""
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    data = []
+    for s in range(sessions):
+        serps = []
+        for k in range(keywords):
+            domains = rnd.sample(range(2000), results)
+            serps.append((
+                f"keyword {rnd.randrange(500)}",
+                start + timedelta(hours=s, seconds=k),
+                [(f"domain{d}.com", f"https://www.domain{d}.com/some/landing/page-{d}") for d in domains],
+            ))
+        data.append((f"session_{s}", serps))
+    return data
+
+
+def write_rows(data):
+    for session_id, serps in data:
+        for keyword, checked_at, results in serps:
+            record_history(db.session, [
+                RankHistory(
+                    keyword=keyword, domain=domain, position=i + 1, url=url,
+                    location="vn", device="desktop", checked_at=checked_at,
+                    session_id=session_id, check_type="bulk",
+                )
+                for i, (domain, url) in enumerate(results)
+            ])
+    return RankHistory.query.count()
+
+
+def write_snapshots(data):
+    for session_id, serps in data:
+        for serp in serps:
+            record_serps(db.session, session_id, "vn", "desktop", [serp])
+    return SerpSnapshot.query.count()
+
+
+def load_session_rows(session_id):
+    """A bulk session's results as history rows (works for both layouts)"""
+    stmt = history_select(time_format="plain", where=lambda h: [h.session_id == session_id]).order_by(OLDEST_FIRST)
+    return rows_to_dicts(db.session.execute(stmt))
+
+
+def run(label, data, write):
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench_serp_")
+    os.close(fd)
+    app = make_app(path)
+    try:
+        with app.app_context():
+            db.create_all()
+            # Fresh database: drop location/device ids cached from the previous run
+            for cache in dimensions._enum_cache.values():
+                cache.clear()
+            dimensions.init_dimensions(db.session)
+
+            t0 = time.perf_counter()
+            rows = write(data)
+            write_time = time.perf_counter() - t0
+
+            session_id = data[len(data) // 2][0]
+            t0 = time.perf_counter()
+            loaded = load_session_rows(session_id)
+            load_time = time.perf_counter() - t0
+
+            serps_time = None
+            if label == "snapshots":
+                t0 = time.perf_counter()
+                response = app.test_client().get(f"/api/history/sessions/{session_id}/serps")
+                serps_time = time.perf_counter() - t0
+                assert response.status_code == 200
+            db.session.remove()
+        size = os.path.getsize(path)
+        loaded = [{k: v for k, v in r.items() if k != "id"} for r in loaded]
+        return label, rows, write_time, size, load_time, serps_time, loaded
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--keywords", type=int, default=40, help="Keywords per session")
+    parser.add_argument("--results", type=int, default=30, help="Results per keyword")
+    args = parser.parse_args()
+
+    data = synthetic_sessions(args.sessions, args.keywords, args.results)
+    per_row = run("rows", data, write_rows)
+    snapshot = run("snapshots", data, write_snapshots)
+    assert per_row[6] == snapshot[6], "Both layouts must read back the same history rows"
+
+    print(f"{'layout':<11}{'rows':>10}{'write s':>10}{'db KiB':>10}{'rows ms':>10}{'serps ms':>10}")
+    for label, rows, write_time, size, load_time, serps_time, _ in (per_row, snapshot):
+        serps = f"{serps_time * 1000:.1f}" if serps_time is not None else "-"
+        print(f"{label:<11}{rows:>10,}{write_time:>10.2f}{size / 1024:>10,.0f}{load_time * 1000:>10.1f}{serps:>10}")
+    print(f"\nSnapshots: {per_row[1] / snapshot[1]:.0f}x fewer rows, {per_row[3] / snapshot[3]:.1f}x smaller, "
+          f"{per_row[2] / snapshot[2]:.1f}x faster writes")
+
+
+if __name__ == "__main__":
+    main()
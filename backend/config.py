@@ -34,12 +34,70 @@ class Config:
     # Performance tuning
     REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "10"))
     MAX_WORKERS = int(os.getenv("MAX_WORKERS", "6"))
+    # Checks running at once across the whole process (services/check_scheduler.py)
+    CHECK_WORKERS = int(os.getenv("CHECK_WORKERS", os.getenv("MAX_WORKERS", "6")))
     MAX_REDIRECTS = int(os.getenv("MAX_REDIRECTS", "10"))
-    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "200"))
 
     # Database
     SQLALCHEMY_DATABASE_URI = "sqlite:///templates.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # WAL journal: long reads (streaming exports) do not block writers
+    SQLITE_WAL = os.getenv("SQLITE_WAL", "1") == "1"
+
+    # History search: FTS5 trigram index over keyword/domain (falls back to LIKE)
+    HISTORY_FTS_ENABLED = os.getenv("HISTORY_FTS_ENABLED", "1") == "1"
+
+    # History rollup & retention
+    DAILY_ROLLUP_THRESHOLD_DAYS = int(os.getenv("DAILY_ROLLUP_THRESHOLD_DAYS", "90"))
+    ROLLUP_LOOKBACK_DAYS = int(os.getenv("ROLLUP_LOOKBACK_DAYS", "2"))
+    HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "0"))  # 0 = keep raw rows forever
+    VACUUM_PAGES = int(os.getenv("VACUUM_PAGES", "0"))  # 0 = release all free pages
+    MAINTENANCE_INTERVAL_MINUTES = int(os.getenv("MAINTENANCE_INTERVAL_MINUTES", "60"))  # 0 = disabled
+
+    # Max keyword/domain pairs per /api/history/timeline request
+    TIMELINE_MAX_PAIRS = int(os.getenv("TIMELINE_MAX_PAIRS", "500"))
+    # Longest date range of /api/history/timeline and /api/analytics (both
+    # build dense pairs x days arrays)
+    MAX_RANGE_DAYS = int(os.getenv("MAX_RANGE_DAYS", "730"))
+
+    # In-process cache of /api/history/sessions and /daily responses
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # 0 = disabled
+
+    # /api/stream/save sessions: "sqlite" (shared by all backend processes) or "memory"
+    SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")
+    SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+    # Checks of one stream (single-check job or bulk stream) queued or running at once
+    STREAM_WINDOW = int(os.getenv("STREAM_WINDOW", "12"))
+    # A job nobody is streaming (tab closed) is cancelled after this long
+    STREAM_CANCEL_GRACE_SECONDS = int(os.getenv("STREAM_CANCEL_GRACE_SECONDS", "30"))
+    # /api/bulk/check/stream saves history every this many keywords
+    BULK_SAVE_BATCH_SIZE = int(os.getenv("BULK_SAVE_BATCH_SIZE", "25"))
+    # /api/stream?batch=1 sends a frame per SSE_BATCH_SIZE results or SSE_BATCH_INTERVAL_MS
+    SSE_BATCH_SIZE = int(os.getenv("SSE_BATCH_SIZE", "50"))
+    SSE_BATCH_INTERVAL_MS = int(os.getenv("SSE_BATCH_INTERVAL_MS", "100"))
+    # Idle streams get a ": keep-alive" comment this often
+    SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    # Background check jobs (services/check_jobs.py): owners heartbeat every
+    # JOB_HEARTBEAT_SECONDS, a job silent for JOB_STALE_SECONDS is resumed by
+    # another runner, finished jobs stay replayable for JOB_RETENTION_SECONDS
+    JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+    JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "30"))
+    JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+    # How often streams poll jobs run by another process
+    JOB_POLL_INTERVAL_MS = int(os.getenv("JOB_POLL_INTERVAL_MS", "250"))
+    # Single checks of a pair that ranked on the first pages in its last
+    # PAGE_PLAN_HISTORY checks (within PAGE_PLAN_MAX_AGE_DAYS) fetch only those
+    # pages first (services/page_planner.py); 0 = always fetch the top 30
+    PAGE_PLAN_HISTORY = int(os.getenv("PAGE_PLAN_HISTORY", "5"))
+    PAGE_PLAN_MAX_AGE_DAYS = int(os.getenv("PAGE_PLAN_MAX_AGE_DAYS", "14"))
+
+    # Response compression (gzip, or brotli when installed)
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))  # gzip 1-9
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 0-11, low values suit dynamic responses
 
     # Location mapping
     LOCATION_MAP = {
@@ -1,4 +1,27 @@
 # backend/extensions.py
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+def init_sqlite_wal(engine) -> None:
+    """
+    Put every SQLite connection of engine in WAL journal mode
+
+    With the default rollback journal, a long read (e.g. a streaming history
+    export) holds a shared lock that makes every writer fail with "database
+    is locked" once its busy timeout runs out. In WAL mode readers and the
+    single writer no longer block each other.
+
+    Args:
+        engine: SQLAlchemy engine (no-op for other databases)
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_wal(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
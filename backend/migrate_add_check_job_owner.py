@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the owner column to check_jobs table
+"""
+from extensions import db
+from app import app
+
+def migrate():
+    with app.app_context():
+        # Check if column already exists
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('check_jobs')]
+
+        if 'owner' not in columns:
+            print("Adding owner column to check_jobs table...")
+            with db.engine.connect() as conn:
+                conn.execute(db.text('ALTER TABLE check_jobs ADD COLUMN owner VARCHAR(100)'))
+                conn.commit()
+            print("✓ owner column added successfully")
+        else:
+            print("✓ owner column already exists")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Migration script to create and backfill the check_sessions summary table
+
+Requires the normalized rank_history layout: run
+migrate_normalize_rank_history.py first.
+"""
+import sys
+
+from extensions import db
+from app import app
+from services.history_writer import rebuild_check_sessions
+
+def migrate():
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('rank_history')]
+        if 'keyword_id' not in columns:
+            print("✗ rank_history is not normalized yet: run migrate_normalize_rank_history.py first")
+            sys.exit(1)
+
+        # create_all() in create_app() already created the table if missing
+        db.create_all()
+
+        # Always rebuild: checks run before this migration already wrote
+        # summaries for new sessions, which must not stop the backfill of
+        # older history. The rebuild replaces the whole table, so it is safe
+        # to run again.
+        print("Backfilling check_sessions from rank_history...")
+        count = rebuild_check_sessions()
+        print(f"✓ check_sessions backfilled with {count} sessions")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Migration script to create and backfill the rank_history_daily rollup table
+"""
+from extensions import db
+from app import app
+from services.rollup import rollup_all, enable_incremental_vacuum
+
+def migrate():
+    with app.app_context():
+        # create_all() in create_app() already created the table if missing
+        db.create_all()
+
+        print("Rolling up existing rank_history into rank_history_daily...")
+        count = rollup_all()
+        print(f"✓ rank_history_daily backfilled with {count} rows")
+
+        # Retention frees pages that the maintenance job gives back with
+        # incremental_vacuum; switching modes needs one full VACUUM
+        print("Enabling incremental auto_vacuum (full VACUUM)...")
+        if enable_incremental_vacuum():
+            print("✓ auto_vacuum set to INCREMENTAL")
+        else:
+            print("✓ auto_vacuum already INCREMENTAL")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the page plan columns (planned_pages, plan_hit) to rank_history table
+"""
+from extensions import db
+from app import app
+
+def migrate():
+    with app.app_context():
+        # Check which columns already exist
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('rank_history')]
+
+        for name, sql_type in (("planned_pages", "INTEGER"), ("plan_hit", "BOOLEAN")):
+            if name not in columns:
+                print(f"Adding {name} column to rank_history table...")
+                with db.engine.connect() as conn:
+                    conn.execute(db.text(f'ALTER TABLE rank_history ADD COLUMN {name} {sql_type}'))
+                    conn.commit()
+                print(f"✓ {name} column added successfully")
+            else:
+                print(f"✓ {name} column already exists")
+
+if __name__ == "__main__":
+    migrate()
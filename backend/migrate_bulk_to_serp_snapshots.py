@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Migration script to fold per-result bulk rows of rank_history into serp_snapshots
+
+Every run of 1..N consecutive positions of one session/keyword/location/device
+becomes one snapshot row and its rank_history rows are deleted. Groups with
+position gaps cannot be expressed as an ordered SERP and are left as they
+are. History reads see the same rows before and after (services/history_source.py).
+"""
+import json
+
+from extensions import db
+from app import app
+from services.versions import bump_versions
+
+BATCH_SIZE = 5000
+
+_SELECT_BULK = """
+    SELECT id, session_id, keyword_id, location_id, device_id, checked_at, position, domain_id, url_id
+    FROM rank_history
+    WHERE check_type = 'bulk'
+    ORDER BY session_id, keyword_id, location_id, device_id, checked_at, id
+"""
+
+_INSERT_SNAPSHOT = """
+    INSERT INTO serp_snapshots (session_id, keyword_id, location_id, device_id, checked_at,
+                                result_count, domain_ids, url_ids)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _snapshots(rows):
+    """Group ordered bulk rows into (snapshot values, row ids); None for unconvertible groups"""
+    current, ids, key = None, [], None
+
+    def finish():
+        if current is None:
+            return None
+        session_id, keyword_id, location_id, device_id = key
+        values = (
+            session_id, keyword_id, location_id, device_id, current["checked_at"],
+            len(current["domains"]), json.dumps(current["domains"]), json.dumps(current["urls"]),
+        )
+        return (values if current["valid"] else None), ids
+
+    for row_id, session_id, keyword_id, location_id, device_id, checked_at, position, domain_id, url_id in rows:
+        row_key = (session_id, keyword_id, location_id, device_id)
+        # A SERP starts at position 1; a repeated keyword in the same session starts a new one
+        if row_key != key or position == 1:
+            done = finish()
+            if done:
+                yield done
+            current, ids, key = {"checked_at": checked_at, "domains": [], "urls": [], "valid": True}, [], row_key
+
+        current["valid"] = current["valid"] and position == len(current["domains"]) + 1
+        current["domains"].append(domain_id)
+        current["urls"].append(url_id)
+        ids.append(row_id)
+
+    done = finish()
+    if done:
+        yield done
+
+
+def migrate():
+    with app.app_context():
+        # create_all() in create_app() already created the table if missing
+        db.create_all()
+
+        conn = db.engine.raw_connection()
+        try:
+            # Read everything before deleting from the same table
+            reader = conn.cursor()
+            reader.execute(_SELECT_BULK)
+            groups = _snapshots(reader.fetchall())
+            reader.close()
+
+            converted = skipped = deleted = 0
+            snapshots, delete_ids = [], []
+
+            def flush():
+                nonlocal deleted
+                writer = conn.cursor()
+                writer.executemany(_INSERT_SNAPSHOT, snapshots)
+                writer.executemany("DELETE FROM rank_history WHERE id = ?", [(i,) for i in delete_ids])
+                deleted += len(delete_ids)
+                snapshots.clear()
+                delete_ids.clear()
+
+            for values, ids in groups:
+                if values is None:
+                    skipped += 1
+                    continue
+                snapshots.append(values)
+                delete_ids.extend(ids)
+                converted += 1
+                if len(snapshots) >= BATCH_SIZE:
+                    flush()
+            if snapshots:
+                flush()
+            conn.commit()
+        finally:
+            conn.close()
+
+        bump_versions(db.session, "rank_history")
+        db.session.commit()
+
+        print(f"✓ {converted} bulk SERPs moved to serp_snapshots ({deleted} rank_history rows removed)")
+        if skipped:
+            print(f"  {skipped} groups with position gaps left in rank_history")
+        print("  Freed pages are reclaimed by VACUUM or the maintenance job's incremental vacuum")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration script to stop storing API keys in check_jobs table
+
+Adds has_api_key and error, marks jobs that were submitted with a key and
+drops the api_key column (keys are only kept in process memory now). Jobs
+still pending when this runs fail with an error event on resume.
+"""
+import sqlite3
+
+from extensions import db
+from app import app
+
+def migrate():
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('check_jobs')]
+
+        with db.engine.connect() as conn:
+            if 'has_api_key' not in columns:
+                print("Adding has_api_key column to check_jobs table...")
+                conn.execute(db.text('ALTER TABLE check_jobs ADD COLUMN has_api_key BOOLEAN NOT NULL DEFAULT 0'))
+                print("✓ has_api_key column added successfully")
+            else:
+                print("✓ has_api_key column already exists")
+
+            if 'error' not in columns:
+                print("Adding error column to check_jobs table...")
+                conn.execute(db.text('ALTER TABLE check_jobs ADD COLUMN error VARCHAR(200)'))
+                print("✓ error column added successfully")
+            else:
+                print("✓ error column already exists")
+
+            if 'api_key' in columns:
+                print("Removing stored API keys from check_jobs table...")
+                conn.execute(db.text('UPDATE check_jobs SET has_api_key = 1 WHERE api_key IS NOT NULL'))
+                conn.execute(db.text('UPDATE check_jobs SET api_key = NULL'))
+                # DROP COLUMN needs SQLite 3.35; older versions keep the (empty) column
+                if sqlite3.sqlite_version_info >= (3, 35, 0):
+                    conn.execute(db.text('ALTER TABLE check_jobs DROP COLUMN api_key'))
+                    print("✓ api_key column dropped")
+                else:
+                    print("✓ api_key column cleared (SQLite < 3.35 cannot drop it)")
+            else:
+                print("✓ api_key column already removed")
+            conn.commit()
+
+        # Old key values may still sit in free pages and the WAL
+        with db.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.exec_driver_sql('VACUUM')
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+
+if __name__ == "__main__":
+    migrate()
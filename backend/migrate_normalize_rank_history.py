@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Migration script to normalize rank_history into dimension tables
+
+Moves keyword, domain, url, location and device strings into the keywords,
+domains, urls, locations and devices tables and rewrites rank_history with
+integer foreign keys. Row ids, timestamps and sessions are preserved.
+"""
+import os
+
+from extensions import db
+from app import app
+from models.rank_history import RankHistory
+from services.history_search import LEGACY_FTS_TABLE
+
+def _checkpoint(engine):
+    """Move WAL pages into the database file (see init_sqlite_wal in extensions.py)"""
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+
+def _db_size(engine):
+    _checkpoint(engine)
+    path = engine.url.database
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+# Indexes of earlier versions of the normalized table, replaced by narrower ones
+_SUPERSEDED_INDEXES = ('ix_rank_history_pair_checked_at', 'ix_rank_history_domain_checked_at')
+
+def _sync_indexes(conn):
+    """Replace superseded rank_history indexes with the ones models/rank_history.py declares"""
+    for name in _SUPERSEDED_INDEXES:
+        conn.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+    # Full session_id index of earlier versions (now partial)
+    session_index = conn.execute(db.text(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'ix_rank_history_session_id'"
+    )).scalar()
+    if session_index and 'WHERE' not in session_index.upper():
+        conn.execute(db.text('DROP INDEX ix_rank_history_session_id'))
+    for index in RankHistory.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+def _vacuum(engine):
+    """Give the freed pages back to the filesystem"""
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql('VACUUM')
+    # In WAL mode the rebuilt file only replaces the old one at a checkpoint
+    _checkpoint(engine)
+
+def migrate():
+    with app.app_context():
+        # Check if the table is still in the old (string columns) layout
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('rank_history')]
+
+        if 'keyword' not in columns:
+            index_names = {index['name'] for index in inspector.get_indexes('rank_history')}
+            if index_names & set(_SUPERSEDED_INDEXES):
+                size_before = _db_size(db.engine)
+                with db.engine.begin() as conn:
+                    _sync_indexes(conn)
+                _vacuum(db.engine)
+                size_after = _db_size(db.engine)
+                print(
+                    f"✓ rank_history indexes narrowed "
+                    f"({size_before / 1024 / 1024:.2f} MB → {size_after / 1024 / 1024:.2f} MB)"
+                )
+            print("✓ rank_history already normalized")
+            return
+
+        size_before = _db_size(db.engine)
+        print("Normalizing rank_history into dimension tables...")
+
+        with db.engine.begin() as conn:
+            # Old table keeps its index names after a rename, so drop them first
+            for index in inspector.get_indexes('rank_history'):
+                conn.execute(db.text(f'DROP INDEX IF EXISTS {index["name"]}'))
+            # The old FTS sync triggers reference rank_history_fts and would
+            # abort the rename once it is gone
+            for suffix in ('ai', 'ad', 'au'):
+                conn.execute(db.text(f'DROP TRIGGER IF EXISTS {LEGACY_FTS_TABLE}_{suffix}'))
+            conn.execute(db.text(f'DROP TABLE IF EXISTS {LEGACY_FTS_TABLE}'))
+            conn.execute(db.text('ALTER TABLE rank_history RENAME TO rank_history_denormalized'))
+
+            RankHistory.__table__.create(conn)
+
+            # Dimension values (FTS triggers on keywords/domains index them as they go in)
+            for table, source in (
+                ('keywords', 'keyword'),
+                ('domains', 'domain'),
+                ('urls', 'url'),
+                ('locations', 'location'),
+                ('devices', 'device'),
+            ):
+                conn.execute(db.text(
+                    f'INSERT OR IGNORE INTO {table} (value) '
+                    f'SELECT DISTINCT {source} FROM rank_history_denormalized WHERE {source} IS NOT NULL'
+                ))
+
+            result = conn.execute(db.text('''
+                INSERT INTO rank_history (
+                    id, keyword_id, domain_id, position, url_id, location_id, device_id,
+                    checked_at, session_id, check_type, api_credits_used
+                )
+                SELECT o.id, k.id, d.id, o.position, u.id, l.id, dv.id,
+                       o.checked_at, o.session_id, o.check_type, o.api_credits_used
+                FROM rank_history_denormalized o
+                JOIN keywords k ON k.value = o.keyword
+                JOIN domains d ON d.value = o.domain
+                LEFT JOIN urls u ON u.value = o.url
+                LEFT JOIN locations l ON l.value = o.location
+                LEFT JOIN devices dv ON dv.value = o.device
+            '''))
+            print(f"  copied {result.rowcount} history rows")
+
+            conn.execute(db.text('DROP TABLE rank_history_denormalized'))
+
+        _vacuum(db.engine)
+
+        size_after = _db_size(db.engine)
+        print(
+            f"✓ rank_history normalized "
+            f"({size_before / 1024 / 1024:.2f} MB → {size_after / 1024 / 1024:.2f} MB)"
+        )
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Migration script to move template keywords/domains into template_items rows
+
+Rewrites templates without the newline-joined keywords/domains columns,
+with keyword_count/domain_count instead, and stores every keyword and domain
+as a template_items row in its original order. Template ids are preserved.
+"""
+from extensions import db
+from app import app
+from models.template import Template, TemplateItem
+
+def _split(blob):
+    return [v.strip() for v in (blob or "").split("\n") if v.strip()]
+
+def migrate():
+    with app.app_context():
+        # Check if the table is still in the old (text blob) layout
+        inspector = db.inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('templates')]
+
+        if 'keywords' not in columns:
+            print("✓ templates already normalized")
+            return
+
+        print("Moving template keywords/domains into template_items...")
+
+        with db.engine.begin() as conn:
+            for index in inspector.get_indexes('templates'):
+                conn.execute(db.text(f'DROP INDEX IF EXISTS {index["name"]}'))
+            conn.execute(db.text('ALTER TABLE templates RENAME TO templates_denormalized'))
+
+            Template.__table__.create(conn)
+            TemplateItem.__table__.create(conn, checkfirst=True)
+
+            old = conn.execute(db.text(
+                'SELECT id, user_name, name, keywords, domains, created_at FROM templates_denormalized'
+            ).columns(created_at=db.DateTime)).all()
+
+            items = 0
+            for template_id, user_name, name, keywords, domains, created_at in old:
+                keywords, domains = _split(keywords), _split(domains)
+                conn.execute(Template.__table__.insert().values(
+                    id=template_id, user_name=user_name, name=name, created_at=created_at,
+                    keyword_count=len(keywords), domain_count=len(domains),
+                ))
+                rows = [
+                    {"template_id": template_id, "kind": kind, "position": i, "value": v}
+                    for kind, values in (("keyword", keywords), ("domain", domains))
+                    for i, v in enumerate(values)
+                ]
+                if rows:
+                    conn.execute(TemplateItem.__table__.insert(), rows)
+                items += len(rows)
+
+            conn.execute(db.text('DROP TABLE templates_denormalized'))
+
+        print(f"✓ {len(old)} templates normalized ({items} keyword/domain rows)")
+
+if __name__ == "__main__":
+    migrate()
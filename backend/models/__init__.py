@@ -1,2 +1,11 @@
-from .template import Template
-from .rank_history import RankHistory
\ No newline at end of file
+from .template import Template, TemplateItem
+from .dimensions import Keyword, Domain, Url, Location, Device
+from .rank_history import RankHistory
+from .rank_daily import RankDaily
+from .check_session import CheckSession
+from .table_version import TableVersion
+from .serp_snapshot import SerpSnapshot
+from .stream_session import StreamSession
+from .check_job import CheckJob, CheckJobPair
+from .serp_yield import SerpYield
+from .maintenance_lease import MaintenanceLease
@@ -0,0 +1,85 @@
+from extensions import db
+from datetime import datetime
+
+
+class CheckJob(db.Model):
+    """
+    One single-check run, executed by the background job runner
+
+    The id is the /api/stream session id. A job is owned by the runner whose
+    token is in owner; the owner refreshes heartbeat_at while it runs, so a
+    job whose heartbeat went stale (crashed, restarted or stalled process) is
+    claimed again and resumes from its checkpointed pairs. Every write of the
+    runner is conditional on owner, so a stalled runner that lost its job
+    stops instead of writing over the new owner. See services/check_jobs.py.
+    """
+    __tablename__ = "check_jobs"
+
+    id = db.Column(db.String(100), primary_key=True)
+    # queued -> running -> done | cancelled | failed
+    state = db.Column(db.String(20), nullable=False, default="queued", index=True)
+    location = db.Column(db.String(50), nullable=False)
+    device = db.Column(db.String(50), nullable=False)
+    # The submitted API key itself is never stored: it stays in the memory of
+    # the process that created the job (services/check_jobs.py)
+    has_api_key = db.Column(db.Boolean, nullable=False, default=False)
+    error = db.Column(db.String(200))  # why a failed job failed, sent as its last event
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    total_pairs = db.Column(db.Integer, nullable=False, default=0)
+    done_pairs = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    owner = db.Column(db.String(100))  # token of the runner that claimed the job
+    heartbeat_at = db.Column(db.Float)  # unix time, refreshed by the owning runner
+    watched_at = db.Column(db.Float)  # unix time, refreshed by streams tailing the job
+
+    pairs = db.relationship(
+        "CheckJobPair",
+        order_by="CheckJobPair.position",
+        cascade="all, delete-orphan",
+        lazy="select",
+    )
+
+    def to_dict(self, with_pairs: bool = False):
+        data = {
+            "job_id": self.id,
+            "state": self.state,
+            "location": self.location,
+            "device": self.device,
+            "total_pairs": self.total_pairs,
+            "done_pairs": self.done_pairs,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if with_pairs:
+            data["pairs"] = [pair.to_dict() for pair in self.pairs]
+        return data
+
+
+class CheckJobPair(db.Model):
+    """
+    One keyword/domain pair of a job; its checkpoint once checked
+
+    event_id numbers completed pairs in completion order and is the SSE event
+    id of the result, so streams replay and resume from this table.
+    """
+    __tablename__ = "check_job_pairs"
+    __table_args__ = (
+        db.Index("ix_check_job_pairs_job_event", "job_id", "event_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(100), db.ForeignKey("check_jobs.id"), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # input order
+    keyword = db.Column(db.String(500), nullable=False)
+    domain = db.Column(db.String(500), nullable=False)
+    event_id = db.Column(db.Integer)  # set once checked
+    result = db.Column(db.Text)  # JSON result sent to the client
+
+    def to_dict(self):
+        return {
+            "keyword": self.keyword,
+            "domain": self.domain,
+            "state": "done" if self.event_id is not None else "pending",
+        }
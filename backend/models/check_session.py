@@ -0,0 +1,36 @@
+from extensions import db
+from datetime import datetime
+
+class CheckSession(db.Model):
+    """Per-session summary of rank_history, maintained on every history write"""
+    __tablename__ = "check_sessions"
+    __table_args__ = (
+        db.UniqueConstraint("session_id", "check_type", "location", "device", name="uq_check_session_key"),
+        db.Index("ix_check_sessions_checked_at_id", "checked_at", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(100), nullable=False)
+    check_type = db.Column(db.String(20), nullable=False, default="single")
+    location = db.Column(db.String(50), nullable=False, default="")
+    device = db.Column(db.String(50), nullable=False, default="")
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    keyword_count = db.Column(db.Integer, nullable=False, default=0)
+    domain_count = db.Column(db.Integer, nullable=False, default=0)
+    total_records = db.Column(db.Integer, nullable=False, default=0)
+    api_credits_used = db.Column(db.Integer, nullable=False, default=0)
+    success_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "check_type": self.check_type or "single",
+            "checked_at": self.checked_at,
+            "keyword_count": self.keyword_count,
+            "domain_count": self.domain_count,
+            "total_records": self.total_records,
+            "api_credits_used": self.api_credits_used or 0,
+            "success": self.success_count > 0,
+            "location": self.location or None,
+            "device": self.device or None,
+        }
@@ -0,0 +1,38 @@
+from extensions import db
+
+
+class Keyword(db.Model):
+    __tablename__ = "keywords"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.String(255), nullable=False, unique=True)
+
+
+class Domain(db.Model):
+    __tablename__ = "domains"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.String(255), nullable=False, unique=True)
+
+
+class Url(db.Model):
+    __tablename__ = "urls"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.String(500), nullable=False, unique=True)
+
+
+class Location(db.Model):
+    """Location codes (vn, hanoi, ...); seeded from Config.LOCATION_MAP"""
+    __tablename__ = "locations"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.String(50), nullable=False, unique=True)
+
+
+class Device(db.Model):
+    """Device types (desktop, mobile)"""
+    __tablename__ = "devices"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.String(50), nullable=False, unique=True)
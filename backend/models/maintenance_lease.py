@@ -0,0 +1,15 @@
+from extensions import db
+
+
+class MaintenanceLease(db.Model):
+    """
+    Which process runs a background maintenance job
+
+    Every serving process schedules history maintenance; a run only goes
+    ahead in the process holding an unexpired lease (see services/rollup.py).
+    """
+    __tablename__ = "maintenance_leases"
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    expires_at = db.Column(db.Float, nullable=False, default=0)  # unix time
@@ -0,0 +1,38 @@
+from extensions import db
+
+
+class RankDaily(db.Model):
+    """
+    Per-day rollup of rank_history for one keyword/domain/location/device
+
+    Built by services/rollup.py. location_id/device_id use 0 for rows saved
+    without a location/device so the unique key never contains NULL.
+    """
+    __tablename__ = "rank_history_daily"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "keyword_id", "domain_id", "day", "location_id", "device_id",
+            name="uq_rank_history_daily_key",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    keyword_id = db.Column(db.Integer, db.ForeignKey("keywords.id"), nullable=False)
+    domain_id = db.Column(db.Integer, db.ForeignKey("domains.id"), nullable=False)
+    location_id = db.Column(db.Integer, nullable=False, default=0)
+    device_id = db.Column(db.Integer, nullable=False, default=0)
+    day = db.Column(db.Date, nullable=False, index=True)
+    best_position = db.Column(db.Integer)
+    worst_position = db.Column(db.Integer)
+    last_position = db.Column(db.Integer)
+    last_url_id = db.Column(db.Integer, db.ForeignKey("urls.id"))
+    position_sum = db.Column(db.Integer, nullable=False, default=0)
+    found_count = db.Column(db.Integer, nullable=False, default=0)
+    check_count = db.Column(db.Integer, nullable=False, default=0)
+    last_checked_at = db.Column(db.DateTime)
+
+    @property
+    def avg_position(self):
+        if not self.found_count:
+            return None
+        return round(self.position_sum / self.found_count, 2)
@@ -1,20 +1,81 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.hybrid import hybrid_property
+
+from .dimensions import Keyword, Domain, Url, Location, Device
+
+
+def _dimension(name, model):
+    """
+    String attribute backed by a dimension table
+
+    Reading returns the dimension value; assigning a string stores it as
+    pending until services.dimensions.resolve_dimensions() maps it to an id.
+    On the class it is a correlated subquery, so RankHistory.keyword == "x"
+    still works (filters on hot paths should compare *_id columns instead).
+    """
+    ref = f"{name}_ref"
+
+    def fget(self):
+        pending = self.__dict__.get("_pending_dimensions", {})
+        if name in pending:
+            return pending[name]
+        obj = getattr(self, ref)
+        return obj.value if obj is not None else None
+
+    def fset(self, value):
+        self.__dict__.setdefault("_pending_dimensions", {})[name] = value
+
+    def expr(cls):
+        return (select(model.value)
+            .where(model.id == getattr(cls, f"{name}_id"))
+            .scalar_subquery())
+
+    return hybrid_property(fget, fset, expr=expr)
+
 
 class RankHistory(db.Model):
     __tablename__ = "rank_history"
+    # Narrow on purpose: checked_at is stored as 26-character text, so every
+    # index carrying it costs about as much as the row itself. A pair's rows
+    # are few enough to sort after the (domain_id, keyword_id) lookup, and
+    # legacy rows without a session are left out of the session_id index.
+    __table_args__ = (
+        db.Index("ix_rank_history_domain_keyword", "domain_id", "keyword_id"),
+        db.Index(
+            "ix_rank_history_session_id", "session_id",
+            sqlite_where=db.text("session_id IS NOT NULL"),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    keyword = db.Column(db.String(255), nullable=False)
-    domain = db.Column(db.String(255), nullable=False)
+    keyword_id = db.Column(db.Integer, db.ForeignKey("keywords.id"), nullable=False)
+    domain_id = db.Column(db.Integer, db.ForeignKey("domains.id"), nullable=False)
     position = db.Column(db.Integer, nullable=True)
-    url = db.Column(db.String(500))
-    location = db.Column(db.String(50))
-    device = db.Column(db.String(50))
+    url_id = db.Column(db.Integer, db.ForeignKey("urls.id"))
+    location_id = db.Column(db.Integer, db.ForeignKey("locations.id"))
+    device_id = db.Column(db.Integer, db.ForeignKey("devices.id"))
     checked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    session_id = db.Column(db.String(100), index=True)
+    session_id = db.Column(db.String(100))
     check_type = db.Column(db.String(20), default="single")
     api_credits_used = db.Column(db.Integer, default=1)
+    # Page plan of the check (services/page_planner.py): pages fetched first,
+    # None for a full top 30 fetch; plan_hit if the pair was on those pages
+    planned_pages = db.Column(db.Integer)
+    plan_hit = db.Column(db.Boolean)
+
+    keyword_ref = db.relationship(Keyword, lazy="joined")
+    domain_ref = db.relationship(Domain, lazy="joined")
+    url_ref = db.relationship(Url, lazy="joined")
+    location_ref = db.relationship(Location, lazy="joined")
+    device_ref = db.relationship(Device, lazy="joined")
+
+    keyword = _dimension("keyword", Keyword)
+    domain = _dimension("domain", Domain)
+    url = _dimension("url", Url)
+    location = _dimension("location", Location)
+    device = _dimension("device", Device)
 
     def to_dict(self):
         return {
@@ -26,4 +87,4 @@ class RankHistory(db.Model):
             "location": self.location,
             "device": self.device,
             "checked_at": self.checked_at.strftime("%Y-%m-%d %H:%M:%S"),
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,27 @@
+from extensions import db
+from datetime import datetime
+
+
+class SerpSnapshot(db.Model):
+    """
+    One bulk-check SERP: the ordered result list of one keyword
+
+    Bulk checks store one row per keyword instead of one rank_history row per
+    result. domain_ids/url_ids are JSON arrays in position order (index 0 =
+    position 1); history reads expand them into rank_history-shaped rows, see
+    services/history_source.py.
+    """
+    __tablename__ = "serp_snapshots"
+    __table_args__ = (
+        db.Index("ix_serp_snapshots_keyword_checked_at", "keyword_id", "checked_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(100), index=True)
+    keyword_id = db.Column(db.Integer, db.ForeignKey("keywords.id"), nullable=False)
+    location_id = db.Column(db.Integer, db.ForeignKey("locations.id"))
+    device_id = db.Column(db.Integer, db.ForeignKey("devices.id"))
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    result_count = db.Column(db.Integer, nullable=False, default=0)
+    domain_ids = db.Column(db.Text, nullable=False, default="[]")
+    url_ids = db.Column(db.Text, nullable=False, default="[]")
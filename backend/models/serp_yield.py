@@ -0,0 +1,18 @@
+from extensions import db
+from datetime import datetime
+
+
+class SerpYield(db.Model):
+    """
+    Observed bulk-check yield of one keyword/location: usable results per Serper page
+
+    Smoothed over checks (exponentially weighted); used to plan how many
+    pages a bulk check fetches, see services/serp_yield.py.
+    """
+    __tablename__ = "serp_yields"
+
+    keyword_id = db.Column(db.Integer, db.ForeignKey("keywords.id"), primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey("locations.id"), primary_key=True)
+    results_per_page = db.Column(db.Float, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
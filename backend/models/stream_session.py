@@ -0,0 +1,16 @@
+from extensions import db
+
+
+class StreamSession(db.Model):
+    """
+    Saved /api/stream/save form, read back by /api/stream
+
+    Used by services.session_store.SQLiteSessionStore so every backend
+    process sees the same sessions. Rows expire after Config.SESSION_TTL_SECONDS.
+    """
+    __tablename__ = "stream_sessions"
+
+    session_id = db.Column(db.String(100), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.Float, nullable=False, index=True)  # unix time
+    expires_at = db.Column(db.Float, nullable=False, index=True)
@@ -0,0 +1,13 @@
+from extensions import db
+from datetime import datetime
+
+class TableVersion(db.Model):
+    """Write counter per table, used for ETag/Last-Modified on read endpoints"""
+    __tablename__ = "table_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TableVersion {self.name}={self.version}>"
@@ -1,15 +1,76 @@
 from extensions import db
 from datetime import datetime
 
+
+class TemplateItem(db.Model):
+    """One keyword or domain of a template, in input order"""
+    __tablename__ = "template_items"
+    __table_args__ = (
+        db.Index("ix_template_items_template_kind_position", "template_id", "kind", "position"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey("templates.id", ondelete="CASCADE"), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # "keyword" or "domain"
+    position = db.Column(db.Integer, nullable=False)
+    value = db.Column(db.String(500), nullable=False)
+
+
 class Template(db.Model):
     __tablename__ = "templates"
+    __table_args__ = (
+        db.Index("ix_templates_created_at_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_name = db.Column(db.String(100), nullable=False)
     name = db.Column(db.String(255), nullable=False)
-    keywords = db.Column(db.Text, nullable=False)
-    domains = db.Column(db.Text, nullable=False)
+    # Cached len() of the keyword/domain items, so listing never loads them
+    keyword_count = db.Column(db.Integer, nullable=False, default=0)
+    domain_count = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    items = db.relationship(
+        TemplateItem,
+        order_by=(TemplateItem.kind, TemplateItem.position),
+        cascade="all, delete-orphan",
+    )
+
+    @property
+    def keywords(self):
+        return [i.value for i in self.items if i.kind == "keyword"]
+
+    @property
+    def domains(self):
+        return [i.value for i in self.items if i.kind == "domain"]
+
+    def set_items(self, kind: str, values) -> None:
+        """Replace the keywords or domains of the template and update its count"""
+        values = list(values)
+        self.items = [i for i in self.items if i.kind != kind] + [
+            TemplateItem(kind=kind, position=i, value=v) for i, v in enumerate(values)
+        ]
+        setattr(self, f"{kind}_count", len(values))
+
+    def to_summary(self):
+        return {
+            "id": self.id,
+            "user_name": self.user_name,
+            "name": self.name,
+            "keyword_count": self.keyword_count,
+            "domain_count": self.domain_count,
+            "created_at": self.created_at,
+        }
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_name": self.user_name,
+            "name": self.name,
+            "keywords": self.keywords,
+            "domains": self.domains,
+            "created_at": self.created_at,
+        }
+
     def __repr__(self):
-        return f"<Template {self.name}>"
\ No newline at end of file
+        return f"<Template {self.name}>"
@@ -6,6 +6,7 @@ from .bulk import bulk_bp
 from .templates import templates_bp
 from .history import history_bp
 from .settings import settings_bp
+from .analytics import analytics_bp
 
 
 def register_blueprints(app):
@@ -20,6 +21,7 @@ def register_blueprints(app):
     app.register_blueprint(templates_bp)
     app.register_blueprint(history_bp)
     app.register_blueprint(settings_bp)
+    app.register_blueprint(analytics_bp)
 
 
 __all__ = [
@@ -28,5 +30,6 @@ __all__ = [
     'templates_bp',
     'history_bp',
     'settings_bp',
+    'analytics_bp',
     'register_blueprints',
 ]
@@ -0,0 +1,210 @@
+"""
+Ranking analytics endpoints (visibility, averages, volatility)
+"""
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+
+from config import Config
+from extensions import db
+from models import Template
+from models.dimensions import Keyword, Domain, Location, Device
+from services import analytics
+from services.dimensions import lookup_id, ids_for, values_for
+from services.timeline import date_axis
+from utils import day_range
+
+
+analytics_bp = Blueprint("analytics", __name__, url_prefix="/api/analytics")
+
+
+def _filters():
+    """location_id/device_id from the query string; False if a code is unknown"""
+    ids = {}
+    for name, model in (("location", Location), ("device", Device)):
+        value = request.args.get(name)
+        ids[name] = lookup_id(db.session, model, value) if value else None
+        if value and ids[name] is None:
+            return False
+    return ids
+
+
+def _use_rollup(start_day) -> bool:
+    """Same rule as /api/history/daily: long ranges read the daily rollup"""
+    days = (datetime.utcnow().date() - start_day).days
+    retention = Config.HISTORY_RETENTION_DAYS
+    return days > Config.DAILY_ROLLUP_THRESHOLD_DAYS or (retention > 0 and days > retention)
+
+
+def _report(columns, start_day, end_day):
+    """Metrics of the loaded columns in response shape, plus pair arrays for breakdowns"""
+    n_days = (end_day - start_day).days + 1
+    pairs, positions, checked = analytics.position_matrix(columns, start_day, n_days)
+    metrics = analytics.compute_metrics(positions, checked)
+
+    report = {
+        "start_date": start_day,
+        "end_date": end_day,
+        "summary": {k: analytics.to_value(v) for k, v in metrics["summary"].items()},
+        "daily": {
+            "dates": date_axis(start_day, end_day),
+            **{k: analytics.to_list(v) for k, v in metrics["daily"].items()},
+        },
+    }
+    return report, pairs, positions, checked, metrics["pairs"]
+
+
+def _pair_rows(pairs, pair_metrics, keywords, domains):
+    """Per-pair metric dicts, sorted by visibility (best first)"""
+    columns = {k: analytics.to_list(v) for k, v in pair_metrics.items()}
+    rows = [
+        {
+            "keyword": keywords.get(int(k)),
+            "domain": domains.get(int(d)),
+            **{name: values[i] for name, values in columns.items()},
+        }
+        for i, (k, d) in enumerate(pairs.tolist())
+    ]
+    rows.sort(key=lambda r: -(r["visibility"] or 0))
+    return rows
+
+
+@analytics_bp.route("/domain", methods=["GET"])
+def domain_analytics():
+    """
+    Visibility, average/median position, deltas and volatility of one domain
+    across every keyword it was checked for
+
+    Query params:
+        - domain: Target domain
+        - start_date / end_date: YYYY-MM-DD (default: last `days` days)
+        - days: Lookback when start_date is missing (default 30)
+        - location: Optional location code
+        - device: Optional device type
+
+    Returns:
+        {
+            "domain": "example.com",
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+            "summary": {
+                "visibility": 42.5, "avg_position": 6.3, "median_position": 5.0,
+                "volatility": 1.2, "found_rate": 0.93, "improved": 12,
+                "declined": 4, "checks": 3100
+            },
+            "daily": {
+                "dates": [...], "visibility": [...], "avg_position": [...],
+                "median_position": [...], "delta": [...], "checked": [...], "found": [...]
+            },
+            "keywords": [
+                {"keyword": "...", "domain": "...", "visibility": 61.2, "avg_position": 2.4,
+                 "median_position": 2.0, "best": 1, "worst": 5, "first": 4, "last": 2,
+                 "change": -2, "volatility": 0.8, "checks": 31, "found": 31},
+                ...
+            ]
+        }
+
+        Visibility is the CTR-weighted share (0-100) of the clicks the domain
+        would get at #1 for every check. Positive deltas/changes are drops.
+
+    Errors:
+        400: Missing domain, invalid dates, range over Config.MAX_RANGE_DAYS
+        503: NumPy not installed
+    """
+    if not analytics.available():
+        return jsonify({"error": "Analytics require NumPy"}), 503
+
+    domain = request.args.get("domain")
+    if not domain:
+        return jsonify({"error": "Thiếu domain"}), 400
+
+    try:
+        start_day, end_day = day_range(request.args, max_days=Config.MAX_RANGE_DAYS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    domain_id = lookup_id(db.session, Domain, domain)
+    filters = _filters()
+    if domain_id is None or filters is False:
+        columns = analytics.np.empty((0, 4))
+    else:
+        columns = analytics.load_columns(
+            start_day, end_day, domain_id=domain_id,
+            location_id=filters["location"], device_id=filters["device"],
+            use_rollup=_use_rollup(start_day),
+        )
+
+    report, pairs, _, _, pair_metrics = _report(columns, start_day, end_day)
+    keywords = values_for(db.session, Keyword, pairs[:, 0].tolist())
+    report["domain"] = domain
+    report["keywords"] = _pair_rows(pairs, pair_metrics, keywords, {domain_id: domain})
+    return jsonify(report)
+
+
+@analytics_bp.route("/template/<int:template_id>", methods=["GET"])
+def template_analytics(template_id):
+    """
+    Analytics of a template's keyword/domain pairs, overall and per domain
+
+    Query params: same as /api/analytics/domain (without domain)
+
+    Returns:
+        Same shape as /api/analytics/domain with "template_id" and "pairs"
+        instead of "domain"/"keywords", plus "domains":
+        [{"domain": "...", "visibility": ..., "avg_position": ..., "volatility": ..., "pairs": 5}, ...]
+
+    Errors:
+        400: Invalid dates, range over Config.MAX_RANGE_DAYS
+        404: Template not found
+        503: NumPy not installed
+    """
+    if not analytics.available():
+        return jsonify({"error": "Analytics require NumPy"}), 503
+
+    template = db.session.get(Template, template_id)
+    if not template:
+        return jsonify({"error": "Template not found"}), 404
+
+    try:
+        start_day, end_day = day_range(request.args, max_days=Config.MAX_RANGE_DAYS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    keywords, domains = template.keywords, template.domains
+    keyword_ids = ids_for(db.session, Keyword, keywords)
+    domain_ids = ids_for(db.session, Domain, domains)
+    # Same pairing as the single check stream
+    pair_ids = list({
+        (keyword_ids[k], domain_ids[d])
+        for k, d in zip(keywords, domains) if k in keyword_ids and d in domain_ids
+    })
+
+    filters = _filters()
+    if filters is False:
+        pair_ids = []
+        filters = {"location": None, "device": None}
+    columns = analytics.load_columns(
+        start_day, end_day, pair_ids=pair_ids,
+        location_id=filters["location"], device_id=filters["device"],
+        use_rollup=_use_rollup(start_day),
+    )
+
+    report, pairs, positions, checked, pair_metrics = _report(columns, start_day, end_day)
+    keyword_values = {v: k for k, v in keyword_ids.items()}
+    domain_values = {v: k for k, v in domain_ids.items()}
+
+    # Per-domain breakdown, grouped with bincount over the pair rows
+    group_ids, group_index = analytics.np.unique(pairs[:, 1], return_inverse=True)
+    groups = analytics.group_metrics(positions, checked, pair_metrics["volatility"], group_index.reshape(-1), len(group_ids))
+    group_columns = {k: analytics.to_list(v) for k, v in groups.items()}
+
+    report["template_id"] = template_id
+    report["pairs"] = _pair_rows(pairs, pair_metrics, keyword_values, domain_values)
+    report["domains"] = sorted(
+        (
+            {"domain": domain_values.get(int(d)), **{k: v[i] for k, v in group_columns.items()}}
+            for i, d in enumerate(group_ids.tolist())
+        ),
+        key=lambda r: -(r["visibility"] or 0),
+    )
+    return jsonify(report)
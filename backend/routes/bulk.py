@@ -1,23 +1,190 @@
 """
-Bulk 30-domain check endpoint
+Bulk 30-domain check endpoints
 """
 import uuid
+from itertools import islice
 from urllib.parse import urlparse
 from datetime import datetime, timezone
+from concurrent.futures import wait, FIRST_COMPLETED
+from typing import Dict, List, Tuple
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 
 from config import Config, logger
-from utils import validate_keyword
-from services import serper_search
+from utils import validate_keyword, json_dumps
+from services import serper_search, record_serps
+from services.serper import pages_in, RESULTS_PER_PAGE
+from services.check_scheduler import check_scheduler, BULK
+from services.serp_yield import plan_pages, record_yields, MAX_PAGES
 from extensions import db
-from models.rank_history import RankHistory
 
 
 # Blueprint
 bulk_bp = Blueprint('bulk', __name__)
 
 
+def _parse_request():
+    """
+    Validated bulk check parameters from the request JSON
+
+    Returns:
+        Dict with keywords (invalid ones dropped), location, device, limit and
+        api_key, or a (response, status) tuple for a 400
+    """
+    data = request.json or {}
+    keywords = data.get("keywords", [])
+    location = data.get("location", "vn")
+    device = data.get("device", "desktop")
+    limit = int(data.get("limit", 30))
+    api_key = data.get("api_key")  # Get API key from request
+
+    # Validate input
+    if not keywords or not isinstance(keywords, list):
+        return jsonify({"error": "keywords must be a non-empty array"}), 400
+
+    # Limit range: 1-100
+    if limit < 1 or limit > 100:
+        limit = 30
+
+    return {
+        "keywords": [k for k in keywords if validate_keyword(k)],
+        "location": location,
+        "device": device,
+        "limit": limit,
+        "api_key": api_key,
+    }
+
+
+def _parse_results(organic: List[Dict]) -> List[Dict]:
+    """Usable results (with a parseable link) as position/domain/url/title dicts"""
+    domains = []
+    for item in organic:
+        link = item.get("link", "")
+        title = item.get("title", "")
+
+        # Skip empty links
+        if not link:
+            continue
+
+        try:
+            parsed = urlparse(link)
+            domain = parsed.netloc.lower()
+
+            # Remove www prefix
+            if domain.startswith("www."):
+                domain = domain[4:]
+
+            domains.append({
+                "position": len(domains) + 1,  # 1, 2, 3... 30
+                "domain": domain,
+                "url": link,
+                "title": title,
+            })
+
+        except (ValueError, TypeError, AttributeError) as e:
+            # Malformed link (e.g. bad IPv6 host, non-string): skip the result
+            logger.warning(f"Skipping unparsable SERP link {link!r}: {e}")
+            continue
+    return domains
+
+
+def _top_domains(
+    keyword: str, location: str, device: str, limit: int, pages: int, api_key: str = None,
+) -> Tuple[datetime, List[Dict], int, int]:
+    """
+    Fetch the SERP of one keyword and return its top `limit` results
+
+    Fetches the `pages` planned from the keyword's observed yield (see
+    services/serp_yield.py) first, then one page at a time while there are
+    still fewer than `limit` usable results and Google has more.
+
+    Runs on a check scheduler worker.
+
+    Returns:
+        Tuple of (checked_at, [{"position": 1, "domain": "example.com", "url": "...", "title": "..."}, ...],
+        pages fetched, usable results on those pages)
+    """
+    organic = serper_search(
+        keyword, location, device, max_results=pages * RESULTS_PER_PAGE, api_key=api_key, max_pages=pages,
+    )
+    domains = _parse_results(organic)
+
+    # Planned too few pages: continue where the first fetch stopped. A short
+    # fetch (empty page) means Google has nothing more.
+    fetched = pages_in(organic)
+    exhausted = fetched < pages
+    while len(domains) < limit and not exhausted and fetched < MAX_PAGES:
+        more = serper_search(
+            keyword, location, device, max_results=RESULTS_PER_PAGE, api_key=api_key,
+            start_page=fetched + 1, max_pages=1,
+        )
+        if not more:
+            break
+        organic += more
+        domains = _parse_results(organic)
+        fetched = pages_in(organic)
+    checked_at = datetime.now(timezone.utc)
+
+    logger.info(f"Bulk check: '{keyword}' fetched {len(organic)} results in {fetched} pages (planned {pages}, target: {limit})")
+
+    top_domains = domains[:limit]
+
+    # Log result count
+    if len(top_domains) < limit:
+        logger.warning(
+            f"⚠️ Bulk check '{keyword}': Only {len(top_domains)}/{limit} results "
+            f"(fetched {len(organic)}, after filtering got {len(top_domains)})"
+        )
+    else:
+        logger.info(
+            f"✅ Bulk check '{keyword}': Got {len(top_domains)}/{limit} results"
+        )
+
+    return checked_at, top_domains, fetched, len(domains)
+
+
+def _save_serps(session_id: str, location: str, device: str, serps: List[Tuple[str, datetime, List[Dict]]]) -> None:
+    """
+    Save the top 30 domains of many keywords as SERP snapshots in one transaction
+
+    Failures are logged, not raised.
+
+    Args:
+        serps: (keyword, checked_at, top_domains) per keyword
+    """
+    if not serps:
+        return
+    try:
+        record_serps(db.session, session_id, location, device, [
+            (keyword.strip(), checked_at, [
+                (domain_info["domain"].strip(), domain_info["url"][:500])
+                for domain_info in top_domains[:30]
+            ])
+            for keyword, checked_at, top_domains in serps
+        ])
+        logger.info(f"💾 Saved bulk history: {len(serps)} keywords to DB")
+
+    except Exception as e:
+        logger.warning(f"Failed to save bulk history for {len(serps)} keywords: {e}")
+        db.session.rollback()
+
+
+def _save_yields(location: str, yields: List[Tuple[str, int, int]]) -> None:
+    """
+    Record observed per-keyword yields for the page planner
+
+    Failures are logged, not raised.
+
+    Args:
+        yields: (keyword, pages fetched, usable results) per keyword
+    """
+    try:
+        record_yields(db.session, location, yields)
+    except Exception as e:
+        logger.warning(f"Failed to save bulk yields for {len(yields)} keywords: {e}")
+        db.session.rollback()
+
+
 @bulk_bp.route("/api/bulk/check", methods=["POST"])
 def bulk_check():
     """
@@ -45,24 +212,16 @@ def bulk_check():
             ]
         }
 
+        A keyword that failed has "topDomains": [] and an "error".
+
     Errors:
         400: Invalid keywords, invalid limit
         500: Processing error
     """
-    data = request.json or {}
-    keywords = data.get("keywords", [])
-    location = data.get("location", "vn")
-    device = data.get("device", "desktop")
-    limit = int(data.get("limit", 30))
-    api_key = data.get("api_key")  # Get API key from request
-
-    # Validate input
-    if not keywords or not isinstance(keywords, list):
-        return jsonify({"error": "keywords must be a non-empty array"}), 400
-
-    # Limit range: 1-100
-    if limit < 1 or limit > 100:
-        limit = 30
+    params = _parse_request()
+    if isinstance(params, tuple):
+        return params
+    location, device = params["location"], params["device"]
 
     # Generate session_id for this bulk check
     session_id = str(uuid.uuid4())
@@ -70,93 +229,155 @@ def bulk_check():
     results = []
 
     try:
-        for keyword in keywords:
-            # Validate keyword
-            if not validate_keyword(keyword):
-                continue
-
-            # ✅ FIX: Fetch more results to ensure we get 30 valid domains
-            # With improved serper_search pagination, we now get more consistent results
-            # Fetch 50-60 to account for: empty links, parsing errors, and sparse Google results
-            fetch_count = max(50, limit + 20)  # Add 20 buffer above limit
-            organic = serper_search(keyword, location, device, max_results=fetch_count, api_key=api_key)
-
-            logger.info(f"Bulk check: '{keyword}' fetched {len(organic)} results (target: {limit})")
+        plan = plan_pages(db.session, location, params["keywords"], params["limit"])
 
-            top_domains = []
-
-            # Loop through results until we have exactly 30 valid results
-            for item in organic:
-                # Stop when we have enough results
-                if len(top_domains) >= limit:
-                    break
-
-                link = item.get("link", "")
-                title = item.get("title", "")
-
-                # Skip empty links
-                if not link:
-                    continue
-
-                try:
-                    parsed = urlparse(link)
-                    domain = parsed.netloc.lower()
-
-                    # Remove www prefix
-                    if domain.startswith("www."):
-                        domain = domain[4:]
-
-                    top_domains.append({
-                        "position": len(top_domains) + 1,  # 1, 2, 3... 30
-                        "domain": domain,
-                        "url": link,
-                        "title": title,
-                    })
-
-                except:
-                    continue
-
-            # Log result count
-            if len(top_domains) < limit:
-                logger.warning(
-                    f"⚠️ Bulk check '{keyword}': Only {len(top_domains)}/{limit} results "
-                    f"(fetched {len(organic)}, after filtering got {len(top_domains)})"
-                )
-            else:
-                logger.info(
-                    f"✅ Bulk check '{keyword}': Got {len(top_domains)}/{limit} results"
-                )
+        # Keywords run concurrently on the shared check scheduler (behind
+        # interactive checks); results keep the input order
+        futures = [
+            (keyword, check_scheduler.submit(
+                session_id, _top_domains, keyword, location, device, params["limit"], plan[keyword],
+                params["api_key"], lane=BULK,
+            ))
+            for keyword in params["keywords"]
+        ]
 
+        # A failed keyword is reported in its result; the others are still saved
+        serps, yields = [], []
+        for keyword, future in futures:
+            try:
+                checked_at, top_domains, pages, usable = future.result()
+            except Exception as e:
+                logger.warning(f"Bulk check error for '{keyword}': {e}")
+                results.append({"keyword": keyword, "topDomains": [], "error": "Processing failed"})
+                continue
             results.append({
                 "keyword": keyword,
                 "topDomains": top_domains,
             })
+            serps.append((keyword, checked_at, top_domains))
+            yields.append((keyword, pages, usable))
 
-            # Save history for this keyword (top 30 domains)
-            try:
-                for domain_info in top_domains[:30]:
-                    history = RankHistory(
-                        keyword=keyword.strip(),
-                        domain=domain_info["domain"].strip(),
-                        position=domain_info["position"],
-                        url=domain_info["url"][:500],
-                        location=location,
-                        device=device,
-                        checked_at=datetime.now(timezone.utc),
-                        session_id=session_id,
-                        check_type="bulk"
-                    )
-                    db.session.add(history)
-
-                db.session.commit()
-                logger.info(f"💾 Saved bulk history: '{keyword}' → {len(top_domains)} domains to DB")
-
-            except Exception as e:
-                logger.warning(f"Failed to save bulk history for {keyword}: {e}")
-                db.session.rollback()
+        # Save history (top 30 domains per keyword) of the keywords that
+        # succeeded as SERP snapshots, one transaction for the run
+        _save_serps(session_id, location, device, serps)
+        _save_yields(location, yields)
 
         return jsonify({"results": results})
 
     except Exception as e:
         logger.error(f"Bulk check error: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+@bulk_bp.route("/api/bulk/check/stream", methods=["POST"])
+def bulk_check_stream():
+    """
+    Streaming variant of /api/bulk/check: each keyword is sent as soon as it is done
+
+    Keywords run concurrently on the shared check scheduler (bulk lane), at
+    most Config.STREAM_WINDOW per request at a time. Closing the connection
+    drops the keywords that have not started yet. History is saved every
+    Config.BULK_SAVE_BATCH_SIZE keywords (and at the end), one transaction
+    per batch.
+
+    Request JSON: same as /api/bulk/check
+
+    Query params:
+        - format: "sse" (default) or "ndjson"
+
+    Returns:
+        text/event-stream:
+            data: {"keyword": "...", "topDomains": [...], "progress": {"done": 1, "total": 100}}
+            ...
+            : keep-alive    (comment while no keyword finishes)
+            event: end
+            data: {"session_id": "...", "done": 100, "total": 100}
+        application/x-ndjson: the same objects, one per line, with
+            {"event": "ping"} while no keyword finishes, ending with
+            {"event": "end", "session_id": "...", "done": 100, "total": 100}
+
+        A keyword that failed has "topDomains": [] and an "error".
+
+    Errors:
+        400: Invalid keywords, unknown format
+    """
+    fmt = request.args.get("format", "sse").lower()
+    if fmt not in ("sse", "ndjson"):
+        return jsonify({"error": "format must be sse or ndjson"}), 400
+
+    params = _parse_request()
+    if isinstance(params, tuple):
+        return params
+    keywords, location, device = params["keywords"], params["location"], params["device"]
+
+    session_id = str(uuid.uuid4())
+    total = len(keywords)
+    plan = plan_pages(db.session, location, keywords, params["limit"])
+
+    def frame(event: Dict) -> str:
+        if fmt == "ndjson":
+            return json_dumps(event) + "\n"
+        return f"data: {json_dumps(event)}\n\n"
+
+    @stream_with_context
+    def gen():
+        pending = iter(keywords)
+        in_flight = {}
+        unsaved, yields = [], []
+        done_count = 0
+        try:
+            while True:
+                for keyword in islice(pending, Config.STREAM_WINDOW - len(in_flight)):
+                    future = check_scheduler.submit(
+                        session_id, _top_domains, keyword, location, device, params["limit"], plan[keyword],
+                        params["api_key"], lane=BULK,
+                    )
+                    in_flight[future] = keyword
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, timeout=Config.SSE_HEARTBEAT_SECONDS, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Keep proxies from timing out while keywords are slow
+                    yield ": keep-alive\n\n" if fmt == "sse" else json_dumps({"event": "ping"}) + "\n"
+
+                for future in done:
+                    keyword = in_flight.pop(future)
+                    done_count += 1
+                    try:
+                        checked_at, top_domains, pages, usable = future.result()
+                        event = {"keyword": keyword, "topDomains": top_domains}
+                        unsaved.append((keyword, checked_at, top_domains))
+                        yields.append((keyword, pages, usable))
+                    except Exception as e:
+                        logger.warning(f"Bulk stream error for '{keyword}': {e}")
+                        event = {"keyword": keyword, "topDomains": [], "error": "Processing failed"}
+                    event["progress"] = {"done": done_count, "total": total}
+                    yield frame(event)
+
+                if len(unsaved) >= Config.BULK_SAVE_BATCH_SIZE:
+                    _save_serps(session_id, location, device, unsaved)
+                    _save_yields(location, yields)
+                    unsaved, yields = [], []
+        finally:
+            # Client gone (or finished): drop keywords that have not started,
+            # keep what was already fetched
+            for future in in_flight:
+                future.cancel()
+            _save_serps(session_id, location, device, unsaved)
+            _save_yields(location, yields)
+
+        summary = {"session_id": session_id, "done": done_count, "total": total}
+        if fmt == "ndjson":
+            yield json_dumps({"event": "end", **summary}) + "\n"
+        else:
+            yield f"event: end\ndata: {json_dumps(summary)}\n\n"
+
+    return Response(
+        gen(),
+        mimetype="application/x-ndjson" if fmt == "ndjson" else "text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable nginx buffering
+        },
+    )
@@ -1,23 +1,58 @@
 """
 History and session endpoints
 """
-from flask import Blueprint, request, jsonify
+import io
+import csv
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from datetime import datetime, timedelta
-from sqlalchemy import func
 
-from config import logger
+from config import Config, logger
+from utils import keyset_page, encode_cursor, json_dumps, json_loads, day_range
 from extensions import db
-from models.rank_history import RankHistory
+from models import Template
+from models.serp_snapshot import SerpSnapshot
+from models.check_session import CheckSession
+from models.rank_daily import RankDaily
+from models.dimensions import Keyword, Domain, Url, Location, Device
+from services.dimensions import lookup_id, ids_for, values_for
+from services.rollup import ROLLUP_FIELDS, live_daily_rows
+from services.versions import conditional_get
+from services.timeline import pair_timelines, date_axis
+from services.result_cache import history_cache, versioned_key
+from services.history_query import (
+    HISTORY_FIELDS, NEWEST_FIRST, OLDEST_FIRST, history_select, history_page, history_filters, rows_to_dicts,
+)
 
 
 history_bp = Blueprint("history", __name__, url_prefix="/api/history")
 
+# Rows fetched per round trip by /export
+EXPORT_BATCH_SIZE = 1000
+
+# /daily covers "the last N days", so its ETag and cache key also roll over this often
+DAILY_BUCKET_SECONDS = 600
+
+
+def _json_response(body: str):
+    """Response for a JSON body serialized earlier (e.g. from history_cache)"""
+    return current_app.response_class(body + "\n", mimetype="application/json")
+
 
 @history_bp.route("/daily", methods=["GET"])
+@conditional_get("rank_history", "rank_history_daily", bucket_seconds=DAILY_BUCKET_SECONDS)
 def get_daily_history():
     """
     Get daily history for a specific keyword-domain pair
 
+    Ranges longer than Config.DAILY_ROLLUP_THRESHOLD_DAYS (or reaching past the
+    raw-history retention window) are served from the rank_history_daily rollup:
+    one entry per day/location/device, with "position" being the last check of
+    the day plus best/worst/average figures.
+
+    Supports If-None-Match / If-Modified-Since (304 when no history was
+    written since). Responses are cached in history_cache until history is
+    written (or the rollup job runs, for rollup-served ranges).
+
     Query params:
         - keyword: Search keyword
         - domain: Target domain
@@ -26,6 +61,9 @@ def get_daily_history():
     Returns:
         [{"id": 1, "keyword": "...", ...}, ...]
 
+        Rollup entries additionally carry "day", "best_position",
+        "worst_position", "avg_position" and "checks" ("id" is null).
+
     Errors:
         400: Missing keyword or domain
     """
@@ -36,16 +74,207 @@ def get_daily_history():
     if not keyword or not domain:
         return jsonify({"error": "Thiếu keyword hoặc domain"}), 400
 
-    start_date = datetime.utcnow() - timedelta(days=days)
-    records = (RankHistory.query
-        .filter(RankHistory.keyword == keyword)
-        .filter(RankHistory.domain == domain)
-        .filter(RankHistory.checked_at >= start_date)
-        .order_by(RankHistory.checked_at.asc())
+    keyword_id = lookup_id(db.session, Keyword, keyword)
+    domain_id = lookup_id(db.session, Domain, domain)
+    if keyword_id is None or domain_id is None:
+        return jsonify([])
+
+    retention = Config.HISTORY_RETENTION_DAYS
+    use_rollup = days > Config.DAILY_ROLLUP_THRESHOLD_DAYS or (retention > 0 and days > retention)
+
+    def compute():
+        if use_rollup:
+            return json_dumps(_daily_from_rollup(keyword, domain, keyword_id, domain_id, days))
+
+        start_date = datetime.utcnow() - timedelta(days=days)
+        stmt = history_select(time_format="plain", where=lambda h: [
+            h.keyword_id == keyword_id,
+            h.domain_id == domain_id,
+            h.checked_at >= start_date,
+        ]).order_by(OLDEST_FIRST)
+        return json_dumps(rows_to_dicts(db.session.execute(stmt)))
+
+    bucket = int(datetime.utcnow().timestamp() // DAILY_BUCKET_SECONDS)
+    tables = ("rank_history", "rank_history_daily") if use_rollup else ("rank_history",)
+    key = versioned_key(("daily", keyword_id, domain_id, days, bucket), *tables)
+    body = history_cache.get_or_compute(key, compute)
+    return _json_response(body)
+
+
+def _daily_from_rollup(keyword, domain, keyword_id, domain_id, days):
+    """
+    Build /daily entries from the rollup table
+
+    Days still inside the scheduler's lookback window are aggregated live
+    from raw rows so the newest checks are never missing.
+    """
+    today = datetime.utcnow().date()
+    start_day = today - timedelta(days=days)
+    live_from = today - timedelta(days=Config.ROLLUP_LOOKBACK_DAYS - 1)
+
+    rows = (RankDaily.query
+        .filter(RankDaily.keyword_id == keyword_id)
+        .filter(RankDaily.domain_id == domain_id)
+        .filter(RankDaily.day >= start_day)
+        .filter(RankDaily.day < live_from)
         .all()
     )
+    rows = [{c: getattr(r, c) for c in ROLLUP_FIELDS} for r in rows]
+    rows += [dict(r) for r in live_daily_rows(keyword_id, domain_id, max(start_day, live_from), today + timedelta(days=1))]
+    rows.sort(key=lambda r: (r["day"], r["last_checked_at"]))
+
+    urls = values_for(db.session, Url, (r["last_url_id"] for r in rows))
+    locations = values_for(db.session, Location, (r["location_id"] for r in rows))
+    devices = values_for(db.session, Device, (r["device_id"] for r in rows))
+
+    return [{
+        "id": None,
+        "keyword": keyword,
+        "domain": domain,
+        "position": r["last_position"],
+        "url": urls.get(r["last_url_id"]),
+        "location": locations.get(r["location_id"]),
+        "device": devices.get(r["device_id"]),
+        "checked_at": r["last_checked_at"].strftime("%Y-%m-%d %H:%M:%S"),
+        "day": r["day"],
+        "best_position": r["best_position"],
+        "worst_position": r["worst_position"],
+        "avg_position": round(r["position_sum"] / r["found_count"], 2) if r["found_count"] else None,
+        "checks": r["check_count"],
+    } for r in rows]
+
+
+def _timeline_pairs(raw_pairs):
+    """(keyword, domain) tuples from the /timeline "pairs" field, or an error message"""
+    pairs = []
+    for p in raw_pairs or []:
+        if isinstance(p, dict):
+            keyword, domain = p.get("keyword"), p.get("domain")
+        elif isinstance(p, (list, tuple)) and len(p) == 2:
+            keyword, domain = p
+        else:
+            return None, "Each pair must be {\"keyword\", \"domain\"} or [keyword, domain]"
+        if not isinstance(keyword, str) or not isinstance(domain, str) or not keyword.strip() or not domain.strip():
+            return None, "Each pair needs a keyword and a domain"
+        pairs.append((keyword.strip(), domain.strip()))
+
+    if not pairs:
+        return None, "Thiếu pairs hoặc template_id"
+    return pairs, None
+
+
+@history_bp.route("/timeline", methods=["POST"])
+def get_timeline():
+    """
+    Per-day position series for many keyword/domain pairs in one request
+
+    Each day carries the position of the last check that day (null when the
+    domain was not found). Ranges longer than Config.DAILY_ROLLUP_THRESHOLD_DAYS
+    (or past the retention window) read the daily rollup, like /daily.
+
+    Request JSON:
+        {
+            "pairs": [{"keyword": "...", "domain": "..."}, ["kw", "domain.com"], ...],
+            "template_id": 1,              # instead of pairs
+            "start_date": "2024-01-01",    # default: end_date - days
+            "end_date": "2024-01-31",      # default: today (UTC)
+            "days": 30,
+            "location": "vn",              # optional
+            "device": "desktop",           # optional
+            "format": "aligned"            # or "points"
+        }
+
+    Returns:
+        aligned (default), one value per entry of "dates", null when unchecked:
+        {
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+            "dates": ["2024-01-01", ...],
+            "series": [{"keyword": "...", "domain": "...", "positions": [3, null, 2, ...]}, ...]
+        }
+
+        points, checked days only:
+        {
+            "start_date": "...",
+            "end_date": "...",
+            "series": [{"keyword": "...", "domain": "...", "points": [["2024-01-01", 3], ...]}, ...]
+        }
+
+    Errors:
+        400: Missing/invalid pairs, too many pairs, invalid dates or format,
+             range over Config.MAX_RANGE_DAYS
+        404: Template not found
+    """
+    data = request.json or {}
+
+    fmt = data.get("format", "aligned")
+    if fmt not in ("aligned", "points"):
+        return jsonify({"error": "format must be aligned or points"}), 400
+
+    if data.get("template_id") is not None:
+        template = db.session.get(Template, data["template_id"])
+        if not template:
+            return jsonify({"error": "Template not found"}), 404
+        keywords, domains = template.keywords, template.domains
+        # Same pairing as the single check stream
+        pairs = list(zip(keywords, domains))
+    else:
+        pairs, error = _timeline_pairs(data.get("pairs"))
+        if error:
+            return jsonify({"error": error}), 400
+    if len(pairs) > Config.TIMELINE_MAX_PAIRS:
+        return jsonify({"error": f"Too many pairs (max {Config.TIMELINE_MAX_PAIRS})"}), 400
+
+    try:
+        start_day, end_day = day_range(data, max_days=Config.MAX_RANGE_DAYS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    keyword_ids = ids_for(db.session, Keyword, (k for k, _ in pairs))
+    domain_ids = ids_for(db.session, Domain, (d for _, d in pairs))
+    pair_ids = {
+        (k, d): (keyword_ids[k], domain_ids[d])
+        for k, d in pairs if k in keyword_ids and d in domain_ids
+    }
+
+    # Unknown location/device codes match nothing
+    location_id = device_id = None
+    if data.get("location"):
+        location_id = lookup_id(db.session, Location, data["location"])
+        if location_id is None:
+            pair_ids = {}
+    if data.get("device"):
+        device_id = lookup_id(db.session, Device, data["device"])
+        if device_id is None:
+            pair_ids = {}
+
+    days = (datetime.utcnow().date() - start_day).days
+    retention = Config.HISTORY_RETENTION_DAYS
+    use_rollup = days > Config.DAILY_ROLLUP_THRESHOLD_DAYS or (retention > 0 and days > retention)
+
+    timelines = pair_timelines(
+        list(set(pair_ids.values())), start_day, end_day, location_id, device_id, use_rollup
+    )
 
-    return jsonify([r.to_dict() for r in records])
+    response = {"start_date": start_day, "end_date": end_day}
+    if fmt == "aligned":
+        dates = date_axis(start_day, end_day)
+        index = {d: i for i, d in enumerate(dates)}
+        series = []
+        for k, d in pairs:
+            positions = [None] * len(dates)
+            for day, position in timelines.get(pair_ids.get((k, d)), ()):
+                positions[index[day]] = position
+            series.append({"keyword": k, "domain": d, "positions": positions})
+        response["dates"] = dates
+    else:
+        series = [
+            {"keyword": k, "domain": d, "points": timelines.get(pair_ids.get((k, d)), [])}
+            for k, d in pairs
+        ]
+
+    response["series"] = series
+    return jsonify(response)
 
 
 @history_bp.route("/all", methods=["GET"])
@@ -60,15 +289,24 @@ def get_all_history():
         - device: Filter by device type
         - start_date: Filter by start date (ISO format)
         - end_date: Filter by end date (ISO format)
-        - limit: Max results (default 1000)
+        - limit: Max results per page (default 1000)
+        - cursor: Opaque cursor from a previous response (keyset pagination)
 
     Returns:
         {
             "results": [
                 {"id": 1, "keyword": "...", "domain": "...", ...},
                 ...
-            ]
+            ],
+            "next_cursor": "..." | null,
+            "prev_cursor": "..." | null
         }
+
+        Rows of bulk checks are expanded from their SERP snapshots and carry
+        negative ids.
+
+    Errors:
+        400: Invalid cursor
     """
     keyword = request.args.get("keyword")
     domain = request.args.get("domain")
@@ -77,55 +315,119 @@ def get_all_history():
     start_date = request.args.get("start_date")
     end_date = request.args.get("end_date")
     limit = request.args.get("limit", 1000, type=int)
+    cursor = request.args.get("cursor")
 
-    query = RankHistory.query
-
-    # Apply filters
-    if keyword:
-        query = query.filter(RankHistory.keyword.like(f"%{keyword}%"))
-    if domain:
-        query = query.filter(RankHistory.domain.like(f"%{domain}%"))
-    if location:
-        query = query.filter_by(location=location)
-    if device:
-        query = query.filter_by(device=device)
-    if start_date:
-        try:
-            start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(RankHistory.checked_at >= start_dt)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(RankHistory.checked_at <= end_dt)
-        except ValueError:
-            pass
-
-    history = query.order_by(RankHistory.checked_at.desc()).limit(limit).all()
+    limit = max(1, limit)
+
+    where = history_filters(keyword, domain, location, device, start_date, end_date)
+
+    # Without a cursor this is the first page, identical to the legacy
+    # "newest N rows" response
+    try:
+        history, next_cursor, prev_cursor = history_page(where, cursor, limit)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
 
     return jsonify({
-        "results": [{
-            "id": h.id,
-            "keyword": h.keyword,
-            "domain": h.domain,
-            "position": h.position,
-            "url": h.url,
-            "location": h.location,
-            "device": h.device,
-            "checked_at": h.checked_at.isoformat() + 'Z' if h.checked_at else None,
-        } for h in history]
+        "results": rows_to_dicts(history),
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
     })
 
 
+@history_bp.route("/export", methods=["GET"])
+def export_history():
+    """
+    Stream rank history as NDJSON or CSV
+
+    Rows are read with a Core select in batches (no ORM objects, no identity
+    map) and written out batch by batch, so memory stays flat no matter how
+    many rows match.
+
+    Query params:
+        - format: "ndjson" (default) or "csv"
+        - keyword, domain, location, device, start_date, end_date:
+          same filters as /api/history/all
+        - limit: Optional max number of rows (default: no limit)
+
+    Returns:
+        application/x-ndjson: one JSON object per line
+        text/csv: header row + one row per record
+
+    Errors:
+        400: Unknown format
+    """
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    limit = request.args.get("limit", type=int)
+
+    where = history_filters(
+        request.args.get("keyword"),
+        request.args.get("domain"),
+        request.args.get("location"),
+        request.args.get("device"),
+        request.args.get("start_date"),
+        request.args.get("end_date"),
+    )
+    stmt = history_select(where=where).order_by(NEWEST_FIRST)
+    if limit:
+        stmt = stmt.limit(max(1, limit))
+
+    @stream_with_context
+    def gen():
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(HISTORY_FIELDS)
+            yield buf.getvalue()
+
+        with db.engine.connect() as conn:
+            result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+            for batch in result.partitions():
+                if fmt == "csv":
+                    buf = io.StringIO()
+                    writer = csv.writer(buf)
+                    writer.writerows(r[:len(HISTORY_FIELDS)] for r in batch)
+                    yield buf.getvalue()
+                else:
+                    yield "".join(
+                        json_dumps(d) + "\n" for d in rows_to_dicts(batch)
+                    )
+
+    filename = f"rank_history_{datetime.utcnow():%Y%m%d_%H%M%S}.{fmt}"
+    return Response(
+        gen(),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Accel-Buffering": "no",  # Let nginx pass chunks through
+        },
+    )
+
+
 @history_bp.route("/sessions", methods=["GET"])
+@conditional_get("check_sessions")
 def get_sessions():
     """
-    Get unique check sessions grouped by session_id with pagination
+    Get check sessions with pagination
+
+    Reads the check_sessions summary table (maintained by
+    services.history_writer), one row per session/check_type/location/device.
+
+    Two pagination modes:
+        - offset (default): page/per_page, with total and total_pages
+        - keyset: pass cursor (from next_cursor/prev_cursor); deep pages
+          cost the same as the first one and total is not computed
+
+    Supports If-None-Match / If-Modified-Since (304 when unchanged).
+    Pages are cached in history_cache until the next history write.
 
     Query params:
-        - page: Page number (default 1)
+        - page: Page number (default 1, offset mode)
         - per_page: Results per page (default 20, max 100)
+        - cursor: Opaque cursor from a previous response (keyset mode)
 
     Returns:
         {
@@ -147,10 +449,15 @@ def get_sessions():
             "total": 100,
             "page": 1,
             "per_page": 20,
-            "total_pages": 5
+            "total_pages": 5,
+            "next_cursor": "..." | null
         }
 
+        Keyset mode returns "sessions", "per_page", "next_cursor" and
+        "prev_cursor" only.
+
     Errors:
+        400: Invalid cursor
         500: Database error
     """
     try:
@@ -161,70 +468,144 @@ def get_sessions():
         # Ensure valid values
         page = max(1, page)
         per_page = min(max(1, per_page), 100)  # Max 100 per page
-
-        # Base query for sessions
-        # Note: Use COALESCE to generate pseudo-session-id for old records without session_id
-        # Format: "legacy_YYYY-MM-DD_HH:MM" grouped by hour for better organization
-        base_query = db.session.query(
-            func.coalesce(
-                RankHistory.session_id,
-                func.concat('legacy_', func.strftime('%Y-%m-%d_%H', RankHistory.checked_at))
-            ).label('session_id'),
-            RankHistory.check_type,
-            func.min(RankHistory.checked_at).label('checked_at'),
-            func.count(func.distinct(RankHistory.keyword)).label('keyword_count'),
-            # For single checks: count distinct domains (user input)
-            # For bulk checks: count total records (search results)
-            db.case(
-                (RankHistory.check_type == 'single', func.count(func.distinct(RankHistory.domain))),
-                else_=func.count(RankHistory.id)
-            ).label('domain_count'),
-            func.count(RankHistory.id).label('total_records'),
-            func.sum(RankHistory.api_credits_used).label('api_credits_used'),
-            func.sum(db.case((RankHistory.position.isnot(None), 1), else_=0)).label('success_count'),
-            RankHistory.location,
-            RankHistory.device
-        ).group_by(
-            func.coalesce(
-                RankHistory.session_id,
-                func.concat('legacy_', func.strftime('%Y-%m-%d_%H', RankHistory.checked_at))
-            ),
-            RankHistory.check_type,
-            RankHistory.location,
-            RankHistory.device
+        cursor = request.args.get("cursor")
+
+        if cursor:
+            def compute():
+                rows, next_cursor, prev_cursor = keyset_page(
+                    CheckSession.query, CheckSession.checked_at, CheckSession.id, cursor, per_page
+                )
+                return json_dumps({
+                    "sessions": [s.to_dict() for s in rows],
+                    "per_page": per_page,
+                    "next_cursor": next_cursor,
+                    "prev_cursor": prev_cursor,
+                })
+
+            try:
+                body = history_cache.get_or_compute(
+                    versioned_key(("sessions", "cursor", cursor, per_page), "check_sessions"), compute,
+                )
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
+            return _json_response(body)
+
+        def compute():
+            # Sessions are pre-aggregated into check_sessions on every history
+            # write, so listing is an indexed read on a single small table
+            total = CheckSession.query.count()
+
+            sessions_query = (CheckSession.query
+                .order_by(CheckSession.checked_at.desc(), CheckSession.id.desc())
+                .limit(per_page)
+                .offset((page - 1) * per_page)
+                .all()
+            )
+
+            sessions = [s.to_dict() for s in sessions_query]
+
+            total_pages = (total + per_page - 1) // per_page  # Ceiling division
+
+            # Lets offset clients switch to keyset mode from any page
+            next_cursor = None
+            if sessions_query and page < total_pages:
+                last = sessions_query[-1]
+                next_cursor = encode_cursor(last.checked_at, last.id)
+
+            return json_dumps({
+                "sessions": sessions,
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+                "total_pages": total_pages,
+                "next_cursor": next_cursor,
+            })
+
+        body = history_cache.get_or_compute(
+            versioned_key(("sessions", "page", page, per_page), "check_sessions"), compute,
         )
-
-        # Get total count
-        total = base_query.count()
-
-        # Get paginated results
-        sessions_query = base_query.order_by(
-            func.min(RankHistory.checked_at).desc()
-        ).limit(per_page).offset((page - 1) * per_page).all()
-
-        sessions = [{
-            "session_id": s.session_id,
-            "check_type": s.check_type or "single",
-            "checked_at": s.checked_at.isoformat() + 'Z' if s.checked_at else None,
-            "keyword_count": s.keyword_count,
-            "domain_count": s.domain_count,
-            "total_records": s.total_records,
-            "api_credits_used": s.api_credits_used or 0,
-            "success": s.success_count > 0,
-            "location": s.location,
-            "device": s.device,
-        } for s in sessions_query]
-
-        total_pages = (total + per_page - 1) // per_page  # Ceiling division
-
-        return jsonify({
-            "sessions": sessions,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": total_pages
-        })
+        return _json_response(body)
 
     except Exception as e:
         logger.error(f"Error fetching sessions: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@history_bp.route("/sessions/<session_id>/serps", methods=["GET"])
+@conditional_get("check_sessions")
+def get_session_serps(session_id):
+    """
+    Stored SERPs of one bulk check session, one entry per keyword
+
+    Reads the session's serp_snapshots rows (one per keyword, found through
+    the session_id index) and resolves all their ids in one batched lookup
+    per dimension, instead of loading one history row per result.
+
+    Returns:
+        {
+            "session_id": "...",
+            "results": [
+                {
+                    "keyword": "keyword1",
+                    "location": "vn",
+                    "device": "desktop",
+                    "checked_at": "2024-01-01T00:00:00Z",
+                    "topDomains": [
+                        {"position": 1, "domain": "example.com", "url": "..."},
+                        ...
+                    ]
+                },
+                ...
+            ]
+        }
+
+    Errors:
+        404: No SERPs stored for this session
+    """
+    snapshots = (SerpSnapshot.query
+        .filter(SerpSnapshot.session_id == session_id)
+        .order_by(SerpSnapshot.checked_at.asc(), SerpSnapshot.id.asc())
+        .all()
+    )
+    if not snapshots:
+        return jsonify({"error": "Session not found"}), 404
+
+    serps = [(s, json_loads(s.domain_ids), json_loads(s.url_ids)) for s in snapshots]
+    keywords = values_for(db.session, Keyword, (s.keyword_id for s in snapshots))
+    domains = values_for(db.session, Domain, (d for _, domain_ids, _ in serps for d in domain_ids))
+    urls = values_for(db.session, Url, (u for _, _, url_ids in serps for u in url_ids))
+    locations = values_for(db.session, Location, (s.location_id for s in snapshots))
+    devices = values_for(db.session, Device, (s.device_id for s in snapshots))
+
+    return jsonify({
+        "session_id": session_id,
+        "results": [{
+            "keyword": keywords.get(s.keyword_id),
+            "location": locations.get(s.location_id),
+            "device": devices.get(s.device_id),
+            "checked_at": s.checked_at,
+            "topDomains": [
+                {"position": i + 1, "domain": domains.get(d), "url": urls.get(u)}
+                for i, (d, u) in enumerate(zip(domain_ids, url_ids))
+            ],
+        } for s, domain_ids, url_ids in serps],
+    })
+
+
+@history_bp.route("/cache-stats", methods=["GET"])
+def get_cache_stats():
+    """
+    Hit-rate metrics of the /sessions and /daily result cache
+
+    Returns:
+        {
+            "hits": 120,
+            "misses": 30,
+            "hit_rate": 0.8,
+            "evictions": 0,
+            "entries": 25,
+            "bytes": 183244,
+            "max_bytes": 33554432
+        }
+    """
+    return jsonify(history_cache.stats())
@@ -1,26 +1,26 @@
 """
 Single check SSE streaming endpoints
 """
-import json
 import time
 import secrets
-from urllib.parse import unquote_plus
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 
-from config import Config, logger
+from config import Config
 from utils import validate_keyword, validate_domain_like, chunked
-from services import process_pair
+from services.session_store import session_store
+from services.check_scheduler import check_scheduler
+from services.page_planner import planner_stats
+from services.check_jobs import JobTail, create_job, request_cancel
 from extensions import db
-from models.rank_history import RankHistory
+from models.check_job import CheckJob
 
 
 # Blueprint
 stream_bp = Blueprint('stream', __name__)
 
-# In-memory session storage
-SESSIONS = {}
+# SSE comment sent when a stream has been idle, keeps proxies from timing out
+HEARTBEAT = ": keep-alive\n\n"
 
 
 @stream_bp.route("/api/stream/save", methods=["POST"])
@@ -28,6 +28,9 @@ def save():
     """
     Save session data and generate session_id for streaming
 
+    The form is kept in the session store (see services/session_store.py)
+    for Config.SESSION_TTL_SECONDS, visible to every backend process.
+
     Request form data:
         - keywords: newline-separated keywords
         - domains: newline-separated domains
@@ -69,18 +72,59 @@ def save():
 
     # Generate session_id
     sid = f"session_{secrets.token_urlsafe(8)}_{int(time.time())}"
-    SESSIONS[sid] = form
+    session_store().put(sid, form)
 
     return jsonify({"session_id": sid})
 
 
-def process_pair_with_context(app, *args, **kwargs):
+def _last_event_id() -> int:
+    """Last-Event-ID sent by a reconnecting EventSource (or ?last_event_id=), 0 if none"""
+    value = request.headers.get("Last-Event-ID") or request.args.get("last_event_id", "")
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+
+def _tail_events(run: JobTail, after: int):
+    """SSE frames of a run, one result per event, from sequence id after onwards"""
+    done = False
+    while not done:
+        events, done = run.wait_events(after, timeout=Config.SSE_HEARTBEAT_SECONDS)
+        if not events and not done:
+            yield HEARTBEAT
+        for seq, payload in events:
+            yield f"id: {seq}\ndata: {payload}\n\n"
+            after = seq
+
+
+def _tail_batches(run: JobTail, after: int):
     """
-    Wrapper to run process_pair within Flask app context
-    Required for database operations in background threads
+    SSE frames of a run with results coalesced into JSON arrays
+
+    A frame is sent once Config.SSE_BATCH_SIZE results are pending or the
+    oldest pending one has waited Config.SSE_BATCH_INTERVAL_MS, whichever
+    comes first. The frame id is the sequence id of its last result.
     """
-    with app.app_context():
-        return process_pair(*args, **kwargs)
+    size = Config.SSE_BATCH_SIZE
+    interval = Config.SSE_BATCH_INTERVAL_MS / 1000
+    pending, first_at = [], None
+    done = False
+    while not done:
+        timeout = Config.SSE_HEARTBEAT_SECONDS if not pending else max(0.0, first_at + interval - time.monotonic())
+        events, done = run.wait_events(after, timeout=timeout)
+        if events:
+            if not pending:
+                first_at = time.monotonic()
+            pending.extend(events)
+            after = events[-1][0]
+
+        if pending and (done or len(pending) >= size or time.monotonic() - first_at >= interval):
+            for batch in chunked(pending, size):
+                yield f"id: {batch[-1][0]}\ndata: [{','.join(payload for _, payload in batch)}]\n\n"
+            pending = []
+        elif not pending and not events and not done:
+            yield HEARTBEAT
 
 
 @stream_bp.route("/api/stream")
@@ -88,70 +132,50 @@ def stream():
     """
     Server-Sent Events (SSE) endpoint for real-time ranking results
 
+    The first request of a session submits it as a background check job
+    (services/check_jobs.py); the stream is only a read-only tail of the
+    job's checkpointed results. Every result carries an event id, so a client
+    reconnecting with Last-Event-ID gets the results it missed and then
+    follows the still-running job instead of starting it over.
+
     Query params:
         - session_id: Session ID from /api/stream/save
+        - last_event_id: Resume point when the Last-Event-ID header can't be sent
+        - batch: "1" to receive results as JSON arrays, one frame per
+          SSE_BATCH_SIZE results or SSE_BATCH_INTERVAL_MS
+        - compress: "1" to gzip/brotli the stream (flushed per event)
 
     Returns:
         SSE stream with data events containing JSON results
 
     Event format:
+        id: 1
         data: {"keyword": "...", "domain": "...", "position": 5, ...}
+        (batch=1: id: 50 / data: [{"keyword": ...}, ...])
+        : keep-alive    (comment while no results arrive)
         event: end
         data: done
     """
+    sid = request.args.get("session_id", "").strip()
+    last_id = _last_event_id()
+    tail = _tail_batches if request.args.get("batch") == "1" else _tail_events
+
     @stream_with_context
     def gen():
-        sid = request.args.get("session_id", "").strip()
-
-        # Validate session
-        if not sid or sid not in SESSIONS:
-            yield 'data: {"error":"Invalid session"}\n\n'
-            yield "event: end\ndata: done\n\n"
-            return
-
-        form = SESSIONS.get(sid) or {}
-        device = form.get("device", "desktop")
-        location = form.get("location", "vn")
-        api_key = form.get("api_key")  # Get API key from session
-
-        # Parse keywords and domains
-        kws = [s.strip() for s in unquote_plus(form.get("keywords", "")).splitlines() if s.strip()]
-        doms = [s.strip() for s in unquote_plus(form.get("domains", "")).splitlines() if s.strip()]
-        pairs = list(zip(kws, doms))
-
-        try:
-            # Get current app for context
-            app = current_app._get_current_object()
-
-            # Process pairs in parallel with ThreadPoolExecutor
-            with ThreadPoolExecutor(max_workers=Config.MAX_WORKERS) as ex:
-                for batch in chunked(pairs, Config.CHUNK_SIZE):
-                    # Submit tasks with app context wrapper
-                    futs = [
-                        ex.submit(
-                            process_pair_with_context,
-                            app,
-                            k, d, location, device, sid, "single",
-                            save_to_db=True,
-                            db_session=db.session,
-                            rank_history_model=RankHistory,
-                            api_key=api_key
-                        )
-                        for k, d in batch
-                    ]
-
-                    # Stream results as they complete
-                    for f in as_completed(futs):
-                        try:
-                            row = f.result(timeout=60)
-                            yield f"data: {json.dumps(row, ensure_ascii=False)}\n\n"
-                        except Exception as e:
-                            logger.warning(f"task error: {e}")
-                            yield 'data: {"error":"Processing failed","keyword":"unknown","domain":"unknown"}\n\n'
-
-        except Exception as e:
-            logger.error(f"SSE error: {e}")
-            yield 'data: {"error":"Stream failed"}\n\n'
+        if not sid or db.session.get(CheckJob, sid) is None:
+            # Validate session (unknown or expired)
+            form = session_store().get(sid) if sid else None
+            if not form:
+                yield 'data: {"error":"Invalid session"}\n\n'
+                yield "event: end\ndata: done\n\n"
+                return
+            create_job(sid, form)
+            # The job row holds what the runner needs; drop the stored form
+            session_store().delete(sid)
+
+        # Replay what the client missed, then follow the job until it ends.
+        # Streams keep the job watched; see Config.STREAM_CANCEL_GRACE_SECONDS
+        yield from tail(JobTail(sid), last_id)
 
         # Signal completion
         yield "event: end\ndata: done\n\n"
@@ -161,3 +185,97 @@ def stream():
         "Connection": "keep-alive",
         "X-Accel-Buffering": "no",  # Disable nginx buffering for SSE
     })
+
+
+@stream_bp.route("/api/stream/cancel", methods=["POST"])
+def cancel():
+    """
+    Cancel a session's check job: queued pairs are dropped, running ones finish
+
+    Request form data (or JSON):
+        - session_id: Session ID from /api/stream/save
+
+    Returns:
+        {"session_id": "session_xxx", "cancelled": true}
+
+    Errors:
+        404: No job for this session
+    """
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    sid = (data.get("session_id") or "").strip()
+
+    cancelled = request_cancel(sid) if sid else None
+    if cancelled is None:
+        return jsonify({"error": "Session not found"}), 404
+
+    return jsonify({"session_id": sid, "cancelled": cancelled})
+
+
+@stream_bp.route("/api/stream/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """
+    State and per-pair progress of a check job
+
+    Returns:
+        {
+            "job_id": "session_xxx",
+            "state": "running",   # queued | running | done | cancelled | failed
+            "location": "vn",
+            "device": "desktop",
+            "total_pairs": 120,
+            "done_pairs": 45,
+            "created_at": "...",
+            "finished_at": null,
+            "pairs": [{"keyword": "...", "domain": "...", "state": "done"}, ...]
+        }
+
+    Errors:
+        404: Unknown job (or purged after Config.JOB_RETENTION_SECONDS)
+    """
+    job = db.session.get(CheckJob, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict(with_pairs=True))
+
+
+@stream_bp.route("/api/stream/scheduler-stats", methods=["GET"])
+def scheduler_stats():
+    """
+    Load of the shared check scheduler
+
+    Returns:
+        {
+            "max_workers": 6,
+            "running": 6,
+            "queued": 140,
+            "lanes": {
+                "interactive": {"queued": 40, "sessions": 2, "submitted": 300, "completed": 254,
+                                "failed": 0, "cancelled": 0, "wait_avg_ms": 812.4,
+                                "wait_p95_ms": 2210.0, "wait_max_ms": 3105.7},
+                "bulk": {...},
+                "scheduled": {...}
+            }
+        }
+    """
+    return jsonify(check_scheduler.stats())
+
+
+@stream_bp.route("/api/stream/planner-stats", methods=["GET"])
+def page_planner_stats():
+    """
+    Outcomes of history-guided page plans in single checks, from rank_history
+
+    Query params:
+        - days: Lookback in days (default 7)
+
+    Returns:
+        {
+            "unplanned": 120,       # checks that fetched the full top 30
+            "hits": 410,            # found on the planned pages
+            "misses": 12,           # widened to the top 30
+            "hit_rate": 0.972,
+            "planned_pages": 440    # pages fetched first by plans
+        }
+    """
+    days = max(1, request.args.get("days", 7, type=int))
+    return jsonify(planner_stats(db.session, days))
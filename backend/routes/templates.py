@@ -2,9 +2,12 @@
 Template CRUD endpoints
 """
 from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import selectinload
 
 from extensions import db
 from models import Template
+from services.versions import bump_versions, conditional_get
+from utils import keyset_page, encode_cursor
 
 
 # Blueprint
@@ -12,9 +15,15 @@ templates_bp = Blueprint('templates', __name__)
 
 
 @templates_bp.route("/api/templates", methods=["GET"])
+@conditional_get("templates")
 def get_templates():
     """
-    Get all templates
+    Get all templates with their keywords and domains
+
+    Loads every template's items (one extra query for all of them); list
+    views should use /api/templates/list instead.
+
+    Supports If-None-Match / If-Modified-Since (304 when unchanged).
 
     Returns:
         [
@@ -24,24 +33,134 @@ def get_templates():
                 "name": "My Template",
                 "keywords": ["keyword1", "keyword2"],
                 "domains": ["domain1.com", "domain2.com"],
-                "created_at": "2024-01-01T00:00:00"
+                "created_at": "2024-01-01T00:00:00Z"
             },
             ...
         ]
     """
-    templates = Template.query.order_by(Template.created_at.desc()).all()
+    templates = (Template.query
+        .options(selectinload(Template.items))
+        .order_by(Template.created_at.desc(), Template.id.desc())
+        .all()
+    )
+
+    return jsonify([t.to_dict() for t in templates])
+
+
+@templates_bp.route("/api/templates/list", methods=["GET"])
+@conditional_get("templates")
+def list_templates():
+    """
+    List templates with keyword/domain counts only
+
+    Reads the templates table alone (counts are cached on each template),
+    so the cost depends on the page size, not on how many keywords the
+    templates hold.
+
+    Two pagination modes, like /api/history/sessions:
+        - offset (default): page/per_page, with total and total_pages
+        - keyset: pass cursor (from next_cursor/prev_cursor)
+
+    Query params:
+        - page: Page number (default 1, offset mode)
+        - per_page: Results per page (default 20, max 100)
+        - cursor: Opaque cursor from a previous response (keyset mode)
+
+    Returns:
+        {
+            "templates": [
+                {
+                    "id": 1,
+                    "user_name": "user1",
+                    "name": "My Template",
+                    "keyword_count": 25,
+                    "domain_count": 25,
+                    "created_at": "2024-01-01T00:00:00Z"
+                },
+                ...
+            ],
+            "total": 42,
+            "page": 1,
+            "per_page": 20,
+            "total_pages": 3,
+            "next_cursor": "..." | null
+        }
+
+        Keyset mode returns "templates", "per_page", "next_cursor" and
+        "prev_cursor" only.
+
+    Errors:
+        400: Invalid cursor
+    """
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = min(max(1, request.args.get("per_page", 20, type=int)), 100)
+    cursor = request.args.get("cursor")
+
+    if cursor:
+        try:
+            rows, next_cursor, prev_cursor = keyset_page(
+                Template.query, Template.created_at, Template.id, cursor, per_page
+            )
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        return jsonify({
+            "templates": [t.to_summary() for t in rows],
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        })
+
+    total = Template.query.count()
+    templates = (Template.query
+        .order_by(Template.created_at.desc(), Template.id.desc())
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+        .all()
+    )
+    total_pages = (total + per_page - 1) // per_page
+
+    # Lets offset clients switch to keyset mode from any page
+    next_cursor = None
+    if templates and page < total_pages:
+        last = templates[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return jsonify({
+        "templates": [t.to_summary() for t in templates],
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+        "next_cursor": next_cursor,
+    })
+
+
+@templates_bp.route("/api/templates/<int:template_id>", methods=["GET"])
+@conditional_get("templates")
+def get_template(template_id):
+    """
+    Get one template with its keywords and domains
 
-    return jsonify([
+    Returns:
         {
-            "id": t.id,
-            "user_name": t.user_name,
-            "name": t.name,
-            "keywords": [k.strip() for k in t.keywords.split("\n") if k.strip()],
-            "domains": [d.strip() for d in t.domains.split("\n") if d.strip()],
-            "created_at": t.created_at.isoformat() + 'Z' if t.created_at else None
+            "id": 1,
+            "user_name": "user1",
+            "name": "My Template",
+            "keywords": ["keyword1", "keyword2"],
+            "domains": ["domain1.com", "domain2.com"],
+            "keyword_count": 2,
+            "domain_count": 2,
+            "created_at": "2024-01-01T00:00:00Z"
         }
-        for t in templates
-    ])
+
+    Errors:
+        404: Template not found
+    """
+    template = db.session.get(Template, template_id)
+    if not template:
+        return jsonify({"error": "Template not found"}), 404
+
+    return jsonify({**template.to_summary(), **template.to_dict()})
 
 
 @templates_bp.route("/api/templates", methods=["POST"])
@@ -79,25 +198,19 @@ def create_template():
     template = Template(
         user_name=data["user_name"].strip(),
         name=data["name"].strip(),
-        keywords="\n".join(keywords),
-        domains="\n".join(domains),
     )
+    template.set_items("keyword", keywords)
+    template.set_items("domain", domains)
 
     db.session.add(template)
+    bump_versions(db.session, "templates")
     db.session.commit()
 
     # Return the created template with full data
     return jsonify({
         "message": "Tạo template thành công",
         "id": template.id,
-        "template": {
-            "id": template.id,
-            "user_name": template.user_name,
-            "name": template.name,
-            "keywords": keywords,
-            "domains": domains,
-            "created_at": template.created_at.isoformat() + 'Z' if template.created_at else None
-        }
+        "template": template.to_dict(),
     }), 201
 
 
@@ -130,33 +243,25 @@ def update_template(template_id):
         template.name = data["name"].strip()
 
     if "keywords" in data:
-        keywords = [k.strip() for k in data.get("keywords", []) if k.strip()]
-        template.keywords = "\n".join(keywords)
+        template.set_items("keyword", (k.strip() for k in data.get("keywords", []) if k.strip()))
 
     if "domains" in data:
-        domains = [d.strip() for d in data.get("domains", []) if d.strip()]
-        template.domains = "\n".join(domains)
+        template.set_items("domain", (d.strip() for d in data.get("domains", []) if d.strip()))
 
+    bump_versions(db.session, "templates")
     db.session.commit()
 
     # Return updated template data
     return jsonify({
         "message": "Cập nhật thành công",
-        "template": {
-            "id": template.id,
-            "user_name": template.user_name,
-            "name": template.name,
-            "keywords": [k.strip() for k in template.keywords.split("\n") if k.strip()],
-            "domains": [d.strip() for d in template.domains.split("\n") if d.strip()],
-            "created_at": template.created_at.isoformat() + 'Z' if template.created_at else None
-        }
+        "template": template.to_dict(),
     })
 
 
 @templates_bp.route("/api/templates/<int:template_id>", methods=["DELETE"])
 def delete_template(template_id):
     """
-    Delete template
+    Delete template (and its keyword/domain items)
 
     Returns:
         {"message": "Đã xóa template"}
@@ -166,6 +271,7 @@ def delete_template(template_id):
     """
     template = Template.query.get_or_404(template_id)
     db.session.delete(template)
+    bump_versions(db.session, "templates")
     db.session.commit()
 
     return jsonify({"message": "Đã xóa template"})
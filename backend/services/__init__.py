@@ -3,8 +3,11 @@ Business logic services for Ranking Checker
 """
 from .serper import serper_search
 from .ranking import process_pair
+from .history_writer import record_history, record_serps
 
 __all__ = [
     'serper_search',
     'process_pair',
+    'record_history',
+    'record_serps',
 ]
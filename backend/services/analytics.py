@@ -0,0 +1,368 @@
+"""
+Vectorized ranking analytics
+
+History for a domain or a template is loaded as flat NumPy columns and turned
+into a dense pairs x days position matrix (last check of each day, NaN when
+not found); every metric is then a whole-array operation:
+
+    - visibility: CTR-weighted share of the clicks the pairs could get if
+      they all ranked #1 (0-100)
+    - average / median position over found checks
+    - deltas: position change against the previous found check
+      (positive = dropped), i.e. day-over-day for daily checks
+    - volatility: mean absolute delta per pair
+
+NumPy is optional; available() is False without it and the analytics
+endpoints answer 503.
+"""
+import warnings
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+from extensions import db
+from .history_source import history_rows_sql
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Organic CTR by position 1-10 (index 0 = not found), then a flat tail
+CTR_TOP_10 = (0.0, 0.398, 0.187, 0.102, 0.072, 0.051, 0.044, 0.030, 0.021, 0.019, 0.016)
+CTR_11_20 = 0.010
+CTR_21_30 = 0.005
+MAX_CTR_POSITION = 100
+
+_EPOCH = date(1970, 1, 1)
+
+# Source rows: (keyword_id, domain_id, checked_at as fractional unix days, position).
+# Days before :live_day come from the rollup (its last check of the day).
+_COLUMNS_SQL = """
+    {with_clause}
+    SELECT r.keyword_id, r.domain_id, julianday(r.last_checked_at) - 2440587.5, r.last_position
+    FROM rank_history_daily r {rollup_join}
+    WHERE r.day >= :start_day AND r.day < :live_day {rollup_filters}
+    UNION ALL
+    SELECT keyword_id, domain_id, julianday(checked_at) - 2440587.5, position
+    FROM ({raw_rows}) AS raw
+"""
+
+_FETCH_SIZE = 100_000
+
+# Largest id indexed with a presence table instead of a sort
+_DENSE_INDEX_LIMIT = 50_000_000
+
+
+def available() -> bool:
+    """Whether NumPy is installed"""
+    return np is not None
+
+
+def ctr_curve():
+    """CTR per position as an array indexed by position (0 = not found)"""
+    curve = np.zeros(MAX_CTR_POSITION + 1)
+    curve[:len(CTR_TOP_10)] = CTR_TOP_10
+    curve[11:21] = CTR_11_20
+    curve[21:31] = CTR_21_30
+    return curve
+
+
+def load_columns(
+    start_day: date,
+    end_day: date,
+    domain_id: Optional[int] = None,
+    pair_ids: Optional[Sequence[Tuple[int, int]]] = None,
+    location_id: Optional[int] = None,
+    device_id: Optional[int] = None,
+    use_rollup: bool = False,
+):
+    """
+    Load history rows of a domain or a set of pairs as one float64 array
+
+    Rows are fetched straight from the DBAPI cursor in large batches, with
+    no per-row ORM or Row objects.
+
+    Args:
+        start_day: First day (UTC)
+        end_day: Last day (UTC), inclusive
+        domain_id: All keywords of this domain
+        pair_ids: Or only these (keyword_id, domain_id) pairs
+        location_id: Only checks from this location
+        device_id: Only checks from this device
+        use_rollup: Read days older than the rollup lookback from rank_history_daily
+
+    Returns:
+        Array of shape (n, 4): keyword_id, domain_id, time (unix days), position (NaN = not found)
+    """
+    live_day = start_day
+    if use_rollup:
+        today = datetime.utcnow().date()
+        live_day = min(max(start_day, today - timedelta(days=Config.ROLLUP_LOOKBACK_DAYS - 1)), end_day + timedelta(days=1))
+
+    params = {
+        "start_day": start_day.isoformat(),
+        "live_day": live_day.isoformat(),
+        "live": f"{live_day.isoformat()} 00:00:00",
+        "end": f"{(end_day + timedelta(days=1)).isoformat()} 00:00:00",
+    }
+    with_clause = rollup_join = raw_join = ""
+    rollup_filters, raw_filters = [], []
+
+    if pair_ids is not None:
+        if not pair_ids:
+            return np.empty((0, 4))
+        values = []
+        for i, (keyword_id, pair_domain_id) in enumerate(pair_ids):
+            values.append(f"(:k{i}, :d{i})")
+            params[f"k{i}"] = keyword_id
+            params[f"d{i}"] = pair_domain_id
+        with_clause = f"WITH wanted(keyword_id, domain_id) AS (VALUES {', '.join(values)})"
+        rollup_join = "JOIN wanted w ON r.keyword_id = w.keyword_id AND r.domain_id = w.domain_id"
+        raw_join = "JOIN wanted w ON w.keyword_id = {keyword_id} AND w.domain_id = {domain_id}"
+    else:
+        rollup_filters.append("AND r.domain_id = :domain_id")
+        raw_filters.append("AND {domain_id} = :domain_id")
+        params["domain_id"] = domain_id
+
+    if location_id is not None:
+        rollup_filters.append("AND r.location_id = :location_id")
+        raw_filters.append("AND {location_id} = :location_id")
+        params["location_id"] = location_id
+    if device_id is not None:
+        rollup_filters.append("AND r.device_id = :device_id")
+        raw_filters.append("AND {device_id} = :device_id")
+        params["device_id"] = device_id
+
+    raw_rows = history_rows_sql(
+        ["keyword_id", "domain_id", "position", "checked_at"],
+        where=" ".join(["{checked_at} >= :live AND {checked_at} < :end"] + raw_filters),
+        join=raw_join,
+    )
+    sql = _COLUMNS_SQL.format(
+        with_clause=with_clause,
+        rollup_join=rollup_join,
+        rollup_filters=" ".join(rollup_filters),
+        raw_rows=raw_rows,
+    )
+
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(_FETCH_SIZE)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.float64))
+    finally:
+        cursor.close()
+
+    return np.concatenate(chunks) if chunks else np.empty((0, 4))
+
+
+def _dense_index(values):
+    """
+    np.unique(values, return_inverse=True) without sorting, for small non-negative ids
+
+    Dimension ids are dense, so a presence table indexed by id replaces the
+    O(n log n) sort; falls back to np.unique for sparse/large values.
+    """
+    if values.size == 0 or values.max() > _DENSE_INDEX_LIMIT:
+        uniques, inverse = np.unique(values, return_inverse=True)
+        return uniques, inverse.reshape(-1)
+
+    present = np.zeros(int(values.max()) + 1, dtype=bool)
+    present[values] = True
+    uniques = np.flatnonzero(present)
+    lookup = np.zeros(len(present), dtype=np.int64)
+    lookup[uniques] = np.arange(len(uniques))
+    return uniques, lookup[values]
+
+
+def position_matrix(columns, start_day: date, n_days: int):
+    """
+    Dense pairs x days matrix of the last position checked each day
+
+    Args:
+        columns: Array from load_columns()
+        start_day: Day of column 0
+        n_days: Number of day columns
+
+    Returns:
+        (pairs, positions, checked): pairs is an (n_pairs, 2) int array of
+        (keyword_id, domain_id); positions is float with NaN where not found
+        or not checked; checked is a bool mask of checked cells
+    """
+    times = columns[:, 2]
+    positions = columns[:, 3]
+
+    keyword_values, keyword_index = _dense_index(columns[:, 0].astype(np.int64))
+    domain_values, domain_index = _dense_index(columns[:, 1].astype(np.int64))
+    pair_values, pair_index = _dense_index(keyword_index * len(domain_values) + domain_index)
+
+    day_index = np.clip(np.floor(times).astype(np.int64) - (start_day - _EPOCH).days, 0, n_days - 1)
+    cells = pair_index * n_days + day_index
+
+    # Last check per cell: scatter the max time, keep the rows that hold it
+    n_pairs = len(pair_values)
+    latest_time = np.full(n_pairs * n_days, -np.inf)
+    np.maximum.at(latest_time, cells, times)
+    latest = times == latest_time[cells]
+
+    matrix = np.full(n_pairs * n_days, np.nan)
+    matrix[cells[latest]] = positions[latest]
+    checked = np.zeros(n_pairs * n_days, dtype=bool)
+    checked[cells] = True
+
+    pairs = np.stack([
+        keyword_values[pair_values // len(domain_values)],
+        domain_values[pair_values % len(domain_values)],
+    ], axis=1)
+    return pairs, matrix.reshape(n_pairs, n_days), checked.reshape(n_pairs, n_days)
+
+
+def compute_metrics(positions, checked) -> Dict:
+    """
+    All metrics for a pairs x days position matrix
+
+    Args:
+        positions: Matrix from position_matrix() (NaN = not found / not checked)
+        checked: Checked-cell mask from position_matrix()
+
+    Returns:
+        {
+            "summary": {visibility, avg_position, median_position, volatility,
+                        found_rate, improved, declined, checks},
+            "daily": {visibility, avg_position, median_position, delta, checked, found},
+            "pairs": {visibility, avg_position, median_position, best, worst, first,
+                      last, change, volatility, checks, found}
+        }
+        Values are NumPy scalars/arrays (NaN where undefined).
+    """
+    n_pairs, n_days = positions.shape
+    curve = ctr_curve()
+    found = ~np.isnan(positions)
+
+    with warnings.catch_warnings():
+        # All-NaN rows/columns are expected (days without checks)
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        ranks = np.clip(np.nan_to_num(positions, nan=0.0), 0, MAX_CTR_POSITION).astype(np.int64)
+        ctr = curve[ranks]
+        best_ctr = curve[1]
+
+        # Previous found position of each cell, via a forward fill of column indexes
+        found_at = np.where(found, np.arange(n_days), -1)
+        last_found = np.maximum.accumulate(found_at, axis=1)
+        previous = np.concatenate([np.full((n_pairs, 1), -1), last_found[:, :-1]], axis=1)
+        previous_positions = np.take_along_axis(positions, np.maximum(previous, 0), axis=1)
+        previous_positions[previous < 0] = np.nan
+        deltas = positions - previous_positions
+        abs_deltas = np.abs(deltas)
+
+        checks_per_day = checked.sum(axis=0)
+        found_per_day = found.sum(axis=0)
+        checks_per_pair = checked.sum(axis=1)
+        found_per_pair = found.sum(axis=1)
+
+        daily = {
+            "visibility": 100 * ctr.sum(axis=0) / (checks_per_day * best_ctr),
+            "avg_position": np.nansum(positions, axis=0) / found_per_day,
+            "median_position": np.nanmedian(positions, axis=0),
+            "delta": np.nanmean(deltas, axis=0),
+            "checked": checks_per_day,
+            "found": found_per_day,
+        }
+
+        last_index = last_found[:, -1]
+        first_index = np.where(found, np.arange(n_days), n_days).min(axis=1)
+        rows = np.arange(n_pairs)
+        last = np.where(last_index >= 0, positions[rows, np.maximum(last_index, 0)], np.nan)
+        first = np.where(first_index < n_days, positions[rows, np.minimum(first_index, n_days - 1)], np.nan)
+        pair_volatility = np.nanmean(abs_deltas, axis=1)
+
+        pairs = {
+            "visibility": 100 * ctr.sum(axis=1) / (checks_per_pair * best_ctr),
+            "avg_position": np.nansum(positions, axis=1) / found_per_pair,
+            "median_position": np.nanmedian(positions, axis=1),
+            "best": np.nanmin(positions, axis=1),
+            "worst": np.nanmax(positions, axis=1),
+            "first": first,
+            "last": last,
+            "change": last - first,
+            "volatility": pair_volatility,
+            "checks": checks_per_pair,
+            "found": found_per_pair,
+        }
+
+        total_checks = checks_per_pair.sum()
+        summary = {
+            "visibility": 100 * ctr.sum() / (total_checks * best_ctr) if total_checks else np.nan,
+            "avg_position": np.nanmean(positions) if found.any() else np.nan,
+            "median_position": np.nanmedian(positions) if found.any() else np.nan,
+            "volatility": np.nanmean(pair_volatility),
+            "found_rate": found.sum() / total_checks if total_checks else np.nan,
+            "improved": int((pairs["change"] < 0).sum()),
+            "declined": int((pairs["change"] > 0).sum()),
+            "checks": int(total_checks),
+        }
+
+    return {"summary": summary, "daily": daily, "pairs": pairs}
+
+
+def group_metrics(positions, checked, pair_volatility, group_index, n_groups: int) -> Dict:
+    """
+    Visibility, average position and volatility per group of pairs (e.g. per domain)
+
+    Args:
+        positions: Matrix from position_matrix()
+        checked: Checked-cell mask
+        pair_volatility: compute_metrics()["pairs"]["volatility"]
+        group_index: Group number of each pair row
+        n_groups: Number of groups
+
+    Returns:
+        Dict of metric -> array of length n_groups
+    """
+    found = ~np.isnan(positions)
+    ctr = ctr_curve()[np.clip(np.nan_to_num(positions, nan=0.0), 0, MAX_CTR_POSITION).astype(np.int64)]
+
+    def total(weights):
+        return np.bincount(group_index, weights=weights, minlength=n_groups)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        has_volatility = ~np.isnan(pair_volatility)
+        return {
+            "visibility": 100 * total(ctr.sum(axis=1)) / (total(checked.sum(axis=1)) * ctr_curve()[1]),
+            "avg_position": total(np.nansum(positions, axis=1)) / total(found.sum(axis=1)),
+            "volatility": total(np.where(has_volatility, pair_volatility, 0)) / total(has_volatility),
+            "pairs": total(np.ones(len(group_index))).astype(np.int64),
+        }
+
+
+def to_list(values, digits: int = 2) -> List:
+    """
+    JSON-ready list from a NumPy array (NaN -> None, floats rounded)
+
+    Args:
+        values: 1-d array
+        digits: Decimal places for floats
+
+    Returns:
+        List of int/float/None
+    """
+    if values.dtype.kind in "iub":
+        return values.tolist()
+    rounded = np.round(values, digits)
+    return [None if v != v else v for v in rounded.tolist()]
+
+
+def to_value(value, digits: int = 2):
+    """JSON-ready scalar (NaN -> None, floats rounded)"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    value = float(value)
+    return None if value != value else round(value, digits)
@@ -0,0 +1,436 @@
+"""
+Persistent single-check jobs and their background runner
+
+/api/stream turns a saved session into a check_jobs row with one
+check_job_pairs row per keyword/domain pair. A runner thread in the serving
+process (started from app.py's __main__) claims queued jobs and runs their
+pairs on the shared check scheduler, checkpointing each finished pair (its
+result and SSE event id) as it completes. Jobs therefore no longer depend on the HTTP request: the
+stream is only a read-only tail of the checkpoints (JobTail), and a job
+whose owner died (crash, restart, deploy) stops heartbeating and is claimed
+again by a runner, which resumes with the pairs that were not checkpointed.
+
+A claim stores the runner's owner token, and the runner's heartbeat,
+checkpoint and finish updates only match while it is still the owner. A
+runner that stalled past Config.JOB_STALE_SECONDS and lost the job to
+another one sees its update match no row and stops, dropping its in-flight
+results, instead of writing checkpoints alongside the new owner.
+
+A pair whose history row was written just before a crash, but not yet
+checkpointed, is checked again on resume.
+
+API keys: like stream sessions (services/session_store.py), a job's
+submitted API key is kept only in the memory of the process that created it
+(check_jobs.has_api_key records that there was one). A job resumed without
+its key (after a restart) fails with an error event instead of running on
+another key.
+
+Cancellation: POST /api/stream/cancel sets cancel_requested, and a job
+nobody has tailed for Config.STREAM_CANCEL_GRACE_SECONDS (tab closed) is
+cancelled too. Queued pairs are dropped; running ones finish.
+"""
+import os
+import time
+import uuid
+import socket
+import threading
+from datetime import datetime, timedelta
+from itertools import islice
+from concurrent.futures import wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote_plus
+
+from sqlalchemy import select, update, delete, or_, and_
+from sqlalchemy.exc import IntegrityError
+
+from config import Config, logger
+from extensions import db
+from models.check_job import CheckJob, CheckJobPair
+from models.rank_history import RankHistory
+from utils import json_dumps
+from .ranking import process_pair
+from .check_scheduler import check_scheduler, INTERACTIVE
+from .session_store import MemorySessionStore
+
+
+TERMINAL_STATES = ("done", "cancelled", "failed")
+
+# Final event of jobs that did not complete
+_FINAL_MESSAGES = {
+    "cancelled": '{"error":"Cancelled"}',
+    "failed": '{"error":"Stream failed"}',
+}
+# Final event of a job whose row is gone (purged after JOB_RETENTION_SECONDS)
+_NOT_FOUND_MESSAGE = '{"error":"Job not found"}'
+
+# Job id -> {"api_key": ...} of jobs created in this process
+_job_keys = MemorySessionStore(Config.JOB_RETENTION_SECONDS, Config.SESSION_MAX_ENTRIES)
+
+# Error event of a job resumed without the API key it was submitted with
+KEY_LOST_ERROR = "API key of this job is no longer available (server restarted), please run the check again"
+
+# Woken by each checkpoint so tails in this process see progress immediately;
+# tails of jobs running in other processes fall back to polling
+_progress = threading.Condition()
+
+
+def create_job(session_id: str, form: Dict[str, str]) -> bool:
+    """
+    Store the job of a saved /api/stream session
+
+    Args:
+        session_id: Stream session id (becomes the job id)
+        form: Form saved by /api/stream/save
+
+    Returns:
+        True if created, False if the job already existed
+    """
+    kws = [s.strip() for s in unquote_plus(form.get("keywords", "")).splitlines() if s.strip()]
+    doms = [s.strip() for s in unquote_plus(form.get("domains", "")).splitlines() if s.strip()]
+    pairs = list(zip(kws, doms))
+    api_key = form.get("api_key")
+
+    job = CheckJob(
+        id=session_id,
+        location=form.get("location", "vn"),
+        device=form.get("device", "desktop"),
+        has_api_key=bool(api_key),
+        total_pairs=len(pairs),
+        watched_at=time.time(),
+    )
+    job.pairs = [
+        CheckJobPair(position=i, keyword=keyword, domain=domain)
+        for i, (keyword, domain) in enumerate(pairs)
+    ]
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request (or process) created it first
+        db.session.rollback()
+        return False
+
+    if api_key:
+        _job_keys.put(session_id, {"api_key": api_key})
+    job_runner.wake()
+    return True
+
+
+def request_cancel(job_id: str) -> Optional[bool]:
+    """
+    Ask the job's runner to stop
+
+    Returns:
+        True if the job was still active, False if it had already ended,
+        None if there is no such job
+    """
+    job = db.session.get(CheckJob, job_id)
+    if job is None:
+        return None
+    if job.state in TERMINAL_STATES:
+        return False
+
+    job.cancel_requested = True
+    db.session.commit()
+    return True
+
+
+class JobTail:
+    """
+    Read side of a job for /api/stream
+
+    wait_events() returns checkpointed results after a given event id, in
+    event id order, so the stream can replay from Last-Event-ID and then
+    follow the job. Every call marks the job as watched.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._touched_at = 0.0
+
+    def _touch(self) -> None:
+        now = time.time()
+        if now - self._touched_at >= Config.JOB_HEARTBEAT_SECONDS:
+            db.session.execute(update(CheckJob).where(CheckJob.id == self.job_id).values(watched_at=now))
+            db.session.commit()
+            self._touched_at = now
+
+    def _read(self, after: int) -> Tuple[List[Tuple[int, str]], Optional[str], int, Optional[str]]:
+        """Events after an event id, and the job's state (None if the job is gone), done_pairs and error"""
+        # State first: once it is terminal, every checkpoint is already visible
+        job = db.session.execute(
+            select(CheckJob.state, CheckJob.done_pairs, CheckJob.error).where(CheckJob.id == self.job_id)
+        ).one_or_none()
+        if job is None:
+            db.session.commit()
+            return [], None, 0, None
+        state, done_pairs, error = job
+        events = db.session.execute(
+            select(CheckJobPair.event_id, CheckJobPair.result)
+            .where(CheckJobPair.job_id == self.job_id, CheckJobPair.event_id > after)
+            .order_by(CheckJobPair.event_id)
+        ).all()
+        db.session.commit()  # end the read transaction so the next poll sees new rows
+        return [tuple(e) for e in events], state, done_pairs, error
+
+    def wait_events(self, after: int, timeout: float) -> Tuple[List[Tuple[int, str]], bool]:
+        """
+        Results with an event id above after, waiting up to timeout for one
+
+        Returns (events, done), done being True once the returned events end
+        a finished job. Cancelled/failed jobs end with one error event, and
+        so does a job whose row no longer exists.
+        """
+        self._touch()
+        deadline = time.monotonic() + timeout
+        while True:
+            events, state, done_pairs, error = self._read(after)
+            if state is None:
+                return [(after + 1, _NOT_FOUND_MESSAGE)], True
+            if state in TERMINAL_STATES:
+                final = json_dumps({"error": error}) if error else _FINAL_MESSAGES.get(state)
+                if final and after <= done_pairs:
+                    events.append((done_pairs + 1, final))
+                return events, True
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events, False
+            with _progress:
+                _progress.wait(min(remaining, Config.JOB_POLL_INTERVAL_MS / 1000))
+
+
+def _check_pair(app, job: Dict, keyword: str, domain: str) -> Dict:
+    """Check one pair on a scheduler worker (within an app context for the history write)"""
+    with app.app_context():
+        return process_pair(
+            keyword, domain, job["location"], job["device"], job["id"], "single",
+            save_to_db=True,
+            db_session=db.session,
+            rank_history_model=RankHistory,
+            api_key=job["api_key"],
+        )
+
+
+class JobRunner:
+    """Claims runnable jobs and runs each in its own thread"""
+
+    def __init__(self):
+        self._app = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._active = set()
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def start(self, app) -> None:
+        if self._app is not None:
+            return
+        self._app = app
+        threading.Thread(target=self._loop, name="check-job-runner", daemon=True).start()
+
+    def wake(self) -> None:
+        """Look for runnable jobs now instead of at the next poll"""
+        self._wakeup.set()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                with self._app.app_context():
+                    for job_id in self._claim():
+                        with self._lock:
+                            self._active.add(job_id)
+                        threading.Thread(
+                            target=self._run, args=(job_id,), name=f"check-job-{job_id}", daemon=True,
+                        ).start()
+                    self._purge()
+            except Exception as e:
+                logger.error(f"Job runner error: {e}")
+
+            self._wakeup.wait(Config.JOB_HEARTBEAT_SECONDS)
+            self._wakeup.clear()
+
+    def _claimable(self, now: float):
+        """Queued jobs, and running jobs whose owner stopped heartbeating"""
+        return or_(
+            CheckJob.state == "queued",
+            and_(CheckJob.state == "running", CheckJob.heartbeat_at < now - Config.JOB_STALE_SECONDS),
+        )
+
+    def _claim(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            active = set(self._active)
+        candidates = db.session.execute(
+            select(CheckJob.id, CheckJob.state).where(self._claimable(now)).order_by(CheckJob.created_at)
+        ).all()
+
+        claimed = []
+        for job_id, state in candidates:
+            if job_id in active:
+                continue
+            # Atomic: only one runner wins a job
+            won = db.session.execute(
+                update(CheckJob)
+                .where(CheckJob.id == job_id, self._claimable(now))
+                .values(state="running", heartbeat_at=now, owner=self.owner)
+            ).rowcount
+            db.session.commit()
+            if won:
+                if state == "running":
+                    logger.info(f"Resuming check job {job_id} from its checkpoint")
+                claimed.append(job_id)
+        return claimed
+
+    def _purge(self) -> None:
+        """Delete jobs that ended more than Config.JOB_RETENTION_SECONDS ago"""
+        if time.time() - self._purged_at < 60:
+            return
+        self._purged_at = time.time()
+
+        expired = select(CheckJob.id).where(
+            CheckJob.state.in_(TERMINAL_STATES),
+            CheckJob.finished_at < datetime.utcnow() - timedelta(seconds=Config.JOB_RETENTION_SECONDS),
+        )
+        db.session.execute(delete(CheckJobPair).where(CheckJobPair.job_id.in_(expired)))
+        db.session.execute(delete(CheckJob).where(CheckJob.id.in_(expired)))
+        db.session.commit()
+
+    def _owned(self, job_id: str):
+        """Condition matching the job only while this runner owns it"""
+        return and_(CheckJob.id == job_id, CheckJob.owner == self.owner)
+
+    def _run(self, job_id: str) -> None:
+        try:
+            with self._app.app_context():
+                state = self._execute(job_id)
+                if state is not None:
+                    self._finish(job_id, state)
+        except Exception as e:
+            logger.error(f"Check job {job_id} failed: {e}")
+            with self._app.app_context():
+                db.session.rollback()
+                self._finish(job_id, "failed")
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            with _progress:
+                _progress.notify_all()
+
+    def _finish(self, job_id: str, state: str, error: Optional[str] = None) -> None:
+        owned = db.session.execute(
+            update(CheckJob).where(self._owned(job_id))
+            .values(state=state, finished_at=datetime.utcnow(), error=error)
+        ).rowcount
+        db.session.commit()
+        if owned:
+            _job_keys.delete(job_id)
+            logger.info(f"Check job {job_id} {state}")
+        else:
+            logger.warning(f"Check job {job_id} was claimed by another runner, not marking it {state}")
+
+    def _lost(self, job_id: str, in_flight: Dict) -> None:
+        """Stop a job another runner claimed (or that was deleted): no further writes, drop in-flight pairs"""
+        db.session.rollback()
+        for f in in_flight:
+            f.cancel()
+        logger.warning(f"Check job {job_id} was claimed by another runner or deleted, stopping")
+
+    def _execute(self, job_id: str) -> Optional[str]:
+        """Run the job's unchecked pairs; returns the final state, None if the job was lost or already finished"""
+        row = db.session.get(CheckJob, job_id)
+        if row is None:
+            self._lost(job_id, {})
+            return None
+        api_key = (_job_keys.get(job_id) or {}).get("api_key")
+        if row.has_api_key and not api_key:
+            db.session.commit()
+            self._finish(job_id, "failed", KEY_LOST_ERROR)
+            return None
+        job = {"id": row.id, "location": row.location, "device": row.device, "api_key": api_key}
+        event_id = row.done_pairs
+        pending = iter(db.session.execute(
+            select(CheckJobPair.id, CheckJobPair.keyword, CheckJobPair.domain)
+            .where(CheckJobPair.job_id == job_id, CheckJobPair.event_id.is_(None))
+            .order_by(CheckJobPair.position)
+        ).all())
+        db.session.commit()
+
+        # Sliding window over the shared check scheduler: a finished pair is
+        # replaced right away, so a slow pair never holds back the others
+        in_flight: Dict = {}
+        while True:
+            job_row = db.session.execute(
+                select(CheckJob.cancel_requested, CheckJob.watched_at).where(CheckJob.id == job_id)
+            ).one_or_none()
+            if job_row is None:
+                self._lost(job_id, in_flight)
+                return None
+            cancel_requested, watched_at = job_row
+            now = time.time()
+            owned = db.session.execute(
+                update(CheckJob).where(self._owned(job_id)).values(heartbeat_at=now)
+            ).rowcount
+            if not owned:
+                self._lost(job_id, in_flight)
+                return None
+            db.session.commit()
+
+            if cancel_requested or (watched_at or 0) < now - Config.STREAM_CANCEL_GRACE_SECONDS:
+                for f in in_flight:
+                    f.cancel()
+                logger.info(f"Check job {job_id} cancelled at {event_id} pairs")
+                return "cancelled"
+
+            for pair_id, keyword, domain in islice(pending, Config.STREAM_WINDOW - len(in_flight)):
+                future = check_scheduler.submit(job_id, _check_pair, self._app, job, keyword, domain, lane=INTERACTIVE)
+                in_flight[future] = (pair_id, keyword, domain)
+            if not in_flight:
+                return "done"
+
+            done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+            for f in done:
+                pair_id, keyword, domain = in_flight.pop(f)
+                try:
+                    result = json_dumps(f.result())
+                except Exception as e:
+                    logger.warning(f"task error: {e}")
+                    result = json_dumps({"error": "Processing failed", "keyword": keyword, "domain": domain})
+
+                # Checkpoint: the pair is never checked again, even after a
+                # restart. The job row is updated first, so a runner that
+                # lost the job writes nothing
+                event_id += 1
+                owned = db.session.execute(
+                    update(CheckJob).where(self._owned(job_id))
+                    .values(done_pairs=event_id, heartbeat_at=time.time())
+                ).rowcount
+                if not owned:
+                    self._lost(job_id, in_flight)
+                    return None
+                db.session.execute(
+                    update(CheckJobPair).where(CheckJobPair.id == pair_id)
+                    .values(event_id=event_id, result=result)
+                )
+                db.session.commit()
+
+            with _progress:
+                _progress.notify_all()
+
+
+# One per process, started by the serving entry point (app.py __main__)
+job_runner = JobRunner()
+
+
+def start_job_runner(app) -> JobRunner:
+    """
+    Start the background job runner of this process
+
+    Args:
+        app: Flask application
+
+    Returns:
+        The runner
+    """
+    job_runner.start(app)
+    logger.info("Check job runner started")
+    return job_runner
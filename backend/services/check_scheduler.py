@@ -0,0 +1,161 @@
+"""
+Process-wide scheduler for Serper-bound check work
+
+Every check (stream pairs, bulk keywords) is submitted here instead of to a
+per-request ThreadPoolExecutor, so the whole process runs at most
+Config.CHECK_WORKERS checks at once no matter how many users are checking.
+
+Tasks wait in priority lanes: interactive single checks run before bulk
+checks, which run before scheduled jobs. Within a lane sessions take turns
+(round-robin, one task per turn), so one huge session cannot starve the
+others.
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Optional
+
+from config import Config
+
+
+# Lanes in priority order
+INTERACTIVE = "interactive"
+BULK = "bulk"
+SCHEDULED = "scheduled"
+LANES = (INTERACTIVE, BULK, SCHEDULED)
+
+# Recent queue waits kept for the wait-time stats
+_WAIT_SAMPLES = 1000
+
+
+class _Task:
+    __slots__ = ("future", "fn", "args", "kwargs", "lane", "queued_at")
+
+    def __init__(self, future, fn, args, kwargs, lane):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.lane = lane
+        self.queued_at = time.monotonic()
+
+
+class CheckScheduler:
+    """Fixed set of worker threads fed from fair, prioritized queues"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        # lane -> session_id -> queued tasks; dict order is the round-robin order
+        self._lanes: Dict[str, "OrderedDict[str, Deque[_Task]]"] = {lane: OrderedDict() for lane in LANES}
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = 0
+        self._waits: Dict[str, Deque[float]] = {lane: deque(maxlen=_WAIT_SAMPLES) for lane in LANES}
+        self._counts = {lane: {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0} for lane in LANES}
+
+    def submit(self, session_id: str, fn: Callable, *args, lane: str = INTERACTIVE, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) for session_id
+
+        Args:
+            session_id: Fairness key (tasks of one session take turns with other sessions)
+            fn: Callable to run on a worker thread
+            lane: INTERACTIVE, BULK or SCHEDULED
+
+        Returns:
+            Future of the result; cancelling it before it starts drops the task
+        """
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown lane: {lane}")
+
+        future = Future()
+        with self._cond:
+            self._ensure_workers()
+            self._lanes[lane].setdefault(session_id, deque()).append(_Task(future, fn, args, kwargs, lane))
+            self._counts[lane]["submitted"] += 1
+            self._cond.notify()
+        return future
+
+    def _ensure_workers(self) -> None:
+        """Start the worker threads on first use (caller holds _cond)"""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._work, name=f"check-worker-{len(self._workers)}", daemon=True,
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_task(self) -> Optional[_Task]:
+        """Pop the next task: highest lane first, then round-robin over its sessions"""
+        for lane in LANES:
+            sessions = self._lanes[lane]
+            if not sessions:
+                continue
+            session_id, tasks = next(iter(sessions.items()))
+            task = tasks.popleft()
+            if tasks:
+                sessions.move_to_end(session_id)
+            else:
+                del sessions[session_id]
+            return task
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while task is None:
+                    self._cond.wait()
+                    task = self._next_task()
+                if not task.future.set_running_or_notify_cancel():
+                    self._counts[task.lane]["cancelled"] += 1
+                    continue
+                self._waits[task.lane].append(time.monotonic() - task.queued_at)
+                self._running += 1
+
+            try:
+                result = task.fn(*task.args, **task.kwargs)
+            except BaseException as e:
+                task.future.set_exception(e)
+                outcome = "failed"
+            else:
+                task.future.set_result(result)
+                outcome = "completed"
+
+            with self._cond:
+                self._running -= 1
+                self._counts[task.lane][outcome] += 1
+
+    def stats(self) -> Dict:
+        """
+        Queue depth, running tasks and queue wait times per lane
+
+        Returns:
+            {"max_workers", "running", "queued", "lanes": {lane: {"queued",
+             "sessions", "submitted", "completed", "failed", "cancelled",
+             "wait_avg_ms", "wait_p95_ms", "wait_max_ms"}}}
+        """
+        with self._cond:
+            lanes = {}
+            for lane in LANES:
+                waits = sorted(self._waits[lane])
+                lanes[lane] = {
+                    "queued": sum(len(tasks) for tasks in self._lanes[lane].values()),
+                    "sessions": len(self._lanes[lane]),
+                    **self._counts[lane],
+                    "wait_avg_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else None,
+                    "wait_p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1)
+                    if waits else None,
+                    "wait_max_ms": round(waits[-1] * 1000, 1) if waits else None,
+                }
+            return {
+                "max_workers": self.max_workers,
+                "running": self._running,
+                "queued": sum(lane["queued"] for lane in lanes.values()),
+                "lanes": lanes,
+            }
+
+
+# Shared by every check endpoint
+check_scheduler = CheckScheduler(max_workers=Config.CHECK_WORKERS)
@@ -0,0 +1,177 @@
+"""
+Dimension table lookups for normalized rank history
+
+rank_history stores integer ids; the keyword, domain, URL, location and
+device strings live once in their own tables (see models/dimensions.py).
+"""
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import Config, logger
+from models.dimensions import Keyword, Domain, Url, Location, Device
+
+
+# RankHistory attribute -> dimension model
+DIMENSIONS = {
+    "keyword": Keyword,
+    "domain": Domain,
+    "url": Url,
+    "location": Location,
+    "device": Device,
+}
+
+DEVICES = ["desktop", "mobile"]
+
+# Stay well below SQLite's bound parameter limit
+_BATCH = 500
+
+# Locations and devices are a handful of rows whose ids never change;
+# filled by init_dimensions()
+_enum_cache: Dict[type, Dict[str, int]] = {Location: {}, Device: {}}
+
+
+def init_dimensions(db_session) -> None:
+    """
+    Seed the location/device code tables with the known values
+
+    Called from create_app(); existing rows keep their ids.
+    """
+    seeded = {
+        Location: ensure_ids(db_session, Location, Config.LOCATION_MAP.keys()),
+        Device: ensure_ids(db_session, Device, DEVICES),
+    }
+    db_session.commit()
+
+    # Only committed ids are cached, so a rolled-back insert can never leak
+    for model, ids in seeded.items():
+        _enum_cache[model] = dict(ids)
+
+    logger.info("Dimension tables ready")
+
+
+def ensure_ids(db_session, model, values: Iterable[str]) -> Dict[str, int]:
+    """
+    Map strings to dimension ids, inserting the ones not seen before
+
+    Safe under concurrent writers: inserts are INSERT ... ON CONFLICT DO
+    NOTHING followed by a read of the winning ids.
+
+    Args:
+        db_session: SQLAlchemy session (caller commits)
+        model: Dimension model class, e.g. Keyword
+        values: Strings to resolve (None is ignored)
+
+    Returns:
+        Dict of value -> id
+    """
+    wanted = {v for v in values if v is not None}
+    cache = _enum_cache.get(model)
+
+    ids = {}
+    if cache is not None:
+        ids = {v: cache[v] for v in wanted if v in cache}
+        wanted -= ids.keys()
+
+    wanted = list(wanted)
+    for i in range(0, len(wanted), _BATCH):
+        chunk = wanted[i:i + _BATCH]
+        db_session.execute(
+            sqlite_insert(model.__table__)
+            .values([{"value": v} for v in chunk])
+            .on_conflict_do_nothing(index_elements=["value"])
+        )
+        ids.update(db_session.execute(
+            select(model.value, model.id).where(model.value.in_(chunk))
+        ).all())
+
+    return ids
+
+
+def lookup_id(db_session, model, value: Optional[str]) -> Optional[int]:
+    """
+    Read-only id lookup for filters
+
+    Args:
+        db_session: SQLAlchemy session
+        model: Dimension model class
+        value: Exact string value
+
+    Returns:
+        Dimension id, or None if the value was never stored
+    """
+    if value is None:
+        return None
+
+    cache = _enum_cache.get(model)
+    if cache is not None and value in cache:
+        return cache[value]
+
+    return db_session.execute(
+        select(model.id).where(model.value == value)
+    ).scalar()
+
+
+def ids_for(db_session, model, values: Iterable[str]) -> Dict[str, int]:
+    """
+    Read-only batch lookup: strings -> dimension ids
+
+    Args:
+        db_session: SQLAlchemy session
+        model: Dimension model class
+        values: Exact string values (None is ignored)
+
+    Returns:
+        Dict of value -> id for the values that were ever stored
+    """
+    wanted = list({v for v in values if v is not None})
+    ids = {}
+    for i in range(0, len(wanted), _BATCH):
+        chunk = wanted[i:i + _BATCH]
+        ids.update(db_session.execute(
+            select(model.value, model.id).where(model.value.in_(chunk))
+        ).all())
+    return ids
+
+
+def values_for(db_session, model, ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Reverse lookup: dimension ids -> strings
+
+    Args:
+        db_session: SQLAlchemy session
+        model: Dimension model class
+        ids: Ids to resolve (None is ignored)
+
+    Returns:
+        Dict of id -> value
+    """
+    wanted = list({i for i in ids if i is not None})
+    values = {}
+    for i in range(0, len(wanted), _BATCH):
+        chunk = wanted[i:i + _BATCH]
+        values.update(db_session.execute(
+            select(model.id, model.value).where(model.id.in_(chunk))
+        ).all())
+    return values
+
+
+def resolve_dimensions(db_session, rows) -> None:
+    """
+    Turn pending string attributes of new RankHistory rows into *_id columns
+
+    Args:
+        db_session: SQLAlchemy session the rows will be flushed in
+        rows: RankHistory instances built with keyword=..., domain=..., etc.
+    """
+    for name, model in DIMENSIONS.items():
+        pending = [row.__dict__.get("_pending_dimensions", {}) for row in rows]
+        values = [p[name] for p in pending if p.get(name) is not None]
+        if not values:
+            continue
+
+        ids = ensure_ids(db_session, model, values)
+        for row, p in zip(rows, pending):
+            if p.get(name) is not None:
+                setattr(row, f"{name}_id", ids[p[name]])
@@ -0,0 +1,202 @@
+"""
+Shared rank history query building
+
+Filters accepted by /api/history/all (and the export endpoint) are applied
+here so every history read path filters the same way. Queries cover both
+history sources (rank_history rows and bulk SERP snapshots, see
+services/history_source.py): filters go into each source's SELECT and the
+ordering/limit onto their UNION ALL.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, false, func, case, text, tuple_, type_coerce, String
+
+from extensions import db
+from models.dimensions import Keyword, Domain, Url, Location, Device
+from utils import decode_cursor, keyset_window
+from .dimensions import lookup_id
+from .history_search import text_filter_clauses
+from .history_source import history_union
+
+
+# Output keys of history_select() rows, in column order
+HISTORY_FIELDS = ("id", "keyword", "domain", "position", "url", "location", "device", "checked_at")
+
+# ORDER BY of history_select() compounds, newest first / oldest first
+NEWEST_FIRST = text("cursor_checked_at DESC, id DESC")
+OLDEST_FIRST = text("cursor_checked_at ASC, id ASC")
+
+
+def _raw_checked_at(column):
+    """checked_at as stored ("YYYY-MM-DD HH:MM:SS.ffffff"), without datetime parsing"""
+    return type_coerce(column, String)
+
+
+def iso_checked_at(column):
+    """
+    SQL equivalent of checked_at.isoformat() + 'Z'
+
+    Like isoformat(), drops the fraction when microseconds are zero.
+    """
+    raw = _raw_checked_at(column)
+    seconds = func.substr(raw, 1, 19)
+    return func.replace(
+        case((func.substr(raw, 21) == "000000", seconds), else_=raw),
+        " ", "T",
+    ).concat("Z")
+
+
+def plain_checked_at(column):
+    """SQL equivalent of checked_at.strftime("%Y-%m-%d %H:%M:%S")"""
+    return func.substr(_raw_checked_at(column), 1, 19)
+
+
+def history_select(time_format: str = "iso", where: Optional[Callable] = None):
+    """
+    Core UNION ALL of history rows with dimension strings joined in
+
+    Returns plain row tuples in HISTORY_FIELDS order instead of RankHistory
+    instances, plus a trailing raw "cursor_checked_at" column for keyset
+    pagination. checked_at is formatted by SQLite, so no per-row datetime
+    parsing or formatting happens in Python. Order with NEWEST_FIRST /
+    OLDEST_FIRST.
+
+    Args:
+        time_format: "iso" (like /api/history/all) or "plain" (like RankHistory.to_dict)
+        where: Function HistoryColumns -> list of clauses, applied to every source
+    """
+    formatter = iso_checked_at if time_format == "iso" else plain_checked_at
+
+    def build(from_, h):
+        stmt = (select(
+                h.id.label("id"),
+                Keyword.value.label("keyword"),
+                Domain.value.label("domain"),
+                h.position.label("position"),
+                Url.value.label("url"),
+                Location.value.label("location"),
+                Device.value.label("device"),
+                formatter(h.checked_at).label("checked_at"),
+                _raw_checked_at(h.checked_at).label("cursor_checked_at"),
+            )
+            .select_from(from_)
+            .join(Keyword, Keyword.id == h.keyword_id)
+            .join(Domain, Domain.id == h.domain_id)
+            .outerjoin(Url, Url.id == h.url_id)
+            .outerjoin(Location, Location.id == h.location_id)
+            .outerjoin(Device, Device.id == h.device_id)
+        )
+        return stmt.where(*where(h)) if where else stmt
+
+    return history_union(build)
+
+
+def history_page(where: Optional[Callable], cursor: Optional[str], limit: int):
+    """
+    One newest-first keyset page of history_select() rows
+
+    The cursor predicate goes into every source, so each one is read from
+    its checked_at index and the compound only merges limit + 1 rows.
+
+    Args:
+        where: Filters from history_filters(), or None
+        cursor: Cursor from a previous page, or None for the first page
+        limit: Page size
+
+    Returns:
+        Tuple of (rows, next_cursor, prev_cursor)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    direction = "next"
+    if cursor:
+        checked_at, row_id, direction = decode_cursor(cursor)
+
+    def page_where(h):
+        clauses = list(where(h)) if where else []
+        if cursor:
+            key, bound = tuple_(h.checked_at, h.id), tuple_(checked_at, row_id)
+            clauses.append(key < bound if direction == "next" else key > bound)
+        return clauses
+
+    stmt = (history_select(where=page_where)
+        .order_by(NEWEST_FIRST if direction == "next" else OLDEST_FIRST)
+        .limit(limit + 1)
+    )
+    rows = db.session.execute(stmt).all()
+    return keyset_window(rows, limit, cursor, direction, "cursor_checked_at", "id")
+
+
+def rows_to_dicts(rows) -> List[Dict]:
+    """
+    Turn history_select() rows into response dicts in one pass
+
+    Args:
+        rows: Row tuples from history_select()
+
+    Returns:
+        List of dicts keyed by HISTORY_FIELDS
+    """
+    fields = HISTORY_FIELDS
+    return [dict(zip(fields, r)) for r in rows]
+
+
+def history_filters(
+    keyword: Optional[str] = None,
+    domain: Optional[str] = None,
+    location: Optional[str] = None,
+    device: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Callable:
+    """
+    Build the /api/history/all filters for history_select(where=...)
+
+    Dimension lookups happen once here; the returned function only builds
+    clauses against the columns of each source.
+
+    Args:
+        keyword: Keyword substring
+        domain: Domain substring
+        location: Exact location code
+        device: Exact device type
+        start_date: ISO datetime lower bound (ignored if unparsable)
+        end_date: ISO datetime upper bound (ignored if unparsable)
+
+    Returns:
+        Function HistoryColumns -> list of clauses
+    """
+    # Unknown codes match nothing (an id of None would mean IS NULL)
+    location_id = lookup_id(db.session, Location, location) if location else None
+    device_id = lookup_id(db.session, Device, device) if device else None
+
+    start_dt = end_dt = None
+    if start_date:
+        try:
+            start_dt = datetime.fromisoformat(start_date)
+        except ValueError:
+            pass
+    if end_date:
+        try:
+            end_dt = datetime.fromisoformat(end_date)
+        except ValueError:
+            pass
+
+    # Partial keyword/domain matches use the FTS index when available
+    text_filters = text_filter_clauses(keyword, domain)
+
+    def where(h):
+        clauses = text_filters(h)
+        if location:
+            clauses.append(h.location_id == location_id if location_id else false())
+        if device:
+            clauses.append(h.device_id == device_id if device_id else false())
+        if start_dt:
+            clauses.append(h.checked_at >= start_dt)
+        if end_dt:
+            clauses.append(h.checked_at <= end_dt)
+        return clauses
+
+    return where
@@ -0,0 +1,188 @@
+"""
+Full-text (substring) search over history keywords and domains
+
+Backed by SQLite FTS5 tables with the trigram tokenizer over the keywords and
+domains dimension tables, kept in sync by triggers. A search resolves to a set
+of dimension ids first, so it only ever scans the (small) distinct values and
+never the history rows. Falls back to LIKE '%x%' over the same dimension tables
+when FTS5/trigram is not compiled into the local SQLite or for terms shorter
+than 3 characters.
+"""
+from typing import Optional
+
+from sqlalchemy import text, column, select, Integer
+
+from config import Config, logger
+from models.dimensions import Keyword, Domain
+
+
+# Dimension table -> FTS table
+FTS_TABLES = {
+    "keywords": "keywords_fts",
+    "domains": "domains_fts",
+}
+
+# Superseded by the dimension-level indexes (see migrate_normalize_rank_history.py)
+LEGACY_FTS_TABLE = "rank_history_fts"
+
+# Trigram tokenizer needs at least 3 characters to use the index
+MIN_FTS_TERM_LENGTH = 3
+
+
+def fts_ddl(table: str, fts_table: str):
+    """CREATE statements for the FTS table over one dimension table and its sync triggers"""
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            value, content='{table}', content_rowid='id', tokenize='trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table}(rowid, value) VALUES (new.id, new.value);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, value) VALUES ('delete', old.id, old.value);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF value ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, value) VALUES ('delete', old.id, old.value);
+            INSERT INTO {fts_table}(rowid, value) VALUES (new.id, new.value);
+        END
+        """,
+    ]
+
+
+_fts_available = False
+
+
+def fts_supported(conn) -> bool:
+    """
+    Check whether the SQLite library behind conn has FTS5 with trigram
+
+    Args:
+        conn: SQLAlchemy connection
+
+    Returns:
+        True if a trigram FTS5 table can be created
+    """
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')"))
+        conn.execute(text("DROP TABLE temp.fts_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def init_history_search(engine) -> bool:
+    """
+    Create the FTS index and sync triggers; populate it on first creation
+
+    Called from create_app() after db.create_all().
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        True if FTS search is active, False if the LIKE fallback is used
+    """
+    global _fts_available
+    _fts_available = False
+
+    if not Config.HISTORY_FTS_ENABLED:
+        logger.info("History FTS disabled, using LIKE search")
+        return False
+
+    with engine.begin() as conn:
+        if not fts_supported(conn):
+            logger.warning("SQLite FTS5 trigram tokenizer unavailable, using LIKE search")
+            return False
+
+        for table, fts_table in FTS_TABLES.items():
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": fts_table},
+            ).first() is not None
+
+            for stmt in fts_ddl(table, fts_table):
+                conn.execute(text(stmt))
+
+            if not existed:
+                # Index values written before the triggers existed (one-off)
+                logger.info(f"Building {fts_table} from existing {table} rows...")
+                conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+
+    _fts_available = True
+    logger.info("History FTS search enabled")
+    return True
+
+
+def fts_available() -> bool:
+    """Whether init_history_search() activated the FTS index"""
+    return _fts_available
+
+
+def fts_match_expression(term: str) -> str:
+    """
+    FTS5 MATCH expression for a substring, with embedded quotes escaped
+
+    Examples:
+        fts_match_expression('seo') -> '"seo"'
+    """
+    escaped = term.replace('"', '""')
+    return f'"{escaped}"'
+
+
+def matching_ids(model, term: str):
+    """
+    SELECT of dimension ids whose value contains term
+
+    Uses the trigram index when available and the term is long enough,
+    otherwise a LIKE scan over the dimension table.
+
+    Args:
+        model: Keyword or Domain
+        term: Substring to search for
+
+    Returns:
+        Selectable usable with column.in_()
+    """
+    fts_table = FTS_TABLES[model.__tablename__]
+
+    if _fts_available and len(term) >= MIN_FTS_TERM_LENGTH:
+        return (text(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :match_{fts_table}")
+            .bindparams(**{f"match_{fts_table}": fts_match_expression(term)})
+            .columns(column("rowid", Integer)))
+
+    return select(model.id).where(model.value.like(f"%{term}%"))
+
+
+def text_filter_clauses(keyword: Optional[str], domain: Optional[str]):
+    """
+    Partial-match keyword/domain filters for every history source
+
+    The id subqueries are built once and shared by the sources, so a UNION
+    ALL over both binds each search term once.
+
+    Args:
+        keyword: Keyword substring filter, or None
+        domain: Domain substring filter, or None
+
+    Returns:
+        Function HistoryColumns -> list of clauses
+    """
+    keyword_ids = matching_ids(Keyword, keyword) if keyword else None
+    domain_ids = matching_ids(Domain, domain) if domain else None
+
+    def clauses(h):
+        result = []
+        if keyword_ids is not None:
+            result.append(h.keyword_id.in_(keyword_ids))
+        if domain_ids is not None:
+            result.append(h.domain_id.in_(domain_ids))
+        return result
+
+    return clauses
@@ -0,0 +1,146 @@
+"""
+Row sources of rank history
+
+History rows live in two tables:
+
+    - rank_history: one row per check (single checks, legacy bulk rows)
+    - serp_snapshots: one row per bulk-checked keyword holding its ordered
+      SERP as JSON id arrays, expanded into rank_history-shaped rows on read
+      with json_each()
+
+Readers query both through this module: one SELECT per source, combined with
+UNION ALL. Filters, joins and ORDER BY ... LIMIT are applied to each arm or
+to the compound itself (never to a view of it), so SQLite keeps using each
+table's own indexes and merges the two orders instead of materializing the
+union.
+"""
+from typing import Callable, List, NamedTuple, Tuple
+
+from sqlalchemy import select, func, literal, true, type_coerce, union_all, Integer, String
+
+from models.rank_history import RankHistory
+from models.serp_snapshot import SerpSnapshot
+
+
+# Synthetic id of an expanded snapshot row: position - (snapshot_id + 1) * STRIDE.
+# Negative so it never collides with rank_history ids, stable across reads, and
+# increasing with position like the per-result rows bulk checks used to insert.
+SNAPSHOT_ID_STRIDE = 1000
+
+# Column names every source exposes
+HISTORY_COLUMNS = (
+    "id", "keyword_id", "domain_id", "position", "url_id", "location_id", "device_id",
+    "checked_at", "session_id", "check_type", "api_credits_used",
+)
+
+
+class HistoryColumns(NamedTuple):
+    """Column expressions of one source, usable in Core where()/select()"""
+    id: object
+    keyword_id: object
+    domain_id: object
+    position: object
+    url_id: object
+    location_id: object
+    device_id: object
+    checked_at: object
+    session_id: object
+    check_type: object
+    api_credits_used: object
+
+
+def raw_source():
+    """rank_history as a source: (from clause, HistoryColumns)"""
+    h = RankHistory.__table__.c
+    return RankHistory.__table__, HistoryColumns(
+        h.id, h.keyword_id, h.domain_id, h.position, h.url_id, h.location_id, h.device_id,
+        h.checked_at, h.session_id, h.check_type, h.api_credits_used,
+    )
+
+
+def snapshot_source():
+    """serp_snapshots expanded to one row per result: (from clause, HistoryColumns)"""
+    s = SerpSnapshot.__table__
+    j = func.json_each(s.c.domain_ids).table_valued("key", "value").alias("j")
+    key = type_coerce(j.c.key, Integer)
+    # '$[' || key || ']' rather than concat(): SQLite only has concat() since 3.44
+    url_path = literal("$[", String) + type_coerce(j.c.key, String) + literal("]", String)
+    return s.join(j, true()), HistoryColumns(
+        type_coerce(key + 1 - (s.c.id + 1) * SNAPSHOT_ID_STRIDE, Integer),
+        s.c.keyword_id,
+        type_coerce(j.c.value, Integer),
+        key + 1,
+        type_coerce(func.json_extract(s.c.url_ids, url_path), Integer),
+        s.c.location_id,
+        s.c.device_id,
+        s.c.checked_at,
+        s.c.session_id,
+        literal("bulk", String),
+        literal(1, Integer),
+    )
+
+
+SOURCES: Tuple[Callable, ...] = (raw_source, snapshot_source)
+
+
+def history_union(build: Callable):
+    """
+    UNION ALL of one SELECT per source
+
+    Args:
+        build: Function (from_clause, HistoryColumns) -> select(); called once
+            per source, so filters are written once for both tables
+
+    Returns:
+        CompoundSelect; order_by()/limit() on it apply to the merged rows
+    """
+    return union_all(*(build(*source()) for source in SOURCES))
+
+
+def history_rows():
+    """Subquery with HISTORY_COLUMNS over every source (for aggregates)"""
+    return history_union(
+        lambda from_, h: select(*(getattr(h, c).label(c) for c in HISTORY_COLUMNS)).select_from(from_)
+    ).subquery("history_rows")
+
+
+# Column SQL per source for hand-written text() queries
+_SQL_SOURCES = (
+    (
+        "rank_history h",
+        {c: f"h.{c}" for c in HISTORY_COLUMNS},
+    ),
+    (
+        "serp_snapshots s JOIN json_each(s.domain_ids) j",
+        {
+            **{c: f"s.{c}" for c in ("keyword_id", "location_id", "device_id", "checked_at", "session_id")},
+            "id": f"j.key + 1 - (s.id + 1) * {SNAPSHOT_ID_STRIDE}",
+            "domain_id": "j.value",
+            "position": "j.key + 1",
+            "url_id": "json_extract(s.url_ids, '$[' || j.key || ']')",
+            "check_type": "'bulk'",
+            "api_credits_used": "1",
+        },
+    ),
+)
+
+
+def history_rows_sql(columns: List[str], where: str = "", join: str = "") -> str:
+    """
+    UNION ALL of one raw-SQL SELECT per source
+
+    join and where may reference source columns as {keyword_id}, {checked_at},
+    etc.; they are substituted per source. Output columns are named after
+    columns.
+
+    Examples:
+        history_rows_sql(["keyword_id", "position"], "{checked_at} >= :start")
+    """
+    arms = []
+    for table, names in _SQL_SOURCES:
+        select_list = ", ".join(f"{names[c]} AS {c}" for c in columns)
+        sql = f"SELECT {select_list} FROM {table} {join.format(**names)}"
+        if where:
+            sql += f" WHERE {where.format(**names)}"
+        arms.append(sql)
+    return "\nUNION ALL\n".join(arms)
@@ -0,0 +1,338 @@
+"""
+History persistence service
+
+Every history write goes through record_history() (rank_history rows) or
+record_serps() (bulk SERP snapshots) so that the derived check_sessions
+summary table stays in sync with the stored history.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import logger
+from extensions import db
+from models.rank_history import RankHistory
+from models.serp_snapshot import SerpSnapshot
+from models.check_session import CheckSession
+from models.dimensions import Keyword, Domain, Url, Location, Device
+from utils import json_dumps
+from .dimensions import resolve_dimensions, ensure_ids
+from .history_source import history_rows
+from .versions import bump_versions
+
+
+def legacy_session_id(checked_at) -> str:
+    """
+    Pseudo session id for rows saved before session_id existed
+
+    Legacy rows are grouped by hour, e.g. "legacy_2024-01-01_09".
+    """
+    return f"legacy_{checked_at:%Y-%m-%d_%H}"
+
+
+def _session_key(row) -> Tuple[str, str, Optional[int], Optional[int]]:
+    """Grouping key (session_id, check_type, location_id, device_id) for a history row"""
+    sid = row.session_id or legacy_session_id(row.checked_at)
+    return (sid, row.check_type or "single", row.location_id, row.device_id)
+
+
+def _group_filter(key, legacy: bool):
+    """WHERE clause selecting the raw rows that belong to one summary key"""
+    sid, check_type, location_id, device_id = key
+    if legacy:
+        session_clause = db.and_(
+            RankHistory.session_id.is_(None),
+            func.strftime('%Y-%m-%d_%H', RankHistory.checked_at) == sid[len("legacy_"):],
+        )
+    else:
+        session_clause = RankHistory.session_id == sid
+
+    return db.and_(
+        session_clause,
+        func.coalesce(RankHistory.check_type, "single") == check_type,
+        RankHistory.location_id.is_(None) if location_id is None else RankHistory.location_id == location_id,
+        RankHistory.device_id.is_(None) if device_id is None else RankHistory.device_id == device_id,
+    )
+
+
+def _count_new(db_session, key, legacy: bool, column, batch_values: List[int]) -> int:
+    """
+    Count values from this batch that did not exist in the session before it
+
+    Must be called after the batch was flushed: a value is new when every row
+    carrying it in the session belongs to this batch.
+    """
+    batch_counts = defaultdict(int)
+    for v in batch_values:
+        batch_counts[v] += 1
+
+    stored = dict(
+        db_session.query(column, func.count(RankHistory.id))
+        .filter(_group_filter(key, legacy))
+        .filter(column.in_(list(batch_counts)))
+        .group_by(column)
+        .all()
+    )
+    return sum(1 for v, n in batch_counts.items() if stored.get(v, 0) <= n)
+
+
+def _add_to_summary(db_session, **values) -> None:
+    """
+    Add counters to one check_sessions row, creating it if needed
+
+    Counters are incremented with an atomic upsert, so concurrent writers
+    for the same session never lose updates.
+
+    Args:
+        db_session: SQLAlchemy session
+        values: Summary key (session_id, check_type, location, device),
+            checked_at and the counter increments
+    """
+    table = CheckSession.__table__
+    stmt = sqlite_insert(table).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.session_id, table.c.check_type, table.c.location, table.c.device],
+        set_={
+            "checked_at": func.min(table.c.checked_at, stmt.excluded.checked_at),
+            "keyword_count": table.c.keyword_count + stmt.excluded.keyword_count,
+            "domain_count": table.c.domain_count + stmt.excluded.domain_count,
+            "total_records": table.c.total_records + stmt.excluded.total_records,
+            "api_credits_used": table.c.api_credits_used + stmt.excluded.api_credits_used,
+            "success_count": table.c.success_count + stmt.excluded.success_count,
+        },
+    )
+    db_session.execute(stmt)
+
+
+def update_session_summaries(db_session, rows: Iterable[RankHistory]) -> None:
+    """
+    Fold freshly flushed history rows into their check_sessions summaries
+
+    Args:
+        db_session: SQLAlchemy session the rows were flushed in
+        rows: RankHistory instances (already flushed, not yet committed)
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        groups[_session_key(row)].append(row)
+
+    for key, group in groups.items():
+        sid, check_type, _, _ = key
+        legacy = group[0].session_id is None
+
+        # The summary keeps location/device as strings for the API
+        location = group[0].location or ""
+        device = group[0].device or ""
+
+        new_keywords = _count_new(db_session, key, legacy, RankHistory.keyword_id, [r.keyword_id for r in group])
+        if check_type == "single":
+            # Single checks: distinct domains (user input)
+            new_domains = _count_new(db_session, key, legacy, RankHistory.domain_id, [r.domain_id for r in group])
+        else:
+            # Bulk checks: every record is a search result
+            new_domains = len(group)
+
+        _add_to_summary(
+            db_session,
+            session_id=sid,
+            check_type=check_type,
+            location=location,
+            device=device,
+            checked_at=min(r.checked_at for r in group),
+            keyword_count=new_keywords,
+            domain_count=new_domains,
+            total_records=len(group),
+            api_credits_used=sum(r.api_credits_used or 0 for r in group),
+            success_count=sum(1 for r in group if r.position is not None),
+        )
+
+
+def record_history(db_session, rows: Iterable[RankHistory]) -> None:
+    """
+    Persist history rows and update derived tables in one transaction
+
+    Args:
+        db_session: SQLAlchemy session
+        rows: RankHistory instances to insert
+
+    Raises:
+        Exception: Re-raised after rollback if the write fails
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    try:
+        resolve_dimensions(db_session, rows)
+        db_session.add_all(rows)
+        db_session.flush()
+        update_session_summaries(db_session, rows)
+        bump_versions(db_session, "rank_history", "check_sessions")
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+
+
+def _new_snapshot_keywords(db_session, session_id: str, location_id, device_id, keyword_ids: List[int]) -> int:
+    """
+    Count keywords of a just-inserted snapshot batch not checked before in its session
+
+    Same rule as _count_new(): a keyword is new when every snapshot of it in
+    the session belongs to this batch.
+    """
+    batch_counts = defaultdict(int)
+    for keyword_id in keyword_ids:
+        batch_counts[keyword_id] += 1
+
+    stored = dict(
+        db_session.query(SerpSnapshot.keyword_id, func.count(SerpSnapshot.id))
+        .filter(SerpSnapshot.session_id == session_id)
+        .filter(SerpSnapshot.location_id.is_(None) if location_id is None
+                else SerpSnapshot.location_id == location_id)
+        .filter(SerpSnapshot.device_id.is_(None) if device_id is None
+                else SerpSnapshot.device_id == device_id)
+        .filter(SerpSnapshot.keyword_id.in_(list(batch_counts)))
+        .group_by(SerpSnapshot.keyword_id)
+        .all()
+    )
+    return sum(1 for k, n in batch_counts.items() if stored.get(k, 0) <= n)
+
+
+def record_serps(
+    db_session,
+    session_id: str,
+    location: Optional[str],
+    device: Optional[str],
+    serps: Iterable[Tuple[str, datetime, Sequence[Tuple[str, Optional[str]]]]],
+) -> None:
+    """
+    Persist bulk-check SERPs as one serp_snapshots row per keyword
+
+    Replaces one rank_history row per result: the ordered domain/url ids are
+    stored as JSON arrays and expanded on read (services/history_source.py),
+    so a 30-result keyword is one insert instead of 30. check_sessions gets
+    the same counters the per-result rows used to produce.
+
+    Meant to be called once for many keywords (a whole bulk run or a batch
+    of it): dimension ids are resolved with one lookup per table, the
+    snapshots go in as a single executemany INSERT without ORM objects, and
+    everything commits in one transaction.
+
+    Args:
+        db_session: SQLAlchemy session
+        session_id: Bulk check session id
+        location: Location code
+        device: Device type
+        serps: (keyword, checked_at, [(domain, url), ...]) per keyword, results
+            in position order; keywords without results are skipped
+
+    Raises:
+        Exception: Re-raised after rollback if the write fails
+    """
+    serps = [(k, t, list(results)) for k, t, results in serps if results]
+    if not serps:
+        return
+
+    try:
+        keyword_ids = ensure_ids(db_session, Keyword, (k for k, _, _ in serps))
+        domain_ids = ensure_ids(db_session, Domain, (d for _, _, results in serps for d, _ in results))
+        url_ids = ensure_ids(db_session, Url, (u for _, _, results in serps for _, u in results))
+        location_id = ensure_ids(db_session, Location, [location]).get(location)
+        device_id = ensure_ids(db_session, Device, [device]).get(device)
+
+        db_session.execute(insert(SerpSnapshot.__table__), [
+            {
+                "session_id": session_id,
+                "keyword_id": keyword_ids[keyword],
+                "location_id": location_id,
+                "device_id": device_id,
+                "checked_at": checked_at,
+                "result_count": len(results),
+                "domain_ids": json_dumps([domain_ids[d] for d, _ in results]),
+                "url_ids": json_dumps([url_ids.get(u) for _, u in results]),
+            }
+            for keyword, checked_at, results in serps
+        ])
+
+        # Every result counts as a record, like per-result bulk rows did
+        results = sum(len(r) for _, _, r in serps)
+        _add_to_summary(
+            db_session,
+            session_id=session_id,
+            check_type="bulk",
+            location=location or "",
+            device=device or "",
+            checked_at=min(t for _, t, _ in serps),
+            keyword_count=_new_snapshot_keywords(
+                db_session, session_id, location_id, device_id, [keyword_ids[k] for k, _, _ in serps],
+            ),
+            domain_count=results,
+            total_records=results,
+            api_credits_used=results,
+            success_count=results,
+        )
+        bump_versions(db_session, "rank_history", "check_sessions")
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+
+
+def rebuild_check_sessions() -> int:
+    """
+    Recompute the whole check_sessions table from rank_history and serp_snapshots
+
+    Used once to backfill existing history (see migrate_add_check_sessions.py).
+
+    Returns:
+        Number of summary rows written
+    """
+    rows = history_rows()
+    session_id = func.coalesce(
+        rows.c.session_id,
+        # "||" rather than concat(): SQLite only has concat() since 3.44
+        db.literal('legacy_', db.String) + func.strftime('%Y-%m-%d_%H', rows.c.checked_at)
+    )
+    check_type = func.coalesce(rows.c.check_type, "single")
+    location = func.coalesce(Location.value, "")
+    device = func.coalesce(Device.value, "")
+
+    aggregate = select(
+        session_id,
+        check_type,
+        location,
+        device,
+        func.min(rows.c.checked_at),
+        func.count(func.distinct(rows.c.keyword_id)),
+        db.case(
+            (check_type == 'single', func.count(func.distinct(rows.c.domain_id))),
+            else_=func.count(rows.c.id)
+        ),
+        func.count(rows.c.id),
+        func.coalesce(func.sum(rows.c.api_credits_used), 0),
+        func.sum(db.case((rows.c.position.isnot(None), 1), else_=0)),
+    ).select_from(rows).outerjoin(
+        Location, Location.id == rows.c.location_id
+    ).outerjoin(
+        Device, Device.id == rows.c.device_id
+    ).group_by(session_id, check_type, location, device)
+
+    table = CheckSession.__table__
+    db.session.execute(delete(table))
+    result = db.session.execute(insert(table).from_select(
+        [
+            "session_id", "check_type", "location", "device", "checked_at",
+            "keyword_count", "domain_count", "total_records",
+            "api_credits_used", "success_count",
+        ],
+        aggregate,
+    ))
+    bump_versions(db.session, "check_sessions")
+    db.session.commit()
+
+    logger.info(f"Rebuilt check_sessions: {result.rowcount} sessions")
+    return result.rowcount
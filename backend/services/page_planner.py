@@ -0,0 +1,117 @@
+"""
+History-guided pagination for single checks
+
+process_pair used to fetch the top 30 (3+ Serper pages) for every pair, even
+for pairs that have sat at #3 for weeks. expected_pages() reads the pair's
+last Config.PAGE_PLAN_HISTORY checks from rank_history: when all of them
+ranked, the check first fetches only the pages up to the one the worst of
+those positions (plus a small margin) falls on, and widens to the full top 30
+only when the domain is not there.
+
+Pages before the expected one are always fetched too: the first match decides
+the position, so a pair that moved up must still be found at its new rank.
+
+Each check stores its plan in rank_history (planned_pages, plan_hit) and
+planner_stats() sums them up; a hit is a planned check that found the pair
+on its planned pages. api_credits_used is left as it was.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select, func, case
+
+from config import Config
+from models.rank_history import RankHistory
+from models.dimensions import Keyword, Domain, Location, Device
+from .dimensions import lookup_id
+from .serper import RESULTS_PER_PAGE
+
+
+# Pages of a full single check (top 30)
+FULL_PAGES = 3
+# Fewer recent checks than this are not a trend
+MIN_CHECKS = 3
+# Positions this close to the end of a page plan for the next page too
+POSITION_MARGIN = 2
+
+
+def expected_pages(db_session, keyword: str, domain: str, location: str, device: str) -> Optional[int]:
+    """
+    Pages a check of this pair should fetch first
+
+    Args:
+        db_session: SQLAlchemy session
+        keyword, domain: The pair, as saved in history
+        location, device: Check settings (history of other settings is ignored)
+
+    Returns:
+        1 or 2, or None to fetch the full top 30 (no recent history, the pair
+        was unranked in a recent check, or it ranks on page 3)
+
+    Examples:
+        Last checks #3, #4, #3 -> 1
+        Last checks #9, #8, #7 -> 2 (#9 + margin may be on page 2)
+    """
+    if Config.PAGE_PLAN_HISTORY <= 0:
+        return None
+
+    ids = [
+        lookup_id(db_session, Keyword, keyword.strip()),
+        lookup_id(db_session, Domain, domain.strip()),
+        lookup_id(db_session, Location, location),
+        lookup_id(db_session, Device, device),
+    ]
+    if None in ids:
+        return None
+    keyword_id, domain_id, location_id, device_id = ids
+
+    positions = db_session.execute(
+        select(RankHistory.position)
+        .where(
+            RankHistory.keyword_id == keyword_id,
+            RankHistory.domain_id == domain_id,
+            RankHistory.location_id == location_id,
+            RankHistory.device_id == device_id,
+            RankHistory.checked_at >= datetime.utcnow() - timedelta(days=Config.PAGE_PLAN_MAX_AGE_DAYS),
+        )
+        .order_by(RankHistory.checked_at.desc())
+        .limit(Config.PAGE_PLAN_HISTORY)
+    ).scalars().all()
+
+    if len(positions) < MIN_CHECKS or None in positions:
+        return None
+
+    pages = (max(positions) + POSITION_MARGIN - 1) // RESULTS_PER_PAGE + 1
+    return pages if pages < FULL_PAGES else None
+
+
+def planner_stats(db_session, days: int) -> Dict:
+    """
+    Outcomes of page plans in single checks of the last days
+
+    Args:
+        db_session: SQLAlchemy session
+        days: Lookback in days
+
+    Returns:
+        {"unplanned", "hits", "misses", "hit_rate", "planned_pages"}
+    """
+    planned = RankHistory.planned_pages.isnot(None)
+    unplanned, hits, misses, planned_pages = db_session.execute(
+        select(
+            func.count(case((~planned, 1))),
+            func.count(case((planned & RankHistory.plan_hit, 1))),
+            func.count(case((planned & ~RankHistory.plan_hit, 1))),
+            func.coalesce(func.sum(RankHistory.planned_pages), 0),
+        ).where(
+            RankHistory.check_type == "single",
+            RankHistory.checked_at >= datetime.utcnow() - timedelta(days=days),
+        )
+    ).one()
+    return {
+        "unplanned": unplanned,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        "planned_pages": planned_pages,
+    }
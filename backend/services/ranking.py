@@ -1,13 +1,84 @@
 """
 Ranking detection and processing service
 """
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 from datetime import datetime, timedelta, timezone
 
 from config import Config, logger
 from utils import normalize_host, final_host_for_input, final_host_of_url
-from .serper import serper_search
+from .serper import serper_search, pages_in, RESULTS_PER_PAGE
+from .page_planner import expected_pages
+from .history_writer import record_history
+
+
+def _find_match(
+    organic: List[Dict], final_host: str, chain_hosts: List[str], keyword: str, offset: int = 0,
+) -> Optional[Tuple[int, str, str]]:
+    """
+    First SERP result of the target domain
+
+    Args:
+        organic: serper_search results
+        final_host, chain_hosts: Target host after redirects, and the redirect chain
+        keyword: For logging
+        offset: Results already checked before organic (redirects are only
+            followed for the overall top 10)
+
+    Returns:
+        (position, url, SERP host), or None if the domain is not in organic
+    """
+    for idx, item in enumerate(organic, start=offset):
+        link = item.get("link", "")
+        if not link:
+            continue
+
+        # Use actualPosition from pagination if available
+        actual_position = item.get("actualPosition", idx + 1)
+
+        # Extract and normalize host from SERP link
+        try:
+            h = urlparse(link).netloc.lower()
+            if h.startswith("www."):
+                h = h[4:]
+            if ":" in h:
+                h = h.split(":")[0]
+        except Exception:
+            h = ""
+
+        # Debug log for first 30 results
+        if idx < 30:
+            logger.debug(f"  [#{actual_position}] Checking: {h} | URL: {link[:100]}")
+
+        # EXACT host match only - no partial matching!
+        if h and (h == final_host or h in chain_hosts):
+            logger.info(
+                f"✅ Found exact match: {keyword} | {h} == {final_host} "
+                f"at position #{actual_position}"
+            )
+            return actual_position, link[:200], h
+
+        # Only for top 10: follow redirect to check final destination
+        # This handles cases where Google shows a redirect URL
+        if idx < 10:
+            try:
+                fh = final_host_of_url(link)
+                if fh:
+                    logger.debug(f"  [#{actual_position}] After redirect: {fh}")
+
+                # Check if redirect destination matches our target
+                if fh and (fh == final_host or fh in chain_hosts):
+                    logger.info(
+                        f"✅ Found match via redirect: {keyword} | {h} → {fh} "
+                        f"at position #{actual_position}"
+                    )
+                    # Save the SERP host (not redirect destination)
+                    return actual_position, link[:200], h
+            except Exception as e:
+                logger.debug(f"  [#{actual_position}] Redirect check failed: {e}")
+                continue
+
+    return None
 
 
 def process_pair(
@@ -27,7 +98,8 @@ def process_pair(
 
     Steps:
     1. Normalize domain and follow redirects
-    2. Search Serper API for top 30 results
+    2. Search Serper API for top 30 results (or only the pages recent history
+       expects the domain on, widening on a miss; see services/page_planner.py)
     3. Match target domain in SERP results (exact match or via redirect)
     4. Save to database if enabled
     5. Return result dict
@@ -64,6 +136,8 @@ def process_pair(
         "error": None,
     }
 
+    planned, hit = None, None
+
     try:
         # Step 1: Normalize domain
         host = normalize_host(domain_input)
@@ -74,72 +148,43 @@ def process_pair(
         final_host, chain_hosts = final_host_for_input(host)
         out["redirect_chain"] = chain_hosts[:10]
 
-        # Step 3: Search Serper API for top 30 results
-        organic = serper_search(keyword, location, device, max_results=30, api_key=api_key)
+        # Step 3: Search Serper API: the pages history expects the pair on, else the top 30
+        if save_to_db and db_session and rank_history_model:
+            try:
+                planned = expected_pages(db_session, keyword, domain_input, location, device)
+            except Exception as e:
+                logger.debug(f"Page plan failed: {keyword} | {domain_input} | {e}")
+        if planned:
+            organic = serper_search(
+                keyword, location, device, max_results=planned * RESULTS_PER_PAGE, api_key=api_key, max_pages=planned,
+            )
+        else:
+            organic = serper_search(keyword, location, device, max_results=30, api_key=api_key)
 
         # Log target domain info
         logger.info(f"Searching for: {keyword} | Target: {final_host} | Chain: {chain_hosts}")
 
-        matched = False
-        ranking_host = None  # Store the actual ranking host
-
         # Step 4: Match target domain in SERP results
-        for idx, item in enumerate(organic):
-            link = item.get("link", "")
-            if not link:
-                continue
-
-            # Use actualPosition from pagination if available
-            actual_position = item.get("actualPosition", idx + 1)
-
-            # Extract and normalize host from SERP link
-            try:
-                h = urlparse(link).netloc.lower()
-                if h.startswith("www."):
-                    h = h[4:]
-                if ":" in h:
-                    h = h.split(":")[0]
-            except Exception:
-                h = ""
-
-            # Debug log for first 30 results
-            if idx < 30:
-                logger.debug(f"  [#{actual_position}] Checking: {h} | URL: {link[:100]}")
-
-            # EXACT host match only - no partial matching!
-            if h and (h == final_host or h in chain_hosts):
-                out["position"] = actual_position
-                out["url"] = link[:200]
-                ranking_host = h
-                matched = True
-                logger.info(
-                    f"✅ Found exact match: {keyword} | {h} == {final_host} "
-                    f"at position #{actual_position}"
+        match = _find_match(organic, final_host, chain_hosts, keyword)
+
+        if planned:
+            # Not on the expected pages: widen to the rest of the top 30,
+            # unless the SERP already ended there
+            hit = match is not None
+            if not hit and pages_in(organic) == planned:
+                more = serper_search(
+                    keyword, location, device, max_results=30 - len(organic), api_key=api_key,
+                    start_page=planned + 1,
                 )
-                break
-
-            # Only for top 10: follow redirect to check final destination
-            # This handles cases where Google shows a redirect URL
-            if idx < 10:
-                try:
-                    fh = final_host_of_url(link)
-                    if fh:
-                        logger.debug(f"  [#{actual_position}] After redirect: {fh}")
-
-                    # Check if redirect destination matches our target
-                    if fh and (fh == final_host or fh in chain_hosts):
-                        out["position"] = actual_position
-                        out["url"] = link[:200]
-                        ranking_host = h  # Save the SERP host (not redirect destination)
-                        matched = True
-                        logger.info(
-                            f"✅ Found match via redirect: {keyword} | {h} → {fh} "
-                            f"at position #{actual_position}"
-                        )
-                        break
-                except Exception as e:
-                    logger.debug(f"  [#{actual_position}] Redirect check failed: {e}")
-                    continue
+                match = _find_match(more, final_host, chain_hosts, keyword, offset=len(organic))
+                organic += more
+            if not hit:
+                logger.info(f"Page plan missed: {keyword} | {domain_input} | expected on pages 1-{planned}")
+
+        matched = match is not None
+        ranking_host = None  # Store the actual ranking host
+        if matched:
+            out["position"], out["url"], ranking_host = match
 
         # Add ranking_host to output
         if ranking_host:
@@ -175,11 +220,12 @@ def process_pair(
                 device=device,
                 checked_at=datetime.now(timezone.utc),
                 session_id=session_id,
-                check_type=check_type
+                check_type=check_type,
+                planned_pages=planned,
+                plan_hit=hit,
             )
 
-            db_session.add(history)
-            db_session.commit()
+            record_history(db_session, [history])
             logger.info(f"Lưu lịch sử: {keyword} | {domain_input} | {pos}")
         except Exception as e:
             logger.warning(f"Không thể lưu lịch sử: {e}")
@@ -0,0 +1,120 @@
+"""
+In-process cache of serialized history responses
+
+Entries hold the JSON body of a /api/history response, keyed by the
+endpoint's normalized parameters plus the table_versions counters of the
+tables the body was built from (versioned_key()). Every history write bumps
+those counters in its own transaction (services/versions.py), from whichever
+process or thread made it, so after a write the next request builds a new
+key and misses; entries under old versions are never matched again and age
+out of the LRU. Memory is bounded by total body size, evicting least
+recently used entries first.
+
+Each backend process has its own cache; the version counters in the shared
+database keep them all consistent.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+from config import Config
+from .versions import current_versions
+
+
+class ResultCache:
+    """LRU cache of JSON bodies, bounded by total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _drop(self, key) -> None:
+        body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], str]) -> str:
+        """
+        Return the cached body for key, computing and storing it on a miss
+
+        Build key with versioned_key() before compute() runs, so a write that
+        commits while the query is running leaves the new entry under the
+        old versions, where no later request looks.
+
+        Args:
+            key: Normalized request parameters and table versions
+            compute: Builds the JSON body (exceptions propagate, nothing is cached)
+
+        Returns:
+            JSON body
+        """
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return body
+            self._stats["misses"] += 1
+
+        body = compute()
+
+        if len(body) > self.max_bytes:
+            return body
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """
+        Hit/miss counters and current size
+
+        Returns:
+            {"hits", "misses", "hit_rate", "evictions", "entries", "bytes", "max_bytes"}
+        """
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Shared by the /api/history endpoints
+history_cache = ResultCache(max_bytes=Config.RESULT_CACHE_MAX_BYTES)
+
+
+def versioned_key(key: Tuple, *tables: str) -> Tuple:
+    """
+    Cache key of key as of the current write counters of tables
+
+    Args:
+        key: Normalized request parameters
+        tables: Tables the response is built from
+
+    Returns:
+        key extended with (table, version) pairs
+
+    Examples:
+        versioned_key(("sessions", "page", 1, 20), "check_sessions")
+        -> (("sessions", "page", 1, 20), (("check_sessions", 42),))
+    """
+    versions = current_versions(tables)
+    return key, tuple((name, versions[name][0]) for name in tables)
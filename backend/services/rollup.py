@@ -0,0 +1,375 @@
+"""
+Daily rollups and retention for rank history
+
+rank_history_daily keeps one row per (keyword, domain, location, device, day)
+with best/worst/last/average position. Long /api/history/daily ranges read the
+rollup instead of raw rows, and raw rows older than the retention window are
+pruned once their days are rolled up.
+
+Maintenance is scheduled by the serving entry point only (app.py), and a
+maintenance_leases row makes sure one process runs it at a time.
+"""
+import os
+import time
+import uuid
+import socket
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text, bindparam, update, or_, Date, DateTime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import Config, logger
+from extensions import db
+from models.maintenance_lease import MaintenanceLease
+from .history_source import history_rows_sql
+from .versions import bump_versions
+
+
+# Aggregate of raw rows per pair/location/device/day. The window function picks
+# the latest check of each day for last_position/last_url_id. The source rows
+# are rank_history plus expanded bulk SERP snapshots, filtered per source.
+_DAILY_AGGREGATE = """
+    WITH ranked AS (
+        SELECT keyword_id, domain_id,
+               COALESCE(location_id, 0) AS location_id,
+               COALESCE(device_id, 0) AS device_id,
+               date(checked_at) AS day,
+               position, url_id, checked_at,
+               ROW_NUMBER() OVER (
+                   PARTITION BY keyword_id, domain_id, COALESCE(location_id, 0),
+                                COALESCE(device_id, 0), date(checked_at)
+                   ORDER BY checked_at DESC, id DESC
+               ) AS rn
+        FROM ({rows}) AS history_rows
+    )
+    SELECT keyword_id, domain_id, location_id, device_id, day,
+           MIN(position) AS best_position,
+           MAX(position) AS worst_position,
+           MAX(CASE WHEN rn = 1 THEN position END) AS last_position,
+           MAX(CASE WHEN rn = 1 THEN url_id END) AS last_url_id,
+           COALESCE(SUM(position), 0) AS position_sum,
+           COUNT(position) AS found_count,
+           COUNT(*) AS check_count,
+           MAX(checked_at) AS last_checked_at
+    FROM ranked
+    WHERE true
+    GROUP BY keyword_id, domain_id, location_id, device_id, day
+"""
+
+_AGGREGATE_COLUMNS = ["id", "keyword_id", "domain_id", "location_id", "device_id", "position", "url_id", "checked_at"]
+
+
+def _daily_aggregate(pair_filter: str = "") -> str:
+    """_DAILY_AGGREGATE over rows in [:start, :end), plus an optional per-source filter"""
+    rows = history_rows_sql(_AGGREGATE_COLUMNS, "{checked_at} >= :start AND {checked_at} < :end " + pair_filter)
+    return _DAILY_AGGREGATE.format(rows=rows)
+
+
+ROLLUP_FIELDS = (
+    "keyword_id", "domain_id", "location_id", "device_id", "day", "best_position", "worst_position",
+    "last_position", "last_url_id", "position_sum", "found_count", "check_count", "last_checked_at",
+)
+
+_UPSERT = f"""
+    INSERT INTO rank_history_daily ({', '.join(ROLLUP_FIELDS)})
+    {_daily_aggregate()}
+    ON CONFLICT (keyword_id, domain_id, day, location_id, device_id) DO UPDATE SET
+        best_position = excluded.best_position,
+        worst_position = excluded.worst_position,
+        last_position = excluded.last_position,
+        last_url_id = excluded.last_url_id,
+        position_sum = excluded.position_sum,
+        found_count = excluded.found_count,
+        check_count = excluded.check_count,
+        last_checked_at = excluded.last_checked_at
+"""
+
+
+# Oldest check over both history tables (each MIN() is an index lookup)
+_FIRST_CHECKED_AT = """
+    SELECT MIN(checked_at) FROM (
+        SELECT MIN(checked_at) AS checked_at FROM rank_history
+        UNION ALL
+        SELECT MIN(checked_at) FROM serp_snapshots
+    )
+"""
+
+
+def _day_start(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day)
+
+
+def _sql(statement: str):
+    """text() with the datetime bounds bound as DateTime, like ORM queries"""
+    return text(statement).bindparams(
+        bindparam("start", type_=DateTime),
+        bindparam("end", type_=DateTime),
+    )
+
+
+def rollup_days(start_day: date, end_day: date) -> int:
+    """
+    (Re)compute rollup rows for every day in [start_day, end_day)
+
+    Days are UTC, like rank_history.checked_at. Recomputing a day replaces its
+    rollup rows, so the job is idempotent.
+
+    Args:
+        start_day: First day to roll up
+        end_day: Day after the last one to roll up
+
+    Returns:
+        Number of rollup rows written
+    """
+    result = db.session.execute(_sql(_UPSERT), {
+        "start": _day_start(start_day),
+        "end": _day_start(end_day),
+    })
+    bump_versions(db.session, "rank_history_daily")
+    db.session.commit()
+    return result.rowcount
+
+
+def rollup_recent(days: int = None) -> int:
+    """
+    Refresh the rollup for the last few days, including today
+
+    Args:
+        days: How many days back to recompute (default Config.ROLLUP_LOOKBACK_DAYS)
+
+    Returns:
+        Number of rollup rows written
+    """
+    days = days or Config.ROLLUP_LOOKBACK_DAYS
+    today = datetime.utcnow().date()
+    count = rollup_days(today - timedelta(days=days - 1), today + timedelta(days=1))
+    logger.info(f"Rolled up last {days} days of history ({count} rows)")
+    return count
+
+
+def rollup_all() -> int:
+    """
+    Build the rollup for the whole raw history (initial backfill)
+
+    Returns:
+        Number of rollup rows written
+    """
+    first = db.session.execute(text(_FIRST_CHECKED_AT)).scalar()
+    if not first:
+        return 0
+
+    first_day = datetime.fromisoformat(str(first)).date()
+    today = datetime.utcnow().date()
+    total = 0
+
+    # One month per transaction keeps the write lock short on big tables
+    day = first_day
+    while day <= today:
+        end = min(day + timedelta(days=31), today + timedelta(days=1))
+        total += rollup_days(day, end)
+        day = end
+
+    logger.info(f"Rolled up history since {first_day} ({total} rows)")
+    return total
+
+
+def live_daily_rows(keyword_id: int, domain_id: int, start_day: date, end_day: date):
+    """
+    Rollup-shaped rows computed on the fly from raw history for one pair
+
+    Used for days the scheduled rollup may not have caught up with yet.
+
+    Returns:
+        List of row mappings with the rank_history_daily columns
+    """
+    sql = _sql(_daily_aggregate(
+        "AND {keyword_id} = :keyword_id AND {domain_id} = :domain_id"
+    )).columns(day=Date, last_checked_at=DateTime)
+    return db.session.execute(sql, {
+        "start": _day_start(start_day),
+        "end": _day_start(end_day),
+        "keyword_id": keyword_id,
+        "domain_id": domain_id,
+    }).mappings().all()
+
+
+def prune_raw_history(retention_days: int = None, batch_size: int = 5000) -> int:
+    """
+    Delete raw rows older than the retention window, after rolling them up
+
+    Args:
+        retention_days: Keep raw rows this many days (default
+            Config.HISTORY_RETENTION_DAYS; 0 keeps everything)
+        batch_size: Rows deleted per transaction
+
+    Returns:
+        Number of rank_history rows plus serp_snapshots rows deleted
+    """
+    retention_days = Config.HISTORY_RETENTION_DAYS if retention_days is None else retention_days
+    if retention_days <= 0:
+        return 0
+
+    cutoff_day = datetime.utcnow().date() - timedelta(days=retention_days)
+    cutoff = _day_start(cutoff_day)
+
+    first = db.session.execute(text(_FIRST_CHECKED_AT)).scalar()
+    if not first or datetime.fromisoformat(str(first)) >= cutoff:
+        return 0
+
+    # Make sure every day about to lose its raw rows is in the rollup
+    rollup_days(datetime.fromisoformat(str(first)).date(), cutoff_day)
+
+    deleted = 0
+    for table in ("rank_history", "serp_snapshots"):
+        while True:
+            result = db.session.execute(text(f"""
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} WHERE checked_at < :cutoff LIMIT :batch
+                )
+            """).bindparams(bindparam("cutoff", type_=DateTime)), {"cutoff": cutoff, "batch": batch_size})
+            bump_versions(db.session, "rank_history")
+            db.session.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+
+    logger.info(f"Pruned {deleted} raw history rows/SERP snapshots older than {cutoff_day}")
+    return deleted
+
+
+def enable_incremental_vacuum() -> bool:
+    """
+    Switch the database to auto_vacuum=INCREMENTAL
+
+    Needs one full VACUUM, so it runs from migrate_add_daily_rollup.py and
+    never inside the live server.
+
+    Returns:
+        True if the mode was changed, False if it was already incremental
+    """
+    with db.engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            return False
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+        # In WAL mode the vacuumed copy sits in the -wal file until a checkpoint
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        return True
+
+
+def incremental_vacuum(pages: Optional[int] = None) -> None:
+    """
+    Return free pages left by pruning to the filesystem
+
+    Does nothing until enable_incremental_vacuum() ran (see
+    migrate_add_daily_rollup.py).
+
+    Args:
+        pages: Max pages to release (default Config.VACUUM_PAGES; 0 = all)
+    """
+    pages = Config.VACUUM_PAGES if pages is None else pages
+
+    with db.engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            logger.warning("auto_vacuum is not incremental, run migrate_add_daily_rollup.py to reclaim pruned pages")
+            return
+
+        conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(pages)})" if pages else "PRAGMA incremental_vacuum")
+
+
+# Identifies this process in maintenance_leases
+_LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(name: str, ttl_seconds: float) -> bool:
+    """
+    Take or renew the named maintenance lease for this process
+
+    Atomic across processes: the lease goes to this process only if it is
+    free, expired or already ours.
+
+    Args:
+        name: Lease name
+        ttl_seconds: How long the lease holds without renewal
+
+    Returns:
+        True if this process holds the lease
+    """
+    now = time.time()
+    db.session.execute(
+        sqlite_insert(MaintenanceLease.__table__)
+        .values(name=name, owner=None, expires_at=0)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    won = db.session.execute(
+        update(MaintenanceLease)
+        .where(
+            MaintenanceLease.name == name,
+            or_(MaintenanceLease.expires_at < now, MaintenanceLease.owner == _LEASE_OWNER),
+        )
+        .values(owner=_LEASE_OWNER, expires_at=now + ttl_seconds)
+    ).rowcount
+    db.session.commit()
+    return bool(won)
+
+
+def run_maintenance(app) -> None:
+    """
+    Scheduled job: refresh recent rollups, apply retention, reclaim space
+
+    Args:
+        app: Flask application (the job runs outside any request)
+    """
+    with app.app_context():
+        try:
+            # Held for two intervals, so a live owner renews it before it
+            # expires and a dead one is replaced after one missed run
+            if not acquire_lease("history_maintenance", Config.MAINTENANCE_INTERVAL_MINUTES * 60 * 2):
+                logger.debug("History maintenance runs in another process")
+                return
+            rollup_recent()
+            if prune_raw_history():
+                incremental_vacuum()
+        except Exception as e:
+            logger.error(f"History maintenance failed: {e}")
+            db.session.rollback()
+
+
+def start_maintenance_scheduler(app):
+    """
+    Run run_maintenance() periodically in a background thread
+
+    Called from the serving entry point only, not from create_app(), so
+    migration scripts and other importers of the app never schedule it.
+
+    Args:
+        app: Flask application
+
+    Returns:
+        Scheduler instance, or None if disabled or APScheduler is missing
+    """
+    if Config.MAINTENANCE_INTERVAL_MINUTES <= 0:
+        return None
+
+    try:
+        from apscheduler.schedulers.background import BackgroundScheduler
+    except ImportError:
+        logger.warning("APScheduler not installed, history rollup/retention will not run automatically")
+        return None
+
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(
+        run_maintenance,
+        "interval",
+        args=[app],
+        minutes=Config.MAINTENANCE_INTERVAL_MINUTES,
+        id="history_maintenance",
+        coalesce=True,
+        max_instances=1,
+    )
+    scheduler.start()
+    logger.info(f"History maintenance scheduled every {Config.MAINTENANCE_INTERVAL_MINUTES} minutes")
+    return scheduler
@@ -0,0 +1,116 @@
+"""
+Adaptive page planning for bulk checks
+
+A bulk check needs `limit` usable results per keyword. Google usually fills
+a page with 10 organic results but some keywords (and locations) return
+fewer, so the fixed "fetch 50 for 30" buffer paid for up to 7 pages when 3
+were enough. Instead, every bulk fetch records how many usable results it
+got per page for its keyword/location (serp_yields), and the next check of
+that keyword fetches ceil(limit / expected yield) pages. A check that still
+comes up short fetches more pages then (see routes/bulk.py), so fewer pages
+never means fewer results.
+"""
+import math
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.dimensions import Keyword, Location
+from models.serp_yield import SerpYield
+from .dimensions import ids_for, lookup_id, ensure_ids
+from .serper import RESULTS_PER_PAGE
+
+
+MAX_PAGES = 10
+
+# Weight of the newest observation in the smoothed yield
+YIELD_WEIGHT = 0.3
+
+
+def pages_for(limit: int, results_per_page: float) -> int:
+    """
+    Pages expected to hold limit usable results
+
+    Examples:
+        pages_for(30, 10.0) -> 3
+        pages_for(30, 8.5) -> 4
+    """
+    return max(1, min(MAX_PAGES, math.ceil(limit / max(results_per_page, 1.0))))
+
+
+def plan_pages(db_session, location: str, keywords: Iterable[str], limit: int) -> Dict[str, int]:
+    """
+    Planned page count per keyword for one bulk check
+
+    Keywords without history use the average yield of their location, or
+    full pages when the location has none either.
+
+    Args:
+        db_session: SQLAlchemy session
+        location: Location code
+        keywords: Keywords of the check
+        limit: Usable results wanted per keyword
+
+    Returns:
+        Dict of keyword -> pages to fetch first
+    """
+    keywords = list(keywords)
+    location_id = lookup_id(db_session, Location, location)
+
+    yields, fallback = {}, float(RESULTS_PER_PAGE)
+    if location_id is not None:
+        keyword_ids = ids_for(db_session, Keyword, (k.strip() for k in keywords))
+        if keyword_ids:
+            stored = dict(db_session.execute(
+                select(SerpYield.keyword_id, SerpYield.results_per_page)
+                .where(SerpYield.location_id == location_id, SerpYield.keyword_id.in_(keyword_ids.values()))
+            ).all())
+            yields = {k: stored[i] for k, i in keyword_ids.items() if i in stored}
+        average = db_session.execute(
+            select(func.avg(SerpYield.results_per_page)).where(SerpYield.location_id == location_id)
+        ).scalar()
+        if average is not None:
+            fallback = average
+
+    return {k: pages_for(limit, yields.get(k.strip(), fallback)) for k in keywords}
+
+
+def record_yields(db_session, location: str, observations: Iterable[Tuple[str, int, int]]) -> None:
+    """
+    Fold observed yields into serp_yields and commit
+
+    Args:
+        db_session: SQLAlchemy session
+        location: Location code
+        observations: (keyword, pages fetched, usable results) per keyword
+    """
+    observations = [(k.strip(), pages, usable) for k, pages, usable in observations if pages > 0]
+    if not observations:
+        return
+
+    keyword_ids = ensure_ids(db_session, Keyword, (k for k, _, _ in observations))
+    location_id = ensure_ids(db_session, Location, [location])[location]
+    now = datetime.utcnow()
+
+    table = SerpYield.__table__
+    for keyword, pages, usable in observations:
+        stmt = sqlite_insert(table).values(
+            keyword_id=keyword_ids[keyword],
+            location_id=location_id,
+            results_per_page=usable / pages,
+            samples=1,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.keyword_id, table.c.location_id],
+            set_={
+                "results_per_page": table.c.results_per_page
+                + YIELD_WEIGHT * (stmt.excluded.results_per_page - table.c.results_per_page),
+                "samples": table.c.samples + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db_session.execute(stmt)
+    db_session.commit()
@@ -9,7 +9,19 @@ import requests
 from config import Config, logger
 
 
-def serper_search(keyword: str, location: str, device: str, max_results: int = 30, api_key: str = None) -> List[Dict]:
+# Organic results on a full Google page (Serper pages are 10 results apart)
+RESULTS_PER_PAGE = 10
+
+
+def serper_search(
+    keyword: str,
+    location: str,
+    device: str,
+    max_results: int = 30,
+    api_key: str = None,
+    start_page: int = 1,
+    max_pages: int = None,
+) -> List[Dict]:
     """
     Search Google via Serper API and fetch up to max_results
 
@@ -21,6 +33,8 @@ def serper_search(keyword: str, location: str, device: str, max_results: int = 3
         device: Device type (desktop, mobile)
         max_results: Maximum number of results to fetch (default 30)
         api_key: Optional Serper API key (fallback to Config.SERPER_API_KEY if not provided)
+        start_page: First page to fetch (1-indexed), to continue an earlier search
+        max_pages: Page budget (default: derived from max_results with a buffer)
 
     Returns:
         List of organic search results with actualPosition field
@@ -38,13 +52,14 @@ def serper_search(keyword: str, location: str, device: str, max_results: int = 3
         raise ValueError("SERPER_API_KEY not configured")
 
     all_results = []
-    results_per_page = 10
+    results_per_page = RESULTS_PER_PAGE
 
     # ✅ FIX: Fetch more pages to ensure we get enough results
     # Google sometimes returns < 10 results/page (especially for niche keywords)
     # To guarantee max_results (usually 30), fetch extra pages as buffer
     # Increase to 10 pages (100 results) to maximize chances of getting 30
-    max_pages = min(10, int((max_results * 2) / results_per_page) + 2)
+    if max_pages is None:
+        max_pages = min(10, int((max_results * 2) / results_per_page) + 2)
 
     logger.info(
         f"Serper search plan: '{keyword}' | target={max_results} results | "
@@ -52,7 +67,8 @@ def serper_search(keyword: str, location: str, device: str, max_results: int = 3
     )
 
     try:
-        for page in range(max_pages):
+        last_page = start_page - 1 + max_pages  # exclusive, 0-indexed
+        for page in range(start_page - 1, last_page):
             start = page * results_per_page
 
             payload = {
@@ -66,7 +82,7 @@ def serper_search(keyword: str, location: str, device: str, max_results: int = 3
             }
 
             logger.info(
-                f"Serper search: {keyword} | page={page+1}/{max_pages} | "
+                f"Serper search: {keyword} | page={page+1}/{last_page} | "
                 f"positions {start+1}-{start+results_per_page} | location={location}"
             )
 
@@ -118,14 +134,14 @@ def serper_search(keyword: str, location: str, device: str, max_results: int = 3
                 break
 
             # Warn if we're running out of pages but don't have enough results yet
-            if page == max_pages - 2 and len(all_results) < max_results:
+            if page == last_page - 2 and len(all_results) < max_results:
                 logger.warning(
                     f"⚠️ May not reach {max_results} results. "
                     f"Currently at {len(all_results)} after {page+1} pages"
                 )
 
             # Rate limiting: delay between requests (reduced from 0.5s for faster fetching)
-            if page < max_pages - 1 and len(organic) > 0:
+            if page < last_page - 1 and len(organic) > 0:
                 time.sleep(0.3)
 
         # Log final result count
@@ -144,3 +160,10 @@ def serper_search(keyword: str, location: str, device: str, max_results: int = 3
     except Exception as e:
         logger.error(f"Serper search failed for '{keyword}': {e}")
         return all_results[:max_results] if all_results else []
+
+
+def pages_in(organic: List[Dict]) -> int:
+    """Pages covered by serper_search results (from their actualPosition)"""
+    if not organic:
+        return 0
+    return (organic[-1]["actualPosition"] - 1) // RESULTS_PER_PAGE + 1
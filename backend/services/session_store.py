@@ -0,0 +1,211 @@
+"""
+Storage for /api/stream sessions
+
+/api/stream/save stores the submitted form under a new session id and
+/api/stream reads it back, possibly in another worker process. Stores evict
+entries after a TTL and cap how many they keep (oldest first), so API keys
+submitted with a form do not outlive the session.
+
+Stored forms never carry API keys to disk: SQLiteSessionStore keeps the
+SECRET_FIELDS of a form in process memory only. A session read back by
+another process gets its form without them, and its checks fall back to
+Config.SERPER_API_KEY. The check job created from the form keeps the key the
+same way (services/check_jobs.py).
+
+Backends (Config.SESSION_STORE):
+    - "sqlite": stream_sessions table in the app database, shared by every
+      process using it
+    - "memory": per-process dict, for a single process or tests
+"""
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import Config, logger
+from models.stream_session import StreamSession
+from utils import json_dumps, json_loads
+
+
+# Form fields SQLiteSessionStore does not persist
+SECRET_FIELDS = ("api_key",)
+
+
+class SessionStore(ABC):
+    """Interface of session stores: session id -> form dict, with TTL and max size"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def put(self, session_id: str, data: Dict[str, str]) -> None:
+        """Store data under session_id, evicting expired and surplus entries"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, str]]:
+        """Stored data, or None if unknown or expired"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Forget a session (no-op if unknown)"""
+
+    @abstractmethod
+    def purge(self) -> int:
+        """Drop expired entries; returns how many were removed"""
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process store; entries are kept in insertion (= expiry) order"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        super().__init__(ttl_seconds, max_entries)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, session_id, data):
+        with self._lock:
+            self._entries.pop(session_id, None)
+            self._entries[session_id] = (time.time() + self.ttl_seconds, dict(data))
+            self._purge_locked()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[session_id]
+                return None
+            return dict(entry[1])
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def purge(self):
+        with self._lock:
+            return self._purge_locked()
+
+    def _purge_locked(self) -> int:
+        now, removed = time.time(), 0
+        while self._entries:
+            session_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[session_id]
+            removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Store backed by the stream_sessions table
+
+    Every call is one short transaction on its own connection, so it works
+    from request threads, stream generators and other processes alike.
+    SECRET_FIELDS are stripped before the insert and kept in a per-process
+    MemorySessionStore with the same TTL and size cap.
+    """
+
+    def __init__(self, engine, ttl_seconds: int, max_entries: int):
+        super().__init__(ttl_seconds, max_entries)
+        self.engine = engine
+        self.table = StreamSession.__table__
+        self._secrets = MemorySessionStore(ttl_seconds, max_entries)
+
+    def put(self, session_id, data):
+        secrets = {f: data[f] for f in SECRET_FIELDS if data.get(f)}
+        data = {k: v for k, v in data.items() if k not in SECRET_FIELDS}
+        if secrets:
+            self._secrets.put(session_id, secrets)
+        else:
+            self._secrets.delete(session_id)
+
+        now = time.time()
+        t = self.table
+        stmt = sqlite_insert(t).values(
+            session_id=session_id, data=json_dumps(data), created_at=now, expires_at=now + self.ttl_seconds,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.session_id],
+            set_={"data": stmt.excluded.data, "created_at": stmt.excluded.created_at, "expires_at": stmt.excluded.expires_at},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+            conn.execute(delete(t).where(t.c.expires_at <= now))
+            # Keep the newest max_entries (LIMIT -1 = no limit after the offset)
+            surplus = select(t.c.session_id).order_by(t.c.created_at.desc()).limit(-1).offset(self.max_entries)
+            conn.execute(delete(t).where(t.c.session_id.in_(surplus)))
+
+    def get(self, session_id):
+        t = self.table
+        with self.engine.connect() as conn:
+            data = conn.execute(
+                select(t.c.data).where(t.c.session_id == session_id).where(t.c.expires_at > time.time())
+            ).scalar()
+        if data is None:
+            return None
+        form = json_loads(data)
+        form.update(self._secrets.get(session_id) or {})
+        return form
+
+    def delete(self, session_id):
+        self._secrets.delete(session_id)
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.session_id == session_id))
+
+    def purge(self):
+        self._secrets.purge()
+        with self.engine.begin() as conn:
+            return conn.execute(delete(self.table).where(self.table.c.expires_at <= time.time())).rowcount
+
+    def __len__(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self.table)).scalar()
+
+
+_store: Optional[SessionStore] = None
+
+
+def init_session_store(engine, store: Optional[SessionStore] = None) -> SessionStore:
+    """
+    Create the process-wide session store
+
+    Called from create_app() after db.create_all().
+
+    Args:
+        engine: SQLAlchemy engine of the app database
+        store: Custom SessionStore to use instead of Config.SESSION_STORE
+
+    Returns:
+        The active store
+    """
+    global _store
+
+    if store is None:
+        if Config.SESSION_STORE == "memory":
+            store = MemorySessionStore(Config.SESSION_TTL_SECONDS, Config.SESSION_MAX_ENTRIES)
+        else:
+            store = SQLiteSessionStore(engine, Config.SESSION_TTL_SECONDS, Config.SESSION_MAX_ENTRIES)
+
+    store.purge()
+    _store = store
+    logger.info(f"Stream sessions: {type(store).__name__} (TTL {store.ttl_seconds}s, max {store.max_entries})")
+    return store
+
+
+def session_store() -> SessionStore:
+    """The store set up by init_session_store()"""
+    if _store is None:
+        raise RuntimeError("Session store not initialized, call init_session_store() first")
+    return _store
@@ -0,0 +1,139 @@
+"""
+Per-day position series for many keyword/domain pairs at once
+
+Backs /api/history/timeline: the wanted pairs go into the query as a VALUES
+list joined against the history sources (and rank_history_daily for long
+ranges), so a whole template's chart is one indexed query instead of one per
+pair.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text, bindparam, Date, DateTime
+
+from config import Config
+from extensions import db
+from .history_source import history_rows_sql
+
+
+# Last check of each pair/day. Days before :live_day come from the rollup
+# table, later ones from raw rows; without the rollup :live_day == :start_day.
+_TIMELINE_SQL = """
+    WITH wanted(keyword_id, domain_id) AS (VALUES {values}),
+    daily AS (
+        SELECT r.keyword_id, r.domain_id, r.day, r.last_position AS position,
+               r.last_checked_at AS checked_at, 0 AS id
+        FROM wanted w
+        JOIN rank_history_daily r ON r.keyword_id = w.keyword_id AND r.domain_id = w.domain_id
+        WHERE r.day >= :start_day AND r.day < :live_day {rollup_filters}
+        UNION ALL
+        SELECT keyword_id, domain_id, date(checked_at) AS day, position, checked_at, id
+        FROM ({raw_rows}) AS raw
+    ),
+    ranked AS (
+        SELECT keyword_id, domain_id, day, position,
+               ROW_NUMBER() OVER (
+                   PARTITION BY keyword_id, domain_id, day
+                   ORDER BY checked_at DESC, id DESC
+               ) AS rn
+        FROM daily
+    )
+    SELECT keyword_id, domain_id, day, position
+    FROM ranked
+    WHERE rn = 1
+    ORDER BY keyword_id, domain_id, day
+"""
+
+
+def _day_start(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day)
+
+
+def date_axis(start_day: date, end_day: date) -> List[str]:
+    """
+    Every day from start_day to end_day inclusive, as YYYY-MM-DD
+
+    Args:
+        start_day: First day
+        end_day: Last day
+
+    Returns:
+        List of ISO date strings
+    """
+    return [(start_day + timedelta(days=i)).isoformat() for i in range((end_day - start_day).days + 1)]
+
+
+def pair_timelines(
+    pair_ids: Sequence[Tuple[int, int]],
+    start_day: date,
+    end_day: date,
+    location_id: Optional[int] = None,
+    device_id: Optional[int] = None,
+    use_rollup: bool = False,
+) -> Dict[Tuple[int, int], List[Tuple[str, Optional[int]]]]:
+    """
+    Last position per day for each (keyword_id, domain_id) pair, in one query
+
+    Args:
+        pair_ids: (keyword_id, domain_id) tuples
+        start_day: First day (UTC)
+        end_day: Last day (UTC), inclusive
+        location_id: Only checks from this location
+        device_id: Only checks from this device
+        use_rollup: Read days older than the rollup lookback from rank_history_daily
+
+    Returns:
+        Dict of pair -> [(day, position), ...] in day order; position is None
+        when the domain was checked but not found. Days without a check are
+        absent.
+    """
+    if not pair_ids:
+        return {}
+
+    live_day = start_day
+    if use_rollup:
+        today = datetime.utcnow().date()
+        live_day = min(max(start_day, today - timedelta(days=Config.ROLLUP_LOOKBACK_DAYS - 1)), end_day + timedelta(days=1))
+
+    params = {
+        "start_day": start_day,
+        "live_day": live_day,
+        "live": _day_start(live_day),
+        "end": _day_start(end_day + timedelta(days=1)),
+    }
+    values = []
+    for i, (keyword_id, domain_id) in enumerate(pair_ids):
+        values.append(f"(:k{i}, :d{i})")
+        params[f"k{i}"] = keyword_id
+        params[f"d{i}"] = domain_id
+
+    rollup_filters, raw_filters = [], []
+    if location_id is not None:
+        rollup_filters.append("AND r.location_id = :location_id")
+        raw_filters.append("AND {location_id} = :location_id")
+        params["location_id"] = location_id
+    if device_id is not None:
+        rollup_filters.append("AND r.device_id = :device_id")
+        raw_filters.append("AND {device_id} = :device_id")
+        params["device_id"] = device_id
+
+    raw_rows = history_rows_sql(
+        ["keyword_id", "domain_id", "position", "checked_at", "id"],
+        where=" ".join(["{checked_at} >= :live AND {checked_at} < :end"] + raw_filters),
+        join="JOIN wanted w ON w.keyword_id = {keyword_id} AND w.domain_id = {domain_id}",
+    )
+    sql = text(_TIMELINE_SQL.format(
+        values=", ".join(values),
+        rollup_filters=" ".join(rollup_filters),
+        raw_rows=raw_rows,
+    )).bindparams(
+        bindparam("start_day", type_=Date),
+        bindparam("live_day", type_=Date),
+        bindparam("live", type_=DateTime),
+        bindparam("end", type_=DateTime),
+    )
+
+    timelines: Dict[Tuple[int, int], List[Tuple[str, Optional[int]]]] = {}
+    for keyword_id, domain_id, day, position in db.session.execute(sql, params):
+        timelines.setdefault((keyword_id, domain_id), []).append((day, position))
+    return timelines
@@ -0,0 +1,133 @@
+"""
+Table version counters and conditional GET
+
+Every write path bumps a counter in table_versions in the same transaction
+as the write. Read endpoints build their ETag/Last-Modified from those
+counters, so a revalidation (If-None-Match / If-Modified-Since) is answered
+with 304 after one primary-key lookup, before the real query runs.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import request, make_response
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+from models.table_version import TableVersion
+
+
+def bump_versions(db_session, *names: str) -> None:
+    """
+    Increment the write counters of the given tables
+
+    Call inside the writing transaction; the caller commits.
+
+    Args:
+        db_session: SQLAlchemy session
+        names: Table names, e.g. "rank_history"
+    """
+    now = datetime.utcnow()
+    for name in names:
+        stmt = sqlite_insert(TableVersion.__table__).values(name=name, version=1, updated_at=now)
+        db_session.execute(stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                "version": TableVersion.__table__.c.version + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
+
+
+def current_versions(names: Iterable[str]) -> Dict[str, Tuple[int, Optional[datetime]]]:
+    """
+    Read the write counters of the given tables
+
+    Args:
+        names: Table names
+
+    Returns:
+        Dict of name -> (version, updated_at); never-written tables are (0, None)
+    """
+    names = list(names)
+    found = {
+        name: (version, updated_at)
+        for name, version, updated_at in db.session.execute(
+            select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+            .where(TableVersion.name.in_(names))
+        )
+    }
+    return {name: found.get(name, (0, None)) for name in names}
+
+
+def _validators(tables, bucket_seconds: Optional[int]) -> Tuple[str, Optional[datetime]]:
+    """ETag and Last-Modified for the current request"""
+    versions = current_versions(tables)
+
+    # Same data + same normalized query string -> same ETag
+    parts = [request.path]
+    parts += [f"{k}={v}" for k, v in sorted(request.args.items(multi=True))]
+    parts += [f"{name}:{version}" for name, (version, _) in sorted(versions.items())]
+
+    last_modified = max((ts for _, ts in versions.values() if ts), default=None)
+
+    if bucket_seconds:
+        # Time-relative responses (e.g. "last 30 days") change as time passes
+        now = datetime.utcnow().timestamp()
+        bucket_start = int(now // bucket_seconds) * bucket_seconds
+        parts.append(f"t:{bucket_start}")
+        bucket_dt = datetime.utcfromtimestamp(bucket_start)
+        last_modified = max(last_modified, bucket_dt) if last_modified else bucket_dt
+
+    etag = hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+    return etag, last_modified
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional_get(*tables: str, bucket_seconds: Optional[int] = None):
+    """
+    Decorator adding ETag/Last-Modified validation to a GET endpoint
+
+    The ETag covers the request path, its query parameters and the version
+    counters of the tables the endpoint reads. ETags are weak because
+    compression changes the bytes on the wire.
+
+    Args:
+        tables: Names of the tables whose writes change the response
+        bucket_seconds: Also change the ETag every N seconds, for responses
+            relative to the current time
+
+    Examples:
+        @conditional_get("templates")
+        def get_templates(): ...
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = _validators(tables, bucket_seconds)
+
+            if _not_modified(etag, last_modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # Cache, but revalidate every time
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
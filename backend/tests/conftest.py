@@ -0,0 +1,45 @@
+"""
+Shared fixtures: the app on a throwaway SQLite database
+
+Config is pointed at a temporary file before app.py is imported, so the
+module-level create_app() never touches instance/templates.db. Tables are
+emptied after every test; dimension rows (keywords, domains, ...) are kept,
+like the id caches that refer to them.
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+_TMP_DIR = tempfile.mkdtemp(prefix="ranking-tests-")
+Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+Config.SESSION_STORE = "memory"
+
+from app import app as flask_app  # noqa: E402
+from extensions import db  # noqa: E402
+
+# Tables written by the tests, children first
+_CLEARED_TABLES = ("check_job_pairs", "check_jobs", "rank_history", "serp_snapshots", "check_sessions")
+
+
+@pytest.fixture(scope="session")
+def app():
+    yield flask_app
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db_session(app):
+    """db.session inside an app context; written tables are emptied afterwards"""
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        for table in _CLEARED_TABLES:
+            db.session.execute(db.text(f"DELETE FROM {table}"))
+        db.session.commit()
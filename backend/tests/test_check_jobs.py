@@ -0,0 +1,171 @@
+"""
+JobRunner claim / resume / ownership paths and JobTail replay
+
+Pairs are "checked" by a stub instead of process_pair, so no Serper calls
+are made; everything else (claims, checkpoints, the shared check scheduler)
+runs for real against the test database.
+"""
+import time
+
+import pytest
+from sqlalchemy import select, update
+
+from models.check_job import CheckJob, CheckJobPair
+from services import check_jobs
+from services.check_jobs import JobRunner, JobTail, create_job, KEY_LOST_ERROR
+
+
+@pytest.fixture
+def checked(monkeypatch):
+    """Stub for _check_pair; records (keyword, api_key) of every checked pair"""
+    calls = []
+
+    def check(app, job, keyword, domain):
+        calls.append((keyword, job["api_key"]))
+        return {"keyword": keyword, "domain": domain, "position": 1}
+
+    monkeypatch.setattr(check_jobs, "_check_pair", check)
+    return calls
+
+
+def _runner(app) -> JobRunner:
+    runner = JobRunner()
+    runner._app = app  # drive _claim/_run directly instead of the loop thread
+    return runner
+
+
+def _create(job_id: str, n_pairs: int = 3, **form) -> None:
+    form = {
+        "keywords": "\n".join(f"kw{i}" for i in range(n_pairs)),
+        "domains": "\n".join("example.com" for _ in range(n_pairs)),
+        "location": "vn",
+        "device": "desktop",
+        **form,
+    }
+    assert create_job(job_id, form)
+
+
+def _job(db_session, job_id: str) -> CheckJob:
+    db_session.expire_all()
+    return db_session.get(CheckJob, job_id)
+
+
+def test_claimed_job_runs_to_done_and_replays(app, db_session, checked):
+    _create("job-done")
+    runner = _runner(app)
+
+    assert runner._claim() == ["job-done"]
+    assert _job(db_session, "job-done").owner == runner.owner
+
+    runner._run("job-done")
+
+    job = _job(db_session, "job-done")
+    assert (job.state, job.done_pairs) == ("done", 3)
+    assert sorted(k for k, _ in checked) == ["kw0", "kw1", "kw2"]
+
+    events, done = JobTail("job-done").wait_events(0, timeout=0)
+    assert done and [seq for seq, _ in events] == [1, 2, 3]
+    # Resuming from Last-Event-ID only replays what came after it
+    events, done = JobTail("job-done").wait_events(2, timeout=0)
+    assert done and [seq for seq, _ in events] == [3]
+
+
+def test_claim_is_exclusive(app, db_session, checked):
+    _create("job-once")
+    first, second = _runner(app), _runner(app)
+
+    assert first._claim() == ["job-once"]
+    assert second._claim() == []
+    assert _job(db_session, "job-once").owner == first.owner
+
+
+def test_stale_job_is_reclaimed_and_resumes_from_checkpoint(app, db_session, checked):
+    _create("job-stale")
+    dead, alive = _runner(app), _runner(app)
+    assert dead._claim() == ["job-stale"]
+
+    # The first owner checkpointed kw0, then stopped heartbeating
+    first_pair = db_session.execute(
+        select(CheckJobPair.id).where(CheckJobPair.job_id == "job-stale", CheckJobPair.position == 0)
+    ).scalar()
+    db_session.execute(update(CheckJobPair).where(CheckJobPair.id == first_pair).values(event_id=1, result="{}"))
+    db_session.execute(
+        update(CheckJob).where(CheckJob.id == "job-stale")
+        .values(done_pairs=1, heartbeat_at=time.time() - check_jobs.Config.JOB_STALE_SECONDS - 1)
+    )
+    db_session.commit()
+
+    assert alive._claim() == ["job-stale"]
+    alive._run("job-stale")
+
+    job = _job(db_session, "job-stale")
+    assert (job.state, job.done_pairs, job.owner) == ("done", 3, alive.owner)
+    assert sorted(k for k, _ in checked) == ["kw1", "kw2"]
+    events, _ = JobTail("job-stale").wait_events(0, timeout=0)
+    assert [seq for seq, _ in events] == [1, 2, 3]
+
+
+def test_runner_that_lost_its_job_stops_without_writing(app, db_session, checked):
+    _create("job-lost")
+    runner = _runner(app)
+    assert runner._claim() == ["job-lost"]
+
+    db_session.execute(update(CheckJob).where(CheckJob.id == "job-lost").values(owner="another-runner"))
+    db_session.commit()
+    runner._run("job-lost")
+
+    job = _job(db_session, "job-lost")
+    assert (job.state, job.done_pairs, job.owner) == ("running", 0, "another-runner")
+    assert db_session.execute(
+        select(CheckJobPair.id).where(CheckJobPair.job_id == "job-lost", CheckJobPair.event_id.isnot(None))
+    ).first() is None
+
+
+def test_finish_only_applies_to_the_owner(app, db_session, checked):
+    _create("job-finish")
+    runner = _runner(app)
+    assert runner._claim() == ["job-finish"]
+
+    db_session.execute(update(CheckJob).where(CheckJob.id == "job-finish").values(owner="another-runner"))
+    db_session.commit()
+    runner._finish("job-finish", "failed")
+    assert _job(db_session, "job-finish").state == "running"
+
+    db_session.execute(update(CheckJob).where(CheckJob.id == "job-finish").values(owner=runner.owner))
+    db_session.commit()
+    runner._finish("job-finish", "cancelled")
+    job = _job(db_session, "job-finish")
+    assert (job.state, job.finished_at is not None) == ("cancelled", True)
+
+
+def test_api_key_stays_in_memory(app, db_session, checked):
+    _create("job-key", api_key="secret-key")
+    assert _job(db_session, "job-key").has_api_key
+
+    runner = _runner(app)
+    assert runner._claim() == ["job-key"]
+    runner._run("job-key")
+
+    assert {key for _, key in checked} == {"secret-key"}
+    assert check_jobs._job_keys.get("job-key") is None  # dropped when the job finished
+
+
+def test_job_resumed_without_its_api_key_fails(app, db_session, checked):
+    _create("job-nokey", api_key="secret-key")
+    check_jobs._job_keys.delete("job-nokey")  # as after a restart
+
+    runner = _runner(app)
+    assert runner._claim() == ["job-nokey"]
+    runner._run("job-nokey")
+
+    job = _job(db_session, "job-nokey")
+    assert (job.state, job.error) == ("failed", KEY_LOST_ERROR)
+    assert checked == []
+    events, done = JobTail("job-nokey").wait_events(0, timeout=0)
+    assert done and KEY_LOST_ERROR in events[-1][1]
+
+
+def test_tail_of_missing_job_ends_with_error(app, db_session):
+    events, done = JobTail("no-such-job").wait_events(5, timeout=0)
+    assert done
+    assert events == [(6, '{"error":"Job not found"}')]
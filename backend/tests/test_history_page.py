@@ -0,0 +1,80 @@
+"""
+Keyset pagination of the merged history (history_page)
+
+History mixes rank_history rows and bulk SERP snapshots expanded with
+json_each (negative synthetic ids), with ties on checked_at inside a
+snapshot and between rows; cursors must walk all of them exactly once in
+both directions.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.rank_history import RankHistory
+from services.history_writer import record_history, record_serps
+from services.history_query import NEWEST_FIRST, history_select, history_page, history_filters
+
+T0 = datetime(2026, 1, 1, 10, 0, 0)
+
+
+@pytest.fixture
+def history(db_session):
+    """9 rank_history rows (two sharing a checked_at) and a 3-result snapshot"""
+    rows = [
+        RankHistory(
+            keyword=f"kw{i}", domain="example.com", position=i + 1, url=f"https://example.com/{i}",
+            location="hanoi" if i % 3 == 0 else "vn", device="desktop",
+            checked_at=T0 + timedelta(minutes=min(i, 7)), session_id="s1", check_type="single",
+        )
+        for i in range(9)
+    ]
+    record_history(db_session, rows)
+    record_serps(db_session, "s2", "vn", "desktop", [
+        ("bulk kw", T0 + timedelta(minutes=3, seconds=30), [
+            ("a.com", "https://a.com/"), ("b.com", "https://b.com/"), ("c.com", "https://c.com/"),
+        ]),
+    ])
+    return [r.id for r in db_session.execute(history_select().order_by(NEWEST_FIRST)).all()]
+
+
+def _walk(where, limit):
+    pages, cursor = [], None
+    while True:
+        rows, next_cursor, prev_cursor = history_page(where, cursor, limit)
+        pages.append((rows, next_cursor, prev_cursor))
+        if not next_cursor:
+            return pages
+        cursor = next_cursor
+
+
+def test_next_cursors_visit_every_row_once(history):
+    assert len(history) == 12
+    assert any(i < 0 for i in history)  # snapshot rows are part of the walk
+
+    pages = _walk(None, 5)
+    assert [len(rows) for rows, _, _ in pages] == [5, 5, 2]
+    assert [r.id for rows, _, _ in pages for r in rows] == history
+    assert pages[0][2] is None  # nothing before the first page
+
+
+def test_prev_cursor_returns_the_previous_page(history):
+    first, next_cursor, _ = history_page(None, None, 4)
+    second, _, prev_cursor = history_page(None, next_cursor, 4)
+    assert [r.id for r in second] == history[4:8]
+
+    back, back_next, back_prev = history_page(None, prev_cursor, 4)
+    assert [r.id for r in back] == [r.id for r in first]
+    assert back_prev is None and back_next is not None
+
+
+def test_cursor_pages_keep_filters(db_session, history):
+    where = history_filters(location="hanoi")
+    pages = _walk(where, 2)
+    rows = [r for page, _, _ in pages for r in page]
+    assert [r.location for r in rows] == ["hanoi"] * 3
+    assert [r.keyword for r in rows] == ["kw6", "kw3", "kw0"]
+
+
+def test_malformed_cursor_is_rejected(history):
+    with pytest.raises(ValueError):
+        history_page(None, "not-a-cursor", 5)
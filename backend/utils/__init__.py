@@ -4,7 +4,10 @@ Utility functions for Ranking Checker
 from .validation import validate_domain_like, validate_keyword
 from .domain import normalize_host, final_host_for_input, final_host_of_url
 from .redirect import follow_http_redirects, maybe_meta_refresh
-from .helpers import chunked
+from .helpers import chunked, day_range
+from .pagination import encode_cursor, decode_cursor, keyset_page, keyset_window
+from .compression import init_compression
+from .serialization import FastJSONProvider, dumps as json_dumps, loads as json_loads
 
 __all__ = [
     'validate_domain_like',
@@ -15,4 +18,13 @@ __all__ = [
     'follow_http_redirects',
     'maybe_meta_refresh',
     'chunked',
+    'day_range',
+    'encode_cursor',
+    'decode_cursor',
+    'keyset_page',
+    'keyset_window',
+    'init_compression',
+    'FastJSONProvider',
+    'json_dumps',
+    'json_loads',
 ]
@@ -0,0 +1,181 @@
+"""
+Negotiated gzip/brotli response compression
+
+Registered on the app by init_compression(). Buffered responses are compressed
+in one go above a size threshold; streamed exports are compressed chunk by
+chunk with a sync flush after each chunk so nothing sits in the compressor.
+SSE streams are only compressed when the client opts in with ?compress=1,
+since some proxies buffer compressed event streams.
+"""
+import gzip
+import zlib
+
+from flask import request
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Mimetypes worth compressing (JSON APIs, exports, SSE)
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+    "text/html",
+    "text/event-stream",
+}
+
+# Streamed mimetypes compressed without opt-in
+_STREAMED_MIMETYPES = {"application/x-ndjson", "text/csv"}
+
+
+def choose_encoding(accept_encodings) -> str:
+    """
+    Pick the best supported content coding from Accept-Encoding
+
+    Args:
+        accept_encodings: request.accept_encodings
+
+    Returns:
+        "br", "gzip", or None for identity
+    """
+    if brotli is not None and accept_encodings["br"] > 0:
+        return "br"
+    if accept_encodings["gzip"] > 0:
+        return "gzip"
+    return None
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    """
+    Compress a whole response body
+
+    Args:
+        data: Body bytes
+        encoding: "br" or "gzip"
+
+    Returns:
+        Compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=Config.BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.COMPRESSION_LEVEL)
+
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compress a streamed body, flushing after every chunk
+
+    Each chunk the app yields (an SSE event, an export batch) reaches the
+    client as soon as it is produced instead of waiting for the compressor's
+    internal buffer to fill.
+
+    Args:
+        chunks: Iterable of str/bytes chunks
+        encoding: "br" or "gzip"
+
+    Yields:
+        Compressed bytes
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=Config.BROTLI_QUALITY)
+
+        def flush():
+            return compressor.flush()
+
+        def finish():
+            return compressor.finish()
+
+        compress = compressor.process
+    else:
+        # wbits=31: zlib stream with a gzip header and trailer
+        compressor = zlib.compressobj(Config.COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        def finish():
+            return compressor.flush(zlib.Z_FINISH)
+
+        compress = compressor.compress
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if not chunk:
+                continue
+            yield compress(chunk) + flush()
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+
+def _should_compress(response) -> bool:
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if request.method == "HEAD" or "Content-Encoding" in response.headers:
+        return False
+    if "no-transform" in response.headers.get("Cache-Control", ""):
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+
+    if response.is_streamed:
+        if response.mimetype == "text/event-stream":
+            return request.args.get("compress") == "1"
+        return response.mimetype in _STREAMED_MIMETYPES
+
+    return response.content_length is not None and response.content_length >= Config.COMPRESSION_MIN_SIZE
+
+
+def compress_response(response):
+    """
+    after_request hook: compress the response if the client accepts it
+
+    Args:
+        response: Flask response
+
+    Returns:
+        The same response, possibly with a compressed body
+    """
+    if not _should_compress(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        response.set_data(compress_bytes(response.get_data(), encoding))
+
+    response.headers["Content-Encoding"] = encoding
+
+    # Compressed bytes differ from the identity representation
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def init_compression(app) -> None:
+    """
+    Enable response compression on the app (no-op if COMPRESSION_ENABLED is off)
+
+    Args:
+        app: Flask application
+    """
+    if Config.COMPRESSION_ENABLED:
+        app.after_request(compress_response)
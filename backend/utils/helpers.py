@@ -1,7 +1,8 @@
 """
 General helper utilities
 """
-from typing import List, Iterable
+from datetime import date, datetime, timedelta
+from typing import List, Iterable, Optional, Tuple
 
 
 def chunked(iterable: List, size: int) -> Iterable[List]:
@@ -24,3 +25,39 @@ def chunked(iterable: List, size: int) -> Iterable[List]:
 
     for i in range(0, len(iterable), size):
         yield iterable[i:i+size]
+
+
+def day_range(params, default_days: int = 30, max_days: Optional[int] = None) -> Tuple[date, date]:
+    """
+    Inclusive (start_day, end_day) from start_date/end_date/days parameters
+
+    Args:
+        params: Request args or JSON body (anything with .get)
+        default_days: Lookback used when neither start_date nor days is given
+        max_days: Longest allowed range in days (None = unlimited)
+
+    Returns:
+        (start_day, end_day); end_day defaults to today (UTC), start_day to
+        end_day - days
+
+    Raises:
+        ValueError: Unparsable values, start after end, or a range over max_days
+
+    Examples:
+        day_range({"start_date": "2024-01-01", "end_date": "2024-01-31"}) -> (date(2024, 1, 1), date(2024, 1, 31))
+    """
+    try:
+        end_day = datetime.fromisoformat(params["end_date"]).date() if params.get("end_date") else datetime.utcnow().date()
+        if params.get("start_date"):
+            start_day = datetime.fromisoformat(params["start_date"]).date()
+        else:
+            start_day = end_day - timedelta(days=int(params.get("days", default_days)))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid start_date, end_date or days")
+
+    if start_day > end_day:
+        raise ValueError("start_date must be before end_date")
+    if max_days is not None and (end_day - start_day).days + 1 > max_days:
+        raise ValueError(f"Date range too long (max {max_days} days)")
+    return start_day, end_day
+
@@ -0,0 +1,146 @@
+"""
+Keyset (cursor) pagination utilities
+"""
+import json
+import base64
+from datetime import datetime
+from typing import Optional, Tuple, List
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(checked_at, row_id: int, direction: str = "next") -> str:
+    """
+    Build an opaque cursor pointing at one row of a (checked_at, id) ordering
+
+    Args:
+        checked_at: Timestamp of the boundary row (datetime or ISO string)
+        row_id: Primary key of the boundary row
+        direction: "next" (older rows) or "prev" (newer rows)
+
+    Returns:
+        URL-safe cursor string
+
+    Examples:
+        encode_cursor(datetime(2024, 1, 1), 42) -> "eyJ0IjoiMjAyNC0wMS0w..."
+    """
+    if not isinstance(checked_at, str):
+        checked_at = checked_at.isoformat()
+    payload = {"t": checked_at, "id": row_id, "d": direction[0]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from a previous response
+
+    Returns:
+        Tuple of (checked_at, row_id, direction)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = {"n": "next", "p": "prev"}[payload["d"]]
+        return datetime.fromisoformat(payload["t"]), int(payload["id"]), direction
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor[:50]}") from e
+
+
+def keyset_page(
+    query,
+    time_col,
+    id_col,
+    cursor: Optional[str],
+    limit: int,
+    session=None,
+    time_key: Optional[str] = None,
+) -> Tuple[List, Optional[str], Optional[str]]:
+    """
+    Fetch one page of a query ordered newest-first by (time_col, id_col)
+
+    Uses a row-value comparison against the cursor instead of OFFSET, so every
+    page costs the same no matter how deep it is. Relies on an index over
+    time_col (SQLite indexes implicitly end with the integer primary key).
+
+    Args:
+        query: Filtered SQLAlchemy query (without ordering or limit)
+        time_col: Timestamp column, e.g. RankHistory.checked_at
+        id_col: Primary key column used as tie-breaker
+        cursor: Cursor from a previous page, or None for the first page
+        limit: Page size
+        session: Session to execute with when query is a Core select()
+        time_key: Row attribute holding the raw timestamp (default time_col.key)
+
+    Returns:
+        Tuple of (rows, next_cursor, prev_cursor); cursors are None at the ends
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    direction = "next"
+    if cursor:
+        checked_at, row_id, direction = decode_cursor(cursor)
+        if direction == "next":
+            query = query.filter(tuple_(time_col, id_col) < tuple_(checked_at, row_id))
+        else:
+            query = query.filter(tuple_(time_col, id_col) > tuple_(checked_at, row_id))
+
+    if direction == "next":
+        query = query.order_by(time_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(time_col.asc(), id_col.asc())
+
+    # Fetch one extra row to know whether another page exists
+    query = query.limit(limit + 1)
+    rows = session.execute(query).all() if session is not None else query.all()
+    return keyset_window(rows, limit, cursor, direction, time_key or time_col.key, id_col.key)
+
+
+def keyset_window(
+    rows: List,
+    limit: int,
+    cursor: Optional[str],
+    direction: str,
+    time_key: str,
+    id_key: str,
+) -> Tuple[List, Optional[str], Optional[str]]:
+    """
+    Trim a fetched keyset page and build its cursors
+
+    Args:
+        rows: Up to limit + 1 rows, in fetch order (newest first for
+            "next", oldest first for "prev")
+        limit: Page size
+        cursor: Cursor the page was fetched with, or None
+        direction: "next" or "prev" (from the cursor)
+        time_key: Row attribute holding the raw timestamp
+        id_key: Row attribute holding the id
+
+    Returns:
+        Tuple of (rows newest first, next_cursor, prev_cursor)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if direction == "prev":
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(cursor)
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_key), getattr(last, id_key), "next")
+    if rows and has_prev:
+        first = rows[0]
+        prev_cursor = encode_cursor(getattr(first, time_key), getattr(first, id_key), "prev")
+
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,95 @@
+"""
+Fast JSON serialization
+
+Uses orjson when installed and falls back to the stdlib json module. Both
+paths serialize datetimes natively: naive datetimes are treated as UTC and
+rendered like isoformat() + 'Z' (the format the API has always returned),
+dates as YYYY-MM-DD.
+"""
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(o):
+    """Stdlib json fallback for types orjson handles natively"""
+    if isinstance(o, datetime):
+        if o.tzinfo is None:
+            return o.isoformat() + 'Z'
+        if o.utcoffset() == timezone.utc.utcoffset(None):
+            return o.replace(tzinfo=None).isoformat() + 'Z'
+        return o.isoformat()
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj, indent: int = None) -> str:
+    """
+    Serialize obj to a JSON string (non-ASCII characters kept as-is)
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with this indent (orjson only supports 2)
+
+    Returns:
+        JSON string
+
+    Examples:
+        dumps({"checked_at": datetime(2024, 1, 1)}) -> '{"checked_at":"2024-01-01T00:00:00Z"}'
+    """
+    if orjson is not None:
+        option = _ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=_default, option=option).decode()
+
+    return json.dumps(
+        obj,
+        default=_default,
+        ensure_ascii=False,
+        indent=indent,
+        separators=None if indent else (",", ":"),
+    )
+
+
+def loads(s):
+    """
+    Parse a JSON string or bytes
+
+    Args:
+        s: JSON document
+
+    Returns:
+        Parsed object
+    """
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps()/loads() above"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj, indent=kwargs.get("indent"))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + "\n", mimetype="application/json")
@@ -20,9 +20,11 @@ export const API_ENDPOINTS = {
   // Streaming
   STREAM_SAVE: `${API_BASE}/stream/save`,
   STREAM: `${API_BASE}/stream`,
+  STREAM_CANCEL: `${API_BASE}/stream/cancel`,
 
   // Bulk check
   BULK_CHECK: `${API_BASE}/bulk/check`,
+  BULK_CHECK_STREAM: `${API_BASE}/bulk/check/stream`,
 
   // Templates
   TEMPLATES: `${API_BASE}/templates`,
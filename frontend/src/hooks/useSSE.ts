@@ -25,10 +25,18 @@ export function useSSE(sessionId: string | null, opts?: { autoClear?: boolean })
 
   const url = useMemo(() => {
     if (!sessionId) return null;
-    return `${API_ENDPOINTS.STREAM}?session_id=${encodeURIComponent(sessionId)}`;
+    // batch=1: server gửi mảng kết quả mỗi frame (tối đa 50 kết quả / 100ms)
+    return `${API_ENDPOINTS.STREAM}?session_id=${encodeURIComponent(sessionId)}&batch=1`;
   }, [sessionId]);
 
   const cancel = () => {
+    // Dừng các cặp còn chờ trên server (đóng EventSource thôi thì server đợi kết nối lại)
+    if (sessionId && esRef.current && !endedRef.current) {
+      fetch(API_ENDPOINTS.STREAM_CANCEL, {
+        method: "POST",
+        body: new URLSearchParams({ session_id: sessionId }),
+      }).catch(() => {});
+    }
     endedRef.current = true;
     esRef.current?.close();
     esRef.current = null;
@@ -61,21 +69,29 @@ export function useSSE(sessionId: string | null, opts?: { autoClear?: boolean })
 
     es.onmessage = (evt) => {
       try {
-        const data = JSON.parse(evt.data) as Partial<RankResult> & { error?: string };
-
-        // Nếu server gửi một "fatal error" (chỉ có error, không có keyword/domain) => đóng stream
-        const hasKeywordOrDomain = !!(data && (data.keyword || data.domain));
-        if (data?.error && !hasKeywordOrDomain) {
-          setError(data.error || "Server error");
-          setStatus("error");
-          endedRef.current = true;
-          es.close();
-          esRef.current = null;
-          return;
+        // batch=1: một frame là mảng kết quả, cập nhật state một lần cho cả mảng
+        const parsed = JSON.parse(evt.data);
+        const items = (Array.isArray(parsed) ? parsed : [parsed]) as (Partial<RankResult> & { error?: string })[];
+        const rows: RankResult[] = [];
+
+        for (const data of items) {
+          // Nếu server gửi một "fatal error" (chỉ có error, không có keyword/domain) => đóng stream
+          const hasKeywordOrDomain = !!(data && (data.keyword || data.domain));
+          if (data?.error && !hasKeywordOrDomain) {
+            if (rows.length) setResults((prev) => [...prev, ...rows]);
+            setError(data.error || "Server error");
+            setStatus("error");
+            endedRef.current = true;
+            es.close();
+            esRef.current = null;
+            return;
+          }
+
+          // Còn lại: coi như là 1 dòng kết quả (kể cả khi có error per-item)
+          rows.push(data as RankResult);
         }
 
-        // Còn lại: coi như là 1 dòng kết quả (kể cả khi có error per-item)
-        setResults((prev) => [...prev, data as RankResult]);
+        setResults((prev) => [...prev, ...rows]);
       } catch {
         // ignore parse errors (có thể là keep-alive lines)
       }
@@ -103,6 +119,12 @@ export function useSSE(sessionId: string | null, opts?: { autoClear?: boolean })
         return;
       }
 
+      // Trình duyệt tự kết nối lại và gửi Last-Event-ID: server chỉ gửi lại phần còn thiếu
+      if (es.readyState === EventSource.CONNECTING) {
+        setStatus("connecting");
+        return;
+      }
+
       setError("SSE connection error");
       setStatus("error");
       es.close();
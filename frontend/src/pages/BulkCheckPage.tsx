@@ -4,7 +4,6 @@ import {
   ChevronDown, ChevronUp, Copy, Layers, Clock, CheckCircle, RotateCcw, LayoutGrid,
   MapPin, Rocket, Loader2
 } from "lucide-react";
-import axios from "axios";
 import { Card, Button, Textarea, Stack, Group, Box, Text, Badge, ActionIcon, Table, Anchor, Code, Alert, Modal, Tooltip, SegmentedControl } from "@mantine/core";
 import { notifications } from "@mantine/notifications";
 import BulkTemplate from "@components/BulkTemplate";
@@ -23,6 +22,7 @@ interface BulkResult {
     title: string;
   }>;
   checkedAt?: string;
+  error?: string;
 }
 
 const deviceOptions = [
@@ -189,22 +189,45 @@ export default function BulkCheckPage() {
         return;
       }
 
-      // Call API once with all keywords (most efficient - saves credits)
-      const response = await axios.post(API_ENDPOINTS.BULK_CHECK, {
-        keywords: keywordList,
-        location,
-        device,
-        limit: 30,
-        api_key: apiKey,
+      // Call API once with all keywords; keywords are checked in parallel and
+      // each one is streamed back (NDJSON) as soon as it is done
+      const response = await fetch(`${API_ENDPOINTS.BULK_CHECK_STREAM}?format=ndjson`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          keywords: keywordList,
+          location,
+          device,
+          limit: 30,
+          api_key: apiKey,
+        }),
       });
+      if (!response.ok || !response.body) {
+        const body = await response.json().catch(() => null);
+        throw new Error(body?.error || `HTTP ${response.status}`);
+      }
 
-      // Add timestamp to each result
-      const resultsWithTimestamp = response.data.results.map((r: BulkResult) => ({
-        ...r,
-        checkedAt: timestamp
-      }));
-
-      setResults(resultsWithTimestamp);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop() ?? "";
+
+        const batch: BulkResult[] = [];
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const item = JSON.parse(line);
+          // Keep-alive lines while keywords are slow, and the final summary
+          if (item.event === "ping" || item.event === "end") continue;
+          // Add timestamp to each result
+          batch.push({ keyword: item.keyword, topDomains: item.topDomains, checkedAt: timestamp, error: item.error });
+        }
+        if (batch.length) setResults((prev) => [...prev, ...batch]);
+      }
     } catch (err) {
       const errorMessage = getErrorMessage(err, "Có lỗi xảy ra khi kiểm tra");
       setError(errorMessage);
@@ -425,17 +448,24 @@ export default function BulkCheckPage() {
                                 <Text size="xs" c="dimmed">{result.checkedAt}</Text>
                               </Group>
                             )}
-                            <Group gap={6}>
-                              <FileText size={14} color="var(--mantine-color-gray-6)" />
-                              <Text size="xs" c="dimmed">
-                                {result.topDomains.length} {result.topDomains.length === 1 ? 'result' : 'results'}
-                                {result.topDomains.length < 30 && (
-                                  <Text component="span" c="orange" ml={4}>
-                                    (limited by search engine)
-                                  </Text>
-                                )}
-                              </Text>
-                            </Group>
+                            {result.error ? (
+                              <Group gap={6}>
+                                <AlertCircle size={14} color="var(--mantine-color-red-6)" />
+                                <Text size="xs" c="red">{result.error}</Text>
+                              </Group>
+                            ) : (
+                              <Group gap={6}>
+                                <FileText size={14} color="var(--mantine-color-gray-6)" />
+                                <Text size="xs" c="dimmed">
+                                  {result.topDomains.length} {result.topDomains.length === 1 ? 'result' : 'results'}
+                                  {result.topDomains.length < 30 && (
+                                    <Text component="span" c="orange" ml={4}>
+                                      (limited by search engine)
+                                    </Text>
+                                  )}
+                                </Text>
+                              </Group>
+                            )}
                           </Group>
                         </Box>
                       </Group>